@@ -105,6 +105,8 @@ export default [
         captureHeadless: false,
         openTestTab: false,
         backendRequest: false,
+        benchmarkRuns: false,
+        benchmarkBook: false,
       },
     },
   },
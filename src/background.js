@@ -3,6 +3,7 @@ importScripts(
   "core/common.js",
   "core/options-auto.js",
   "core/extension.js",
+  "scrapbook/tree-file.js",
   "scrapbook/server.js",
   "capturer/background.js",
   "editor/background.js",
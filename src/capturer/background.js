@@ -18,17 +18,133 @@
 
 'use strict';
 
+const MISSION_HEARTBEAT_TIMEOUT = 60000;
+const MISSION_RESUME_MAX = 3;
+
 async function clearCapturerCaches() {
+  // keep the fetch cache of the ongoing task of a queued mission, which is
+  // reused when the mission is resumed
+  const timeIds = new Set();
+  for (const {timeId} of Object.values(await getQueuedMissions())) {
+    if (timeId) {
+      timeIds.add(timeId);
+    }
+  }
+
   const filter = {
     includes: {
       table: new Set(["captureMissionCache", "batchCaptureMissionCache", "fetchCache", "blobCache"]),
     },
+    excludes: {
+      id: timeIds,
+    },
   };
   await scrapbook.cache.removeAll(filter, 'indexedDB');
   await scrapbook.cache.removeAll(filter, 'storage');
 }
 
 
+/****************************************************************************
+ * Resume interrupted missions
+ ***************************************************************************/
+
+/**
+ * @return {Promise<Object<string~missionId, missionCheckpoint>>}
+ */
+async function getQueuedMissions() {
+  const filter = {
+    includes: {
+      table: "captureMissionQueue",
+    },
+  };
+  const rv = {};
+  for (const [key, checkpoint] of Object.entries(await scrapbook.cache.getAll(filter, 'indexedDB'))) {
+    rv[JSON.parse(key).id] = checkpoint;
+  }
+  return rv;
+}
+
+/**
+ * Resume the queued missions whose capturer page is gone, e.g. closed or
+ * killed by a browser restart.
+ *
+ * - Run once per browser session, so that a mission whose capturer page is
+ *   closed by the user is not reopened whenever a non-persistent background
+ *   script restarts.
+ */
+async function resumeMissions() {
+  if (browser.storage.session) {
+    const key = 'capturerMissionsResumed';
+    if ((await browser.storage.session.get(key))[key]) {
+      return;
+    }
+    await browser.storage.session.set({[key]: true});
+  }
+
+  await Promise.all(Object.keys(await getQueuedMissions()).map(async (missionId) => {
+    try {
+      await resumeMission(missionId);
+    } catch (ex) {
+      console.error(`Failed to resume mission "${missionId}": ${ex.message}`);
+    }
+  }));
+}
+
+/**
+ * Resume a queued mission if no capturer page is running it.
+ *
+ * - Wait until the heartbeat of the checkpoint expires, as a capturer page
+ *   restored by the browser may still be loading or running the mission.
+ * - Claim the mission by increasing the resume count of the checkpoint,
+ *   which the reopened capturer page checks so that a restored one loaded
+ *   later will not run the mission again.
+ * - Drop the mission if it keeps being interrupted without completing a
+ *   task, e.g. when a task crashes the capturer page.
+ */
+async function resumeMission(missionId) {
+  const key = {table: "captureMissionQueue", id: missionId};
+  while (true) {
+    const checkpoint = await scrapbook.cache.get(key, 'indexedDB');
+    if (!checkpoint) {
+      return;
+    }
+
+    const alive = await scrapbook.invokeExtensionScript({
+      id: missionId,
+      cmd: "capturer.checkMission",
+    }).catch(() => false);
+    if (alive) {
+      return;
+    }
+
+    if (!scrapbook.getOption("capture.resumeMissions")) {
+      await scrapbook.cache.remove(key, 'indexedDB');
+      return;
+    }
+
+    const wait = (checkpoint.heartbeat || 0) + MISSION_HEARTBEAT_TIMEOUT - Date.now();
+    if (wait > 0) {
+      await scrapbook.delay(wait);
+      continue;
+    }
+
+    if ((checkpoint.retries || 0) >= MISSION_RESUME_MAX) {
+      console.error(`Dropped mission "${missionId}" after ${checkpoint.retries} failed resumes.`);
+      await scrapbook.cache.remove(key, 'indexedDB');
+      return;
+    }
+
+    checkpoint.resumes = (checkpoint.resumes || 0) + 1;
+    checkpoint.retries = (checkpoint.retries || 0) + 1;
+    checkpoint.heartbeat = Date.now();
+    await scrapbook.cache.set(key, checkpoint, 'indexedDB');
+
+    await scrapbook.resumeCapture({missionId, resume: checkpoint.resumes});
+    return;
+  }
+}
+
+
 /****************************************************************************
  * Notify captured pages
  ***************************************************************************/
@@ -39,6 +155,45 @@ const REGEX_IPv4 = /^(?:\d{1,3}\.){3}\d{1,3}$/;
 
 const bookCaches = new Map();
 
+/**
+ * Load a persisted book cache to prevent rebuilding it after a restart
+ * (e.g. a wake-up of the service worker).
+ *
+ * @param {string} type
+ * @param {Book} book
+ * @return {Promise<?(Map|Set)>} the cache, or null if missing or stale.
+ */
+async function loadPersistedBookCache(type, book) {
+  try {
+    const key = {table: "bookSourceCache", serverRoot: server.serverRoot, bookId: book.id, type};
+    const data = await scrapbook.cache.get(key, 'indexedDB');
+    if (data?.treeLastModified === book.treeLastModified &&
+        (data.cache instanceof Map || data.cache instanceof Set)) {
+      const cache = data.cache;
+      cache.treeLastModified = data.treeLastModified;
+      return cache;
+    }
+  } catch (ex) {
+    console.error(ex);
+  }
+  return null;
+}
+
+/**
+ * @param {string} type
+ * @param {Book} book
+ * @param {Map|Set} cache
+ */
+async function savePersistedBookCache(type, book, cache) {
+  try {
+    const key = {table: "bookSourceCache", serverRoot: server.serverRoot, bookId: book.id, type};
+    const {treeLastModified} = cache;
+    await scrapbook.cache.set(key, {treeLastModified, cache}, 'indexedDB');
+  } catch (ex) {
+    console.error(ex);
+  }
+}
+
 function cacheAddDomainSource(cache, domains, source) {
   let map = cache.get(domains[0]);
   if (!map) {
@@ -63,20 +218,27 @@ async function updateBookCaches() {
         if (book.config.no_tree) { return; }
 
         const refresh = !await book.validateTree();
-        try {
-          await book.loadMeta(refresh);
-          await book.loadToc(refresh);
-        } catch (ex) {
-          // skip book with tree loading error
-          console.error(ex);
-          return;
-        }
 
         // build cache for faster retrieval
         // Check treeLastModified explicitly as `book.validateTree` may have
         // been called otherwhere.
         let cache = bookCaches.get(bookId);
         if (cache?.treeLastModified !== book.treeLastModified) {
+          cache = await loadPersistedBookCache('badge', book);
+          if (cache) {
+            bookCaches.set(bookId, cache);
+          }
+        }
+        if (cache?.treeLastModified !== book.treeLastModified) {
+          try {
+            await book.loadMeta(refresh);
+            await book.loadToc(refresh);
+          } catch (ex) {
+            // skip book with tree loading error
+            console.error(ex);
+            return;
+          }
+
           cache = new Map();
           cache.treeLastModified = book.treeLastModified;
           bookCaches.set(bookId, cache);
@@ -112,6 +274,8 @@ async function updateBookCaches() {
               cacheAddDomainSource(cache, [hostname1, hostname2], source);
             }
           }
+
+          await savePersistedBookCache('badge', book, cache);
         }
 
         bookIds.push(bookId);
@@ -256,6 +420,13 @@ function toggleNotifyPageCaptured() {
 
 const REGEX_STRING_PATTERN = /^\/(.*)\/([a-z]*)$/i;
 
+const URL_PREFIX_HOST_PATTERN = /^[a-z][a-z0-9+.-]*:\/\/([a-z0-9.-]+(?::\d+)?|\[[0-9a-f:.]+\](?::\d+)?)[/?#]/i;
+
+/**
+ * Time (in ms) before the loaded source URLs of the books are revalidated.
+ */
+const AUTO_CAPTURE_SOURCES_TTL = 60 * 1000;
+
 let allowFileAccess;
 
 /**
@@ -278,6 +449,21 @@ let allowFileAccess;
  */
 let autoCaptureConfigs = [];
 
+/**
+ * Indexes of enabled configs to check for a URL of the host, including
+ * those not bound to any host, in the original order.
+ *
+ * @type {Map<string~host, integer[]>}
+ */
+let autoCaptureConfigsByHost = new Map();
+
+/**
+ * Indexes of enabled configs to check for a URL of any other host.
+ *
+ * @type {integer[]}
+ */
+let autoCaptureConfigsGeneric = [];
+
 /**
  * @typedef {Object} autoCaptureInfo
  * @property {timeout[]} delay
@@ -294,6 +480,24 @@ const autoCaptureInfos = new Map();
  */
 const autoCaptureBookCaches = new Map();
 
+/**
+ * Source URLs of all books with a valid cache, merged for a quick lookup.
+ *
+ * @type {?Set<string~sourceUrl>}
+ */
+let autoCaptureSources = null;
+
+let autoCaptureSourcesTime = 0;
+
+let autoCaptureSourcesUpdating = null;
+
+/**
+ * Source URLs captured in this session.
+ *
+ * @type {Set<string~sourceUrl>}
+ */
+const autoCaptureSessionSources = new Set();
+
 async function autoCaptureTab(tabInfo) {
   // normalize and remove hash from URL
   tabInfo.url = scrapbook.normalizeUrl(scrapbook.splitUrlByAnchor(tabInfo.url)[0]);
@@ -309,19 +513,12 @@ async function autoCaptureTab(tabInfo) {
     return;
   }
 
-  // update book caches from backend
-  const bookIds = await updateAutoCaptureBookCaches();
-
   // check config
-  for (let i = 0, I = autoCaptureConfigs.length; i < I; ++i) {
+  let isDuplicate;
+  for (const i of getAutoCaptureConfigIndexes(tabInfo.url)) {
     const config = autoCaptureConfigs[i];
 
     try {
-      // skip disabled config
-      if (config.disabled) {
-        continue;
-      }
-
       // check tabId
       if (Number.isInteger(config.tabId) && tabInfo.id !== config.tabId) {
         continue;
@@ -352,9 +549,14 @@ async function autoCaptureTab(tabInfo) {
       }
 
       // skip if duplicated
-      const isDuplicate = checkDuplicate(tabInfo.url, bookIds);
-      if (!config.allowDuplicate && isDuplicate) {
-        continue;
+      if (!config.allowDuplicate) {
+        if (typeof isDuplicate === 'undefined') {
+          await loadAutoCaptureSources();
+          isDuplicate = checkDuplicate(tabInfo.url);
+        }
+        if (isDuplicate) {
+          continue;
+        }
       }
 
       // set info
@@ -383,6 +585,84 @@ async function autoCaptureTab(tabInfo) {
   }
 }
 
+/**
+ * @param {string} url
+ * @return {integer[]} indexes of configs that may match the URL
+ */
+function getAutoCaptureConfigIndexes(url) {
+  let host;
+  try {
+    host = new URL(url).host.toLowerCase();
+  } catch (ex) {
+    return autoCaptureConfigsGeneric;
+  }
+  return autoCaptureConfigsByHost.get(host) || autoCaptureConfigsGeneric;
+}
+
+/**
+ * @param {autoCaptureConfig} config
+ * @return {?Set<string>} hosts that a URL must be of to match the config,
+ *   or null if not determinable
+ */
+function getAutoCaptureConfigHosts(config) {
+  if (!config.pattern) {
+    return null;
+  }
+
+  const hosts = new Set();
+  for (const pattern of config.pattern) {
+    const prefixes = scrapbook.getRegExpLiteralPrefixes(pattern);
+    if (!prefixes) {
+      return null;
+    }
+    for (const prefix of prefixes) {
+      const m = prefix.match(URL_PREFIX_HOST_PATTERN);
+      if (!m) {
+        return null;
+      }
+      hosts.add(m[1].toLowerCase());
+    }
+  }
+  return hosts;
+}
+
+/**
+ * Index the enabled configs by the host of URL they can match, so that
+ * only the related configs are checked for a navigation.
+ */
+function indexAutoCaptureConfigs() {
+  const byHost = new Map();
+  const generic = [];
+  for (let i = 0, I = autoCaptureConfigs.length; i < I; ++i) {
+    const config = autoCaptureConfigs[i];
+    if (config.disabled) {
+      continue;
+    }
+
+    const hosts = getAutoCaptureConfigHosts(config);
+    if (!hosts) {
+      generic.push(i);
+      continue;
+    }
+
+    for (const host of hosts) {
+      let indexes = byHost.get(host);
+      if (!indexes) {
+        indexes = [];
+        byHost.set(host, indexes);
+      }
+      indexes.push(i);
+    }
+  }
+
+  for (const [host, indexes] of byHost) {
+    byHost.set(host, [...indexes, ...generic].sort((a, b) => a - b));
+  }
+
+  autoCaptureConfigsByHost = byHost;
+  autoCaptureConfigsGeneric = generic;
+}
+
 /**
  * @return {integer[]} ID of books with a valid cache
  */
@@ -396,20 +676,27 @@ async function updateAutoCaptureBookCaches() {
         if (book.config.no_tree) { return; }
 
         const refresh = !await book.validateTree();
-        try {
-          await book.loadMeta(refresh);
-          await book.loadToc(refresh);
-        } catch (ex) {
-          // skip book with tree loading error
-          console.error(ex);
-          return;
-        }
 
         // build cache for faster retrieval
         // Check treeLastModified explicitly as `book.validateTree` may have
         // been called otherwhere.
         let cache = autoCaptureBookCaches.get(bookId);
         if (cache?.treeLastModified !== book.treeLastModified) {
+          cache = await loadPersistedBookCache('autoCapture', book);
+          if (cache) {
+            autoCaptureBookCaches.set(bookId, cache);
+          }
+        }
+        if (cache?.treeLastModified !== book.treeLastModified) {
+          try {
+            await book.loadMeta(refresh);
+            await book.loadToc(refresh);
+          } catch (ex) {
+            // skip book with tree loading error
+            console.error(ex);
+            return;
+          }
+
           cache = new Set();
           cache.treeLastModified = book.treeLastModified;
           autoCaptureBookCaches.set(bookId, cache);
@@ -431,6 +718,8 @@ async function updateAutoCaptureBookCaches() {
 
             cache.add(u.href);
           }
+
+          await savePersistedBookCache('autoCapture', book, cache);
         }
 
         bookIds.push(bookId);
@@ -444,23 +733,94 @@ async function updateAutoCaptureBookCaches() {
 }
 
 /**
- * @param {string[]} [bookIds] - ID of books with a valid cache
+ * Update the merged source URLs from the book caches.
+ *
+ * - Concurrent calls share the same update.
  */
-function checkDuplicate(url, bookIds) {
-  if (scrapbook.invokeBackgroundScript({
-    cmd: "getCapturedUrls",
-    args: {urls: [url]},
-  })[url]) {
-    return true;
+function updateAutoCaptureSources() {
+  if (autoCaptureSourcesUpdating) {
+    return autoCaptureSourcesUpdating;
   }
 
-  if (bookIds) {
-    for (const bookId of bookIds) {
-      const cache = autoCaptureBookCaches.get(bookId);
-      if (cache.has(url)) {
-        return true;
+  const promise = autoCaptureSourcesUpdating = (async () => {
+    try {
+      const bookIds = await updateAutoCaptureBookCaches();
+
+      // discard the result if invalidated during the update
+      if (autoCaptureSourcesUpdating !== promise) {
+        return;
+      }
+
+      const sources = new Set();
+      for (const bookId of bookIds) {
+        for (const source of autoCaptureBookCaches.get(bookId)) {
+          sources.add(source);
+        }
+      }
+      autoCaptureSources = sources;
+      autoCaptureSourcesTime = Date.now();
+    } finally {
+      if (autoCaptureSourcesUpdating === promise) {
+        autoCaptureSourcesUpdating = null;
       }
     }
+  })();
+  return promise;
+}
+
+/**
+ * Make sure the source URLs of the books are loaded.
+ *
+ * - Wait for the update only if not loaded or invalidated. Outdated sources
+ *   are revalidated in the background, so that a navigation does not wait
+ *   for the backend server.
+ */
+async function loadAutoCaptureSources() {
+  if (!autoCaptureSources) {
+    await updateAutoCaptureSources();
+    return;
+  }
+
+  if (Date.now() - autoCaptureSourcesTime >= AUTO_CAPTURE_SOURCES_TTL) {
+    updateAutoCaptureSources(); // async
+  }
+}
+
+/**
+ * Invalidate the source URLs of the books, which are reloaded for the next
+ * duplicate checking.
+ */
+function invalidateAutoCaptureSources() {
+  autoCaptureSources = null;
+  autoCaptureSourcesUpdating = null;
+}
+
+/**
+ * Add the source URLs of a finished capture for duplicate checking.
+ *
+ * @param {Object} params
+ * @param {string[]} [params.urls]
+ */
+function addAutoCaptureSources({urls = []} = {}) {
+  for (const url of urls) {
+    autoCaptureSessionSources.add(scrapbook.splitUrlByAnchor(url)[0]);
+  }
+}
+
+/**
+ * Check whether the URL has been captured in this session or exists in the
+ * loaded books.
+ *
+ * @param {string} url
+ * @return {boolean}
+ */
+function checkDuplicate(url) {
+  if (autoCaptureSessionSources.has(url)) {
+    return true;
+  }
+
+  if (autoCaptureSources?.has(url)) {
+    return true;
   }
 
   return false;
@@ -476,8 +836,8 @@ async function invokeCapture(tabInfo, config, isRepeat, skipCheck) {
 
     // skip duplicate for a first autocapture
     if (!isRepeat) {
-      // Skip checking server books, which have been checked when setting up
-      // the timer.
+      // Don't wait for loading the server books, which have been checked
+      // when setting up the timer.
       if (!config.allowDuplicate && checkDuplicate(tabInfo.url)) {
         return;
       }
@@ -594,6 +954,7 @@ function configAutoCapture() {
     console.error(`Ignored invalid auto-capture config: ${ex.message}`);
     autoCaptureConfigs = [];
   }
+  indexAutoCaptureConfigs();
 }
 
 
@@ -609,6 +970,7 @@ async function init() {
   toggleNotifyPageCaptured();
   configAutoCapture();
   toggleAutoCapture();
+  resumeMissions(); // async
 }
 
 init();
@@ -618,6 +980,8 @@ return {
   updateBadgeForAllTabs,
   configAutoCapture,
   toggleAutoCapture,
+  invalidateAutoCaptureSources,
+  addAutoCaptureSources,
 };
 
 }));
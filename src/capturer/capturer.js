@@ -30,11 +30,17 @@
 
 const REBUILD_LINK_ROLE_PATTERN = /^document(?:-[a-f0-9-]+)?$/;
 const REBUILD_LINK_SVG_HREF_ATTRS = ['href', 'xlink:href'];
+const REBUILD_LINK_STREAM_MIN_SIZE = 16 * 1024 * 1024;
+const REBUILD_LINK_RAW_TEXT_ELEMENTS = new Set(['iframe', 'noembed', 'noframes', 'plaintext', 'script', 'style', 'textarea', 'title', 'xmp']);
+const MISSION_HEARTBEAT_INTERVAL = 15000;
 
 // missionId is fixed to this page, to identify the capture mission
 // generate a unique one, if not otherwise set
 capturer.missionId = scrapbook.getUuid();
 
+// whether the mission is run by another capturer page
+capturer.missionSuperseded = false;
+
 /**
  * @typedef {Object} missionCaptureInfoFilesEntry
  * @property {string} [path]
@@ -61,6 +67,8 @@ capturer.missionId = scrapbook.getUuid();
 /**
  * @typedef {Object} missionCaptureInfo
  * @property {boolean} useDiskCache
+ * @property {boolean} resumed - whether the capture is resumed from an
+ *   interrupted mission, whose fetched resources may be in the disk cache
  * @property {(integer|undefined)} initialVersion
  * @property {Set<string~filename>} indexPages
  * @property {Map<string~filename, missionCaptureInfoFilesEntry>} files
@@ -75,6 +83,7 @@ capturer.missionId = scrapbook.getUuid();
  */
 capturer.captureInfo = new MapWithDefault(() => ({
   useDiskCache: false,
+  resumed: false,
 
   initialVersion: undefined,
   indexPages: new Set(),
@@ -112,6 +121,72 @@ capturer.captureInfo = new MapWithDefault(() => ({
  */
 capturer.downloadHooks = new Map();
 
+/**
+ * The retry engine of the mission, whose circuit breakers and retry budget
+ * are shared by all captures in the mission.
+ *
+ * @type {scrapbook.Retrier}
+ */
+capturer.retrier = new scrapbook.Retrier();
+
+/**
+ * @typedef {Object} retryStats
+ * @property {integer} retries - number of retries
+ * @property {integer} failures - number of operations failed after retries
+ */
+
+/**
+ * @type {MapWithDefault<string~timeId, retryStats>}
+ */
+capturer.retryStats = new MapWithDefault(() => ({retries: 0, failures: 0}));
+
+/**
+ * Run an operation with the retry engine of the mission.
+ *
+ * @param {Function} callback - the operation, which throws on failure
+ * @param {Object} params
+ * @param {string} params.name - name of the operation, for logging
+ * @param {retryStats} [params.stats] - the statistics to record to
+ * @param {string} [params.url] - the target URL
+ * @param {integer} params.retryCount
+ * @param {number} params.retryDelay
+ * @param {Function} [params.isRetriable]
+ * @param {Function} [params.isBreakerFailure]
+ * @return {Promise<*>} the return value of callback
+ */
+capturer.retry = async function (callback, {name, stats, url, retryCount, retryDelay, isRetriable, isBreakerFailure}) {
+  // a failure of a non-HTTP URL (e.g. a missing file: or blob: URL) is not
+  // transient
+  if (url && !/^https?:/i.test(url)) {
+    return await callback(0);
+  }
+
+  return await capturer.retrier.run(callback, {
+    url,
+    retryCount,
+    retryDelay,
+    isRetriable,
+    isBreakerFailure,
+    onRetry(ex, tried, delay) {
+      if (stats) { stats.retries++; }
+      console.error(`${name} failed (tried ${tried}), retry in ${Math.round(delay)} ms: ${ex.message}`);
+    },
+    onFailure(ex) {
+      if (stats) { stats.failures++; }
+    },
+  });
+};
+
+/**
+ * Log the retry statistics of a capture to the capture log.
+ *
+ * @param {retryStats} stats
+ */
+capturer.logRetryStats = function ({retries, failures}) {
+  if (!retries && !failures) { return; }
+  capturer.log(`Retried ${retries} time(s) for failed requests, with ${failures} request(s) given up.`);
+};
+
 /**
  * @param {...(string|Node)} msg
  */
@@ -168,6 +243,48 @@ capturer.invoke = async function (method, args, details = {}) {
   }
 };
 
+/**
+ * Run tasks with bounded concurrency.
+ *
+ * @param {Array} entries
+ * @param {integer} workers - max number of concurrent tasks; run all at once
+ *     if not a positive number
+ * @param {Function} callback - an async function to run for each entry
+ * @return {Promise<void>}
+ */
+capturer.runWorkers = async function (entries, workers, callback) {
+  if (!(workers >= 1)) { workers = Infinity; }
+  workers = Math.min(workers, entries.length);
+
+  let taskIdx = 0;
+  const runTask = async () => {
+    while (taskIdx < entries.length) {
+      await callback(entries[taskIdx++]);
+    }
+  };
+
+  await Promise.all(Array.from({length: workers}, () => runTask()));
+};
+
+/**
+ * Create a function that logs the progress of a number of tasks when called
+ * for each done task, in about 10 steps.
+ *
+ * @param {string} label
+ * @param {integer} total
+ * @return {Function}
+ */
+capturer.createProgressLogger = function (label, total) {
+  const step = Math.ceil(total / 10);
+  let done = 0;
+  return () => {
+    done++;
+    if (done % step === 0 || done === total) {
+      capturer.log(`${label}: ${done}/${total}`);
+    }
+  };
+};
+
 /**
  * Prevent filename conflict. Appends a number if the given filename is used.
  *
@@ -312,21 +429,11 @@ capturer.getAvailableSaveFilename = async function (params) {
           removeDummyFile: {
             // A random temporarily OS or API issue may cause the file
             // removal to fail. Retry a few times to alleviate that.
-            const retryCount = options["capture.downloadRetryCount"];
-            const retryDelay = options["capture.downloadRetryDelay"];
-            let tried = 0;
-            while (true) {
-              try {
-                await browser.downloads.removeFile(item.id);
-                break;
-              } catch (ex) {
-                if (tried++ >= retryCount) {
-                  throw ex;
-                }
-                console.error(`Failed to remove downloaded file "${filename}" (tried ${tried}): ${ex.message}`);
-                await scrapbook.delay(retryDelay);
-              }
-            }
+            await capturer.retry(() => browser.downloads.removeFile(item.id), {
+              name: `Removal of downloaded file "${filename}"`,
+              retryCount: options["capture.downloadRetryCount"],
+              retryDelay: options["capture.downloadRetryDelay"],
+            });
           }
           await browser.downloads.erase({id: item.id});
 
@@ -473,9 +580,10 @@ capturer.fetch = async function (params) {
     ALLOWED_SCHEMES.delete('file');
   }
 
+  // fetch tokens are used only in the mission, and a fast hash suffices
   const getFetchToken = function (url, role) {
     let token = `${scrapbook.normalizeUrl(url)}\t${role}`;
-    token = scrapbook.sha1(token, "TEXT");
+    token = scrapbook.hashString(token);
     return token;
   };
 
@@ -508,9 +616,22 @@ capturer.fetch = async function (params) {
     return headers;
   };
 
-  const setCache = async (id, token, data) => {
+  /**
+   * Cache the fetched response to the disk.
+   *
+   * - The cached response is reused by a resumed mission, after being
+   *   interrupted.
+   *
+   * @return {Promise<Blob>} the cached blob, which is disk-backed
+   */
+  const setCache = async (id, token, response) => {
+    const key = {table: "fetchCache", id, token};
+    await scrapbook.cache.set(key, response, 'indexedDB');
+    return (await scrapbook.cache.get(key, 'indexedDB')).blob;
+  };
+
+  const getCache = async (id, token) => {
     const key = {table: "fetchCache", id, token};
-    await scrapbook.cache.set(key, data, 'indexedDB');
     return await scrapbook.cache.get(key, 'indexedDB');
   };
 
@@ -595,13 +716,13 @@ capturer.fetch = async function (params) {
       }
     }
 
-    const fetchCurrent = (async () => {
+    const fetchCurrent = capturer.timePhase(timeId, 'fetch', async () => {
       let overrideUrl;
 
       try {
         // special handling for data URI
         if (scheme === "data") {
-          const file = scrapbook.dataUriToFile(sourceUrlMain);
+          const file = await scrapbook.dataUriToFile(sourceUrlMain);
           if (!file) { throw new Error("Malformed data URL."); }
 
           // simulate headers from data URI parameters
@@ -611,15 +732,15 @@ capturer.fetch = async function (params) {
           headers.contentType = contentType.type;
           headers.charset = contentType.parameters.charset;
 
-          let blob = new Blob([file], {type: file.type});
+          Object.assign(response, {
+            status: 200,
+            blob: new Blob([file], {type: file.type}),
+          });
           if (capturer.captureInfo.get(timeId).useDiskCache) {
-            blob = await setCache(timeId, fetchToken, blob);
+            response.blob = await setCache(timeId, fetchToken, response);
           }
 
-          return Object.assign(response, {
-            status: 200,
-            blob,
-          });
+          return response;
         }
 
         // special handling for about:blank or about:srcdoc
@@ -630,108 +751,148 @@ capturer.fetch = async function (params) {
           });
         }
 
+        // reuse the response fetched before the mission was interrupted
+        if (capturer.captureInfo.get(timeId).resumed && !overrideBlob) {
+          const cachedResponse = await getCache(timeId, getFetchToken(sourceUrlMain, 'blob'));
+          if (cachedResponse) {
+            return Object.assign(response, cachedResponse);
+          }
+        }
+
         // special handling of overrideBlob
         if (overrideBlob) {
           overrideUrl = URL.createObjectURL(overrideBlob);
         }
 
-        const xhr = await scrapbook.xhr({
-          url: overrideUrl || sourceUrlMain,
-          responseType: 'blob',
-          allowAnyStatus: true,
-          requestHeaders: setReferrer({
-            headers: {},
-            refUrl,
-            targetUrl: overrideUrl || sourceUrlMain,
-            refPolicy,
-            options,
-          }),
-          onreadystatechange(xhr) {
-            if (xhr.readyState !== 2) { return; }
-
-            // check for previous fetch if redirected
-            // treat as if no redirect when overrideUrl is used
-            if (!overrideUrl) {
-              // xhr.responseURL must be valid; otherwise the onerror event of the XHR will be triggered
-              const [responseUrlMain, responseUrlHash] = scrapbook.splitUrlByAnchor(xhr.responseURL);
-              if (responseUrlMain !== sourceUrlMain) {
-                const responseFetchToken = getFetchToken(responseUrlMain, fetchRole);
-                const responseFetchPrevious = fetchMap.get(responseFetchToken);
-
-                // a fetch to the redirected URL exists, abort the request and return it
-                if (responseFetchPrevious && responseFetchPrevious !== fetchCurrent) {
-                  response = responseFetchPrevious;
-                  xhr.abort();
-                  return;
-                }
+        const xhr = await capturer.retry(async (tried) => {
+          // discard headers recorded by a previous try
+          if (tried) {
+            for (const key in headers) {
+              delete headers[key];
+            }
+          }
 
-                // otherwise, map the redirected URL to the same fetch promise
-                fetchMap.set(responseFetchToken, fetchCurrent);
-                if (!headerOnly) {
-                  const responseFetchToken = getFetchToken(responseUrlMain, 'head');
+          const xhr = await scrapbook.xhr({
+            url: overrideUrl || sourceUrlMain,
+            responseType: 'blob',
+            allowAnyStatus: true,
+            requestHeaders: setReferrer({
+              headers: {},
+              refUrl,
+              targetUrl: overrideUrl || sourceUrlMain,
+              refPolicy,
+              options,
+            }),
+            onreadystatechange(xhr) {
+              if (xhr.readyState !== 2) { return; }
+
+              // check for previous fetch if redirected
+              // treat as if no redirect when overrideUrl is used
+              if (!overrideUrl) {
+                // xhr.responseURL must be valid; otherwise the onerror event of the XHR will be triggered
+                const [responseUrlMain, responseUrlHash] = scrapbook.splitUrlByAnchor(xhr.responseURL);
+                if (responseUrlMain !== sourceUrlMain) {
+                  const responseFetchToken = getFetchToken(responseUrlMain, fetchRole);
+                  const responseFetchPrevious = fetchMap.get(responseFetchToken);
+
+                  // a fetch to the redirected URL exists, abort the request and return it
+                  if (responseFetchPrevious && responseFetchPrevious !== fetchCurrent) {
+                    response = responseFetchPrevious;
+                    xhr.abort();
+                    return;
+                  }
+
+                  // otherwise, map the redirected URL to the same fetch promise
                   fetchMap.set(responseFetchToken, fetchCurrent);
+                  if (!headerOnly) {
+                    const responseFetchToken = getFetchToken(responseUrlMain, 'head');
+                    fetchMap.set(responseFetchToken, fetchCurrent);
+                  }
                 }
               }
-            }
 
-            // get headers
-            if (sourceUrl.startsWith("http:") || sourceUrl.startsWith("https:") || sourceUrl.startsWith("blob:")) {
-              const headerContentType = xhr.getResponseHeader("Content-Type");
-              if (headerContentType) {
-                const contentType = scrapbook.parseHeaderContentType(headerContentType);
-                headers.contentType = contentType.type;
-                headers.charset = contentType.parameters.charset;
-              }
-              const headerContentDisposition = xhr.getResponseHeader("Content-Disposition");
-              if (headerContentDisposition) {
-                const contentDisposition = scrapbook.parseHeaderContentDisposition(headerContentDisposition);
-                headers.isAttachment = (contentDisposition.type !== "inline");
-                headers.filename = contentDisposition.parameters.filename;
-              }
-              const headerContentLength = xhr.getResponseHeader("Content-Length");
-              if (headerContentLength) {
-                headers.contentLength = parseInt(headerContentLength, 10);
+              // get headers
+              if (sourceUrl.startsWith("http:") || sourceUrl.startsWith("https:") || sourceUrl.startsWith("blob:")) {
+                const headerContentType = xhr.getResponseHeader("Content-Type");
+                if (headerContentType) {
+                  const contentType = scrapbook.parseHeaderContentType(headerContentType);
+                  headers.contentType = contentType.type;
+                  headers.charset = contentType.parameters.charset;
+                }
+                const headerContentDisposition = xhr.getResponseHeader("Content-Disposition");
+                if (headerContentDisposition) {
+                  const contentDisposition = scrapbook.parseHeaderContentDisposition(headerContentDisposition);
+                  headers.isAttachment = (contentDisposition.type !== "inline");
+                  headers.filename = contentDisposition.parameters.filename;
+                }
+                const headerContentLength = xhr.getResponseHeader("Content-Length");
+                if (headerContentLength) {
+                  headers.contentLength = parseInt(headerContentLength, 10);
+                }
               }
-            }
-
-            let earlyResponse;
-            if (headerOnly) {
-              // skip loading body for a headerOnly fetch
-              earlyResponse = Object.assign(response, {
-                url: overrideUrl ? sourceUrlMain : xhr.responseURL,
-                status: xhr.status,
-              });
-            } else if (!ignoreSizeLimit &&
-                typeof options["capture.resourceSizeLimit"] === "number" &&
-                typeof headers.contentLength === "number" &&
-                headers.contentLength >= options["capture.resourceSizeLimit"] * 1024 * 1024) {
-              // apply size limit if header contentLength is known
-              earlyResponse = Object.assign(response, {
-                url: overrideUrl ? sourceUrlMain : xhr.responseURL,
-                status: xhr.status,
-                error: {
-                  name: 'FilterSizeError',
-                  message: 'Resource size limit exceeded.',
-                },
-              });
-            }
 
-            if (earlyResponse) {
-              // handle HTTP error
-              if (!(xhr.status >= 200 && xhr.status < 300)) {
-                Object.assign(earlyResponse, {
+              let earlyResponse;
+              if (headerOnly) {
+                // skip loading body for a headerOnly fetch
+                earlyResponse = Object.assign(response, {
+                  url: overrideUrl ? sourceUrlMain : xhr.responseURL,
+                  status: xhr.status,
+                });
+              } else if (!ignoreSizeLimit &&
+                  typeof options["capture.resourceSizeLimit"] === "number" &&
+                  typeof headers.contentLength === "number" &&
+                  headers.contentLength >= options["capture.resourceSizeLimit"] * 1024 * 1024) {
+                // apply size limit if header contentLength is known
+                earlyResponse = Object.assign(response, {
+                  url: overrideUrl ? sourceUrlMain : xhr.responseURL,
+                  status: xhr.status,
                   error: {
-                    name: 'HttpError',
-                    message: `${xhr.status} ${xhr.statusText}`,
+                    name: 'FilterSizeError',
+                    message: 'Resource size limit exceeded.',
                   },
                 });
               }
 
-              xhr.abort();
-              return;
-            }
-          },
+              if (earlyResponse) {
+                // handle HTTP error
+                if (!(xhr.status >= 200 && xhr.status < 300)) {
+                  Object.assign(earlyResponse, {
+                    error: {
+                      name: 'HttpError',
+                      message: `${xhr.status} ${xhr.statusText}`,
+                    },
+                  });
+                }
+
+                xhr.abort();
+                return;
+              }
+            },
+          });
+
+          // retry for a transient HTTP error, and take the last response if
+          // given up
+          if (xhr && scrapbook.Retrier.isRetriableStatus(xhr.status)) {
+            const error = scrapbook.createXhrError(xhr);
+            error.xhr = xhr;
+            throw error;
+          }
+
+          return xhr;
+        }, {
+          name: `Fetch of "${scrapbook.crop(sourceUrlMain, 256)}"`,
+          stats: capturer.retryStats.get(timeId),
+          url: sourceUrlMain,
+          retryCount: options["capture.downloadRetryCount"],
+          retryDelay: options["capture.downloadRetryDelay"],
+          // A plain 500 is usually an error of the specific resource rather
+          // than of the host, and shouldn't make other resources of the host
+          // fail fast.
+          isBreakerFailure: (ex) => ex.status !== 500,
         }).catch((ex) => {
+          if (ex.xhr) {
+            return ex.xhr;
+          }
           Object.assign(response, {
             error: {
               name: 'RequestError',
@@ -746,10 +907,7 @@ capturer.fetch = async function (params) {
           return response;
         }
 
-        let blob = xhr.response;
-        if (capturer.captureInfo.get(timeId).useDiskCache) {
-          blob = await setCache(timeId, fetchToken, blob);
-        }
+        const blob = xhr.response;
 
         Object.assign(response, {
           url: overrideUrl ? sourceUrlMain : xhr.responseURL,
@@ -780,6 +938,10 @@ capturer.fetch = async function (params) {
           });
         }
 
+        if (response.blob && capturer.captureInfo.get(timeId).useDiskCache) {
+          response.blob = await setCache(timeId, fetchToken, response);
+        }
+
         return response;
       } catch (ex) {
         return Object.assign(response, {
@@ -793,7 +955,7 @@ capturer.fetch = async function (params) {
           URL.revokeObjectURL(overrideUrl);
         }
       }
-    })();
+    });
 
     fetchMap.set(fetchToken, fetchCurrent);
     if (!headerOnly) {
@@ -937,13 +1099,13 @@ capturer.addItemToServer = async function ({item, parentId, index}) {
     capturer.warn(scrapbook.lang("ErrorFileDownloadError", [icon, ex.message]));
   }
 
-  // lock tree before loading to avoid a conflict due to parallel captures
+  // add the item with a server-locked query and retry on a conflict, so
+  // that parallel captures do not block each other
   await book.transaction({
-    mode: 'refresh',
-    timeout: 60,
-    callback: async (book, {updated}) => {
-      await book.loadMeta(updated);
-      await book.loadToc(updated);
+    mode: 'optimistic',
+    callback: async (book, {updated, changedFiles}) => {
+      await book.loadMeta(updated && changedFiles.has('meta'));
+      await book.loadToc(updated && changedFiles.has('toc'));
 
       // insert to root if parentId does not exist
       if (parentId && !book.meta[parentId] && !book.isSpecialItem(parentId)) {
@@ -960,7 +1122,6 @@ capturer.addItemToServer = async function ({item, parentId, index}) {
         url: book.topUrl,
         query: {
           a: 'query',
-          lock: '',
         },
         method: 'POST',
         format: 'json',
@@ -992,6 +1153,89 @@ capturer.getMissionResult = async function () {
   return capturePromise;
 };
 
+/**
+ * @type invokable
+ * @return {Promise<missionTimingsEntry[]>}
+ */
+capturer.getMissionTimings = async function () {
+  await capturePromise;
+  return capturer.missionTimings;
+};
+
+/**
+ * Check whether the capturer page of the mission is alive.
+ *
+ * @type invokable
+ * @return {Promise<boolean>}
+ */
+capturer.checkMission = async function () {
+  return !capturer.missionSuperseded;
+};
+
+/**
+ * @typedef {Object} missionCheckpoint
+ * @property {Object} taskInfo - the task info of the mission
+ * @property {integer} completed - number of completed tasks
+ * @property {Array} results - results of the completed tasks
+ * @property {integer} [index] - position index for the next captured item
+ * @property {string} [timeId] - timeId of the ongoing task
+ * @property {integer} [heartbeat] - time when the capturer page running the
+ *     mission last saved the checkpoint
+ * @property {integer} [resumes] - number of times the mission has been
+ *     resumed, which identifies the capturer page that owns the mission
+ * @property {integer} [retries] - number of times the mission has been
+ *     resumed since a task was last completed
+ * @property {boolean} [resumed] - whether the mission has been interrupted
+ */
+
+let missionCheckpointTask = Promise.resolve();
+
+/**
+ * Run operations on the checkpoint one by one, so that a delayed heartbeat
+ * save cannot write it back after it has been removed.
+ */
+function queueMissionCheckpointTask(fn) {
+  const task = missionCheckpointTask.then(fn);
+  missionCheckpointTask = task.catch(() => {});
+  return task;
+}
+
+/**
+ * Load the checkpoint of an interrupted mission from the mission queue.
+ *
+ * @return {Promise<?missionCheckpoint>}
+ */
+capturer.loadMissionCheckpoint = async function () {
+  const key = {table: "captureMissionQueue", id: capturer.missionId};
+  const checkpoint = await scrapbook.cache.get(key, 'indexedDB');
+  if (!checkpoint) {
+    return null;
+  }
+  checkpoint.resumed = true;
+  return checkpoint;
+};
+
+/**
+ * Save the checkpoint of the mission to the mission queue, so that it can
+ * be resumed if the mission is interrupted.
+ *
+ * @param {missionCheckpoint} checkpoint
+ */
+capturer.saveMissionCheckpoint = async function (checkpoint) {
+  const key = {table: "captureMissionQueue", id: capturer.missionId};
+  return await queueMissionCheckpointTask(async () => {
+    checkpoint.heartbeat = Date.now();
+    await scrapbook.cache.set(key, checkpoint, 'indexedDB');
+  });
+};
+
+capturer.removeMissionCheckpoint = async function () {
+  const key = {table: "captureMissionQueue", id: capturer.missionId};
+  return await queueMissionCheckpointTask(async () => {
+    await scrapbook.cache.remove(key, 'indexedDB');
+  });
+};
+
 /**
  * @type invokable
  */
@@ -1013,28 +1257,61 @@ capturer.remoteMsg = async function ({msg, type}) {
  * @param {string} [params.mode] - base capture mode
  * @param {captureOptions} [params.options] - base capture options, overwriting default
  * @param {string} [params.comment] - comment for the captured item
+ * @param {missionCheckpoint} [checkpoint] - checkpoint to record the
+ *   progress to, and to resume from
  * @return {Promise<Array|Object>} A list of task results (or error), or an object of error.
  */
 capturer.runTasks = async function ({
   tasks,
   bookId, parentId, index, delay,
   mode: baseMode, options: baseOptions,
-}) {
+}, checkpoint) {
   delay = parseFloat(delay) || 5;
   baseOptions = Object.assign(await scrapbook.getOptions("capture"), baseOptions);
 
-  const results = [];
+  let results = [];
+  let taskIndex = 0;
+  if (checkpoint) {
+    ({results, completed: taskIndex} = checkpoint);
+    if (Number.isInteger(checkpoint.index)) {
+      index = checkpoint.index;
+    }
+  }
 
-  for (const task of tasks) {
-    const {
+  for (; taskIndex < tasks.length; taskIndex++) {
+    let {
       tabId, frameId, fullPage,
       url, refUrl, title, favIconUrl,
       mode = baseMode, options: taskOptions, comment,
       recaptureInfo, mergeCaptureInfo,
-    } = task;
+    } = tasks[taskIndex];
 
     const options = Object.assign({}, baseOptions, taskOptions);
 
+    // record the timeId of the ongoing task, so that the fetched resources
+    // can be reused if the task is interrupted and resumed
+    let timeId;
+    let resumed = false;
+    if (checkpoint) {
+      if (checkpoint.timeId) {
+        timeId = checkpoint.timeId;
+        resumed = true;
+      } else {
+        timeId = checkpoint.timeId = scrapbook.dateToId();
+      }
+      await capturer.saveMissionCheckpoint(checkpoint);
+
+      // the tab may have been closed or reused by another page after an
+      // interruption, capture the URL in a new tab instead
+      if (checkpoint.resumed && Number.isInteger(tabId)) {
+        const tab = await browser.tabs.get(tabId).catch(() => null);
+        if (!tab || tab.url !== url) {
+          tabId = frameId = undefined;
+          mode ??= "tab";
+        }
+      }
+    }
+
     let result;
     try {
       capturer.addItemToServer.added = false;
@@ -1067,11 +1344,14 @@ capturer.runTasks = async function ({
         });
       } else {
         // capture general
+        if (resumed) {
+          capturer.captureInfo.get(timeId).resumed = true;
+        }
         result = await capturer.captureGeneral({
           tabId, frameId,
           url, refUrl,
           mode,
-          settings: {fullPage, title, favIconUrl},
+          settings: {timeId, fullPage, title, favIconUrl},
           options, comment,
           bookId, parentId, index,
         });
@@ -1098,6 +1378,16 @@ capturer.runTasks = async function ({
 
     results.push(result);
 
+    if (checkpoint) {
+      Object.assign(checkpoint, {
+        completed: taskIndex + 1,
+        index,
+        timeId: undefined,
+        retries: 0,
+      });
+      await capturer.saveMissionCheckpoint(checkpoint);
+    }
+
     // short delay before next task
     await scrapbook.delay(delay);
   }
@@ -1144,6 +1434,8 @@ capturer.captureGeneral = async function ({
   bookId = null, parentId, index,
   captureOnly = false,
 }) {
+  const startTime = performance.now();
+
   // validate capture helpers
   // force disabled if invalid or undefined
   if (options["capture.helpersEnabled"]) {
@@ -1241,8 +1533,13 @@ capturer.captureGeneral = async function ({
     throw new Error(`Bad parameters.`);
   }
 
+  capturer.logRetryStats(capturer.retryStats.get(timeId));
+  capturer.retryStats.delete(timeId);
+
   // special handling (for unit test)
   if (options["capture.saveTo"] === "memory") {
+    capturer.recordTiming(timeId, 'total', startTime);
+    capturer.reportTimings({timeId, url: response.sourceUrl || url, options});
     return response;
   }
 
@@ -1275,9 +1572,40 @@ capturer.captureGeneral = async function ({
     await capturer.clearFileCache({timeId});
   }
 
+  capturer.recordTiming(timeId, 'total', startTime);
+  capturer.reportTimings({timeId, url: response.sourceUrl, options});
+
   return response;
 };
 
+/**
+ * @typedef {Object} missionTimingsEntry
+ * @property {string} timeId
+ * @property {string} url
+ * @property {Object<string~phase, captureTiming>} timings
+ */
+
+/**
+ * Timings of the captures in this mission.
+ *
+ * @type {missionTimingsEntry[]}
+ */
+capturer.missionTimings = [];
+
+/**
+ * Collect recorded timings of a capture into the mission timings.
+ *
+ * @param {Object} params
+ * @param {string} params.timeId
+ * @param {string} params.url
+ * @param {captureOptions} params.options
+ */
+capturer.reportTimings = function ({timeId, url, options}) {
+  const timings = capturer.takeTimings(timeId);
+  if (!options["capture.recordTimings"]) { return; }
+  capturer.missionTimings.push({timeId, url, timings});
+};
+
 /**
  * @param {Object} params
  * @param {integer} params.tabId
@@ -1337,7 +1665,9 @@ capturer.captureTab = async function ({
     throw new Error(scrapbook.lang("ErrorTabDiscarded"));
   }
 
-  (await scrapbook.initContentScripts(tabId)).forEach(({tabId, frameId, url, error, injected}) => {
+  (await capturer.timePhase(settings.timeId, 'injection', () => {
+    return scrapbook.initContentScripts(tabId, undefined, {modules: ['capturer']});
+  })).forEach(({tabId, frameId, url, error, injected}) => {
     if (error) {
       const source = `[${tabId}:${frameId}] ${url}`;
       capturer.error(scrapbook.lang("ErrorContentScriptExecute", [source, error.message]));
@@ -1428,7 +1758,7 @@ capturer.captureRemoteTab = async function ({
     await scrapbook.delay(delay);
   }
 
-  (await scrapbook.initContentScripts(tab.id)).forEach(({tabId, frameId, url, error, injected}) => {
+  (await scrapbook.initContentScripts(tab.id, undefined, {modules: ['capturer']})).forEach(({tabId, frameId, url, error, injected}) => {
     if (error) {
       const source = `[${tabId}:${frameId}] ${url}`;
       capturer.error(scrapbook.lang("ErrorContentScriptExecute", [source, error.message]));
@@ -2025,15 +2355,27 @@ capturer.resaveTab = async function ({
         }
       }
 
-      (await scrapbook.initContentScripts(tabId)).forEach(({tabId, frameId, url, error, injected}) => {
+      const frames = await scrapbook.initContentScripts(tabId, undefined, {modules: ['capturer']});
+      frames.forEach(({tabId, frameId, url, error, injected}) => {
         if (error) {
           const source = `[${tabId}:${frameId}] ${url}`;
           capturer.error(scrapbook.lang("ErrorContentScriptExecute", [source, error.message]));
         }
       });
 
+      // Documents not changed since the last save can be skipped, as
+      // resources are not touched when not internalizing.
+      const changeStatuses = internalize ? new Map() : await capturer.getDocumentChangeStatuses(frames);
+      const unchangedUrls = [];
+      for (const [docUrl, {changed}] of changeStatuses) {
+        if (!changed) {
+          unchangedUrls.push(docUrl);
+        }
+      }
+
       const message = {
         internalize,
+        unchangedUrls,
         isMainPage: isMainDocument,
         item,
         options: Object.assign(await scrapbook.getOptions("capture"), options),
@@ -2043,53 +2385,130 @@ capturer.resaveTab = async function ({
       const response = await capturer.invoke("retrieveDocumentContent", message, {tabId, frameId});
       isDebug && console.debug("(main) response", source, response);
 
+      if (!Object.keys(response).length) {
+        capturer.log(`No changes to save.`);
+        return;
+      }
+
+      const retryStats = {retries: 0, failures: 0};
+      const uploadFile = async (target, blob) => {
+        return await capturer.retry(() => server.request({
+          url: target + '?a=save',
+          method: "POST",
+          format: 'json',
+          csrfToken: true,
+          body: {
+            upload: blob,
+          },
+        }), {
+          name: `Upload to "${target}"`,
+          stats: retryStats,
+          url: target,
+          retryCount: message.options["capture.serverUploadRetryCount"],
+          retryDelay: message.options["capture.serverUploadRetryDelay"],
+        });
+      };
+
+      // upload sequentially for an archive file (HTZ/MAFF), as concurrent
+      // writes to the same archive file may conflict
+      const uploadWorkers = url.includes('!/') ? 1 : message.options["capture.serverUploadWorkers"];
+
       // handle resources to internalize
       const resourceMap = new Map();
       if (internalize) {
         const allowFileAccess = await browser.extension.isAllowedFileSchemeAccess();
+        const fetchTasks = [];
         for (const [fileUrl, data] of Object.entries(response)) {
-          const fetchResource = async (url) => {
+          for (const [uuid, url] of Object.entries(data.resources)) {
+            data.resources[uuid] = {url, file: null};
+
             const fullUrl = scrapbook.normalizeUrl(capturer.resolveRelativeUrl(url, fileUrl));
-            if (!scrapbook.isContentPage(fullUrl, allowFileAccess)) { return null; }
-            if (fullUrl.startsWith(internalizePrefix)) { return null; }
+            if (!scrapbook.isContentPage(fullUrl, allowFileAccess)) { continue; }
+            if (internalizePrefix && fullUrl.startsWith(internalizePrefix)) { continue; }
+
+            let task = resourceMap.get(fullUrl);
+            if (!task) {
+              task = {url, fullUrl, file: null, refs: []};
+              resourceMap.set(fullUrl, task);
+              fetchTasks.push(task);
+            }
+            task.refs.push(data.resources[uuid]);
+          }
+        }
+
+        const progress = capturer.createProgressLogger('Fetched resources', fetchTasks.length);
+        await capturer.runWorkers(fetchTasks, message.options["capture.downloadWorkers"], async (task) => {
+          try {
+            const xhr = await capturer.retry(() => scrapbook.xhr({
+              url: task.fullUrl,
+              responseType: 'blob',
+            }), {
+              name: `Fetch of "${scrapbook.crop(task.fullUrl, 256)}"`,
+              stats: retryStats,
+              url: task.fullUrl,
+              retryCount: message.options["capture.downloadRetryCount"],
+              retryDelay: message.options["capture.downloadRetryDelay"],
+            });
+            const blob = xhr.response;
 
-            const file = resourceMap.get(fullUrl);
-            if (typeof file !== 'undefined') { return file; }
+            if (internalizePrefix) {
+              const sha = await scrapbook.getDigest(blob, 'SHA-1');
+              const ext = Mime.extension(blob.type) || 'bin';
+              task.file = new File([blob], sha + '.' + ext, {type: blob.type});
+            } else {
+              task.file = await scrapbook.readFileAsDataURL(blob);
+            }
+            for (const ref of task.refs) {
+              ref.file = task.file;
+            }
+          } catch (ex) {
+            console.error(ex);
+            capturer.warn(`Unable to internalize resource "${scrapbook.crop(task.url, 256)}": ${ex.message}`);
+          }
+          progress();
+        });
 
-            resourceMap.set(fullUrl, null);
+        // resources
+        // upload before the documents referencing them
+        if (internalizePrefix) {
+          // skip files already in the resource folder, which are named by
+          // the hash of the content
+          const existingFiles = await capturer.listServerDirectory(internalizePrefix);
+          const uploadTasks = new Map();
+          for (const {file} of resourceMap.values()) {
+            if (!file || existingFiles.has(file.name)) { continue; }
+            uploadTasks.set(file.name, file);
+          }
 
+          const progress = capturer.createProgressLogger('Uploaded resources', uploadTasks.size);
+          await capturer.runWorkers([...uploadTasks.values()], uploadWorkers, async (file) => {
+            const target = internalizePrefix + file.name;
             try {
-              const xhr = await scrapbook.xhr({
-                url: fullUrl,
-                responseType: 'blob',
-              });
-              const blob = xhr.response;
-
-              let file;
-              if (internalizePrefix) {
-                const sha = scrapbook.sha1(await scrapbook.readFileAsArrayBuffer(blob), 'ARRAYBUFFER');
-                const ext = Mime.extension(blob.type) || 'bin';
-                file = new File([blob], sha + '.' + ext, {type: blob.type});
-              } else {
-                file = await scrapbook.readFileAsDataURL(blob);
-              }
-              resourceMap.set(fullUrl, file);
-              return file;
+              await uploadFile(target, file);
             } catch (ex) {
               console.error(ex);
-              capturer.warn(`Unable to internalize resource "${scrapbook.crop(url, 256)}": ${ex.message}`);
+              capturer.error(scrapbook.lang("ErrorSaveUploadFailure", [target, ex.message]));
+
+              // keep the original URL
+              for (const task of resourceMap.values()) {
+                if (task.file?.name === file.name) {
+                  task.file = null;
+                  for (const ref of task.refs) {
+                    ref.file = null;
+                  }
+                }
+              }
             }
-          };
-
-          for (const [uuid, url] of Object.entries(data.resources)) {
-            const file = await fetchResource(url);
-            data.resources[uuid] = {url, file};
-          }
+            progress();
+          });
         }
+
+        capturer.log(`Internalized ${[...resourceMap.values()].filter(x => x.file).length} resource(s)`);
       }
 
       // documents
-      for (const [fileUrl, data] of Object.entries(response)) {
+      let mainFrameError;
+      await capturer.runWorkers(Object.entries(response), uploadWorkers, async ([fileUrl, data]) => {
         try {
           const target = scrapbook.splitUrl(fileUrl)[0];
 
@@ -2131,56 +2550,30 @@ capturer.resaveTab = async function ({
               return match;
             });
 
-            await server.request({
-              url: target + '?a=save',
-              method: "POST",
-              format: 'json',
-              csrfToken: true,
-              body: {
-                upload: new Blob([content], {type: blob.type}),
-              },
-            });
+            await uploadFile(target, new Blob([content], {type: blob.type}));
             capturer.log(`Updated ${target}`);
           } catch (ex) {
             console.error(ex);
             throw new Error(scrapbook.lang("ErrorSaveUploadFailure", [target, ex.message]));
           }
 
+          await capturer.markDocumentSaved(changeStatuses.get(fileUrl));
+
           // update item for main document
           if (isMainDocument && url === fileUrl) {
             item.title = data.info.title;
           }
         } catch (ex) {
           if (data.info.isMainFrame) {
-            throw ex;
+            mainFrameError = ex;
           } else {
             capturer.error(ex);
-            continue;
           }
         }
-      }
-
-      // resources
-      for (const [url, file] of resourceMap.entries()) {
-        if (!file) { continue; }
-
-        let target;
-        if (typeof file === 'string') {
-          target = file;
-        } else {
-          target = internalizePrefix + file.name;
-          await server.request({
-            url: target + '?a=save',
-            method: "POST",
-            format: 'json',
-            csrfToken: true,
-            body: {
-              upload: file,
-            },
-          });
-        }
-
-        capturer.log(`Internalized resource: ${scrapbook.crop(target, 256)}`);
+      });
+      capturer.logRetryStats(retryStats);
+      if (mainFrameError) {
+        throw mainFrameError;
       }
 
       // update item
@@ -2224,6 +2617,75 @@ capturer.resaveTab = async function ({
   };
 };
 
+/**
+ * @typedef {Object} documentChangeStatus
+ * @property {boolean} changed
+ * @property {Object[]} frames - frames of the document, with the revision of
+ *     the taken status
+ */
+
+/**
+ * Get whether each document in the frames has been changed since the last
+ * save, as tracked by the editor.
+ *
+ * - A document is taken as changed if any frame of it is changed or cannot
+ *   report its status (e.g. the editor is not loaded).
+ *
+ * @param {Object[]} frames - frames returned by scrapbook.initContentScripts
+ * @return {Promise<Map<string~docUrl, documentChangeStatus>>}
+ */
+capturer.getDocumentChangeStatuses = async function (frames) {
+  const rv = new Map();
+  await Promise.all(frames.map(async ({tabId, frameId, url, error}) => {
+    let status;
+    if (!error) {
+      try {
+        status = await scrapbook.invokeContentScript({
+          tabId, frameId,
+          cmd: "editor.changeTracker.getStatus",
+          args: {},
+        });
+      } catch (ex) {
+        // editor not loaded
+      }
+    }
+
+    const docUrl = scrapbook.normalizeUrl(scrapbook.splitUrl(status?.url || url)[0]);
+    let entry = rv.get(docUrl);
+    if (!entry) {
+      entry = {changed: false, frames: []};
+      rv.set(docUrl, entry);
+    }
+    if (!status || status.changed) {
+      entry.changed = true;
+    }
+    if (status) {
+      entry.frames.push({tabId, frameId, revision: status.revision});
+    }
+  }));
+  return rv;
+};
+
+/**
+ * Confirm to the editor of each frame that a document has been saved.
+ *
+ * @param {documentChangeStatus} [status]
+ */
+capturer.markDocumentSaved = async function (status) {
+  if (!status) { return; }
+  await Promise.all(status.frames.map(async ({tabId, frameId, revision}) => {
+    try {
+      await scrapbook.invokeContentScript({
+        tabId, frameId,
+        cmd: "editor.changeTracker.markSaved",
+        args: {revision},
+      });
+    } catch (ex) {
+      console.error(ex);
+    }
+  }));
+};
+
 /**
  * @param {Object} params
  * @return {Promise<captureDocumentResponse>}
@@ -2510,8 +2972,10 @@ capturer.recapture = async function ({
           insertInfoBar: !!newDoc.querySelector('script[data-scrapbook-elem="infobar-loader"]'),
         });
 
-        const content = scrapbook.documentToString(newDoc, options["capture.prettyPrint"]);
-        const blob = new Blob([content], {type: "text/html"});
+        const blob = scrapbook.documentToBlob(newDoc, {
+          pretty: options["capture.prettyPrint"],
+          type: "text/html",
+        });
         await server.request({
           url: newIndexUrl + '?a=save',
           method: "POST",
@@ -2758,8 +3222,9 @@ capturer.getRegisterToken = function (url, role) {
     // invalid URL
     return null;
   }
+  // register tokens are recorded in the sitemap, and must be kept SHA-1
   let token = `${url}\t${role}`;
-  token = scrapbook.sha1(token, "TEXT");
+  token = scrapbook.sha1Memo(token);
   return token;
 };
 
@@ -3200,13 +3665,13 @@ capturer.saveDocument = async function (params) {
 
   const downloadBlob = async () => {
     const blob = await capturer.loadBlobCache(data.blob);
-    return await capturer.downloadBlob({
+    return await capturer.timePhase(settings.timeId, 'save', () => capturer.downloadBlob({
       blob,
       filename: documentFileName,
       sourceUrl,
       settings,
       options,
-    });
+    }));
   };
 
   if (!(isMainPage && isMainFrame)) {
@@ -3217,7 +3682,9 @@ capturer.saveDocument = async function (params) {
     await downloadBlob();
   }
 
-  return capturer.saveMainDocument({data, sourceUrl, documentFileName, settings, options});
+  return capturer.timePhase(settings.timeId, 'finalize', () => {
+    return capturer.saveMainDocument({data, sourceUrl, documentFileName, settings, options});
+  });
 };
 
 /**
@@ -3337,32 +3804,22 @@ Redirecting to <a href="${scrapbook.escapeHtml(target)}">${scrapbook.escapeHtml(
       case 'server': {
         targetDir = settings.indexFilename;
 
-        let workers = options["capture.serverUploadWorkers"];
-        if (!(workers >= 1)) { workers = Infinity; }
-        workers = Math.min(workers, entries.length);
-
-        let taskIdx = 0;
-        const runTask = async () => {
-          while (taskIdx < entries.length) {
-            const [path, sourceUrl, blob] = entries[taskIdx++];
-            try {
-              await capturer.saveBlobToServer({
-                timeId,
-                blob,
-                directory: targetDir,
-                filename: path,
-                settings,
-                options,
-              });
-            } catch (ex) {
-              // show message for individual saving error
-              console.error(ex);
-              capturer.error(scrapbook.lang("ErrorFileSaveError", [sourceUrl, path, ex.message]));
-            }
+        await capturer.runWorkers(entries, options["capture.serverUploadWorkers"], async ([path, sourceUrl, blob]) => {
+          try {
+            await capturer.saveBlobToServer({
+              timeId,
+              blob,
+              directory: targetDir,
+              filename: path,
+              settings,
+              options,
+            });
+          } catch (ex) {
+            // show message for individual saving error
+            console.error(ex);
+            capturer.error(scrapbook.lang("ErrorFileSaveError", [sourceUrl, path, ex.message]));
           }
-        };
-
-        await Promise.all(Array.from({length: workers}, () => runTask()));
+        });
 
         capturer.log(`Saved to "${targetDir}"`);
 
@@ -3434,7 +3891,11 @@ Redirecting to <a href="${scrapbook.escapeHtml(target)}">${scrapbook.escapeHtml(
     await capturer.captureLinkedPages({settings, options});
 
     capturer.log('Rebuilding links...');
-    await capturer.rebuildLinks({timeId, options});
+    await capturer.timePhase(timeId, 'rebuildLinks', () => capturer.rebuildLinks({
+      timeId,
+      options,
+      mode: options["capture.rebuildLinksMode"],
+    }));
     await capturer.dumpSiteMap({timeId, path: sitemapPath});
   }
 
@@ -3622,13 +4083,13 @@ capturer.downloadFile = async function (params) {
     blob = new Blob([blob], {type: `${blob.type};charset=${charset}`});
   }
 
-  return await capturer.downloadBlob({
+  return await capturer.timePhase(settings.timeId, 'save', () => capturer.downloadBlob({
     blob,
     filename: registry.filename,
     sourceUrl,
     settings,
     options,
-  });
+  }));
 };
 
 /**
@@ -3897,6 +4358,29 @@ capturer.saveUrl = async function (params) {
   });
 };
 
+/**
+ * List filenames in a directory of the backend server.
+ *
+ * @param {string} url - URL of the directory, which may be in an archive
+ *     file (e.g. "<file>!/")
+ * @return {Promise<Set<string>>} an empty set if the directory is not
+ *     listable
+ */
+capturer.listServerDirectory = async function (url) {
+  try {
+    const response = await server.request({
+      url: url + '?a=list',
+      method: "GET",
+      format: 'json',
+    });
+    const {data} = await response.json();
+    return new Set(data.map(file => file.name));
+  } catch (ex) {
+    // directory not exist
+    return new Set();
+  }
+};
+
 /**
  * @param {Object} params
  * @param {string} params.timeId
@@ -3920,33 +4404,27 @@ capturer.saveBlobToServer = async function (params) {
   const target = server.books[server.bookId].dataUrl +
     scrapbook.escapeFilename((directory ? directory + '/' : '') + newFilename);
 
+  const startTime = performance.now();
   try {
-    const retryCount = options["capture.serverUploadRetryCount"];
-    const retryDelay = options["capture.serverUploadRetryDelay"];
-    let tried = 0;
-    while (true) {
-      try {
-        await server.request({
-          url: target + '?a=save',
-          method: "POST",
-          format: 'json',
-          csrfToken: true,
-          body: {
-            upload: blob,
-          },
-        });
-        break;
-      } catch (ex) {
-        if (tried++ < retryCount) {
-          console.error(`Upload failed for "${target}" (tried ${tried}): ${ex.message}`);
-          await scrapbook.delay(retryDelay);
-        } else {
-          throw ex;
-        }
-      }
-    }
+    await capturer.retry(() => server.request({
+      url: target + '?a=save',
+      method: "POST",
+      format: 'json',
+      csrfToken: true,
+      body: {
+        upload: blob,
+      },
+    }), {
+      name: `Upload to "${target}"`,
+      stats: capturer.retryStats.get(timeId),
+      url: target,
+      retryCount: options["capture.serverUploadRetryCount"],
+      retryDelay: options["capture.serverUploadRetryDelay"],
+    });
   } catch (ex) {
     throw new Error(`Unable to upload to backend server: ${ex.message}`);
+  } finally {
+    capturer.recordTiming(timeId, 'upload', startTime);
   }
 
   return newFilename;
@@ -4015,6 +4493,11 @@ capturer.captureLinkedPages = async function (params) {
  * @param {Object} params
  * @param {string} params.timeId
  * @param {captureOptions} params.options
+ * @param {string} [params.mode] - "dom" to rewrite through a parsed DOM;
+ *   "stream" to rewrite through a streaming tokenizer, which keeps the
+ *   source unchanged except for the rewritten attributes, and is applied
+ *   only to UTF-8 HTML files. Default: "stream" for large UTF-8 HTML files
+ *   and "dom" otherwise.
  */
 capturer.rebuildLinks = async function (params) {
   const rewriteUrl = (url, filenameMap, redirects) => {
@@ -4106,7 +4589,310 @@ capturer.rebuildLinks = async function (params) {
     }
   };
 
-  const rebuildLinks = capturer.rebuildLinks = async ({timeId, options}) => {
+  /**
+   * Decode character references in a raw attribute value.
+   *
+   * - Let the HTML parser decode it, which follows the rules for an
+   *   attribute value, e.g. "&section=" is not decoded as "&sect" + "ion=".
+   */
+  const decodeAttr = (() => {
+    let template;
+    return (str) => {
+      if (!str.includes('&')) {
+        return str;
+      }
+      template = template || document.createElement('template');
+      template.innerHTML = `<a title="${str.replace(/"/g, '&quot;')}"></a>`;
+      return template.content.firstChild.getAttribute('title');
+    };
+  })();
+
+  const escapeAttr = (str) => {
+    return str
+      .replace(/&/g, '&amp;')
+      .replace(/"/g, '&quot;')
+      .replace(/\u00A0/g, '&nbsp;')
+      .replace(/</g, '&lt;')
+      .replace(/>/g, '&gt;');
+  };
+
+  /**
+   * A streaming tokenizer that rewrites links in HTML source text.
+   *
+   * - Rewrites the same links as processRootNode.
+   * - Text that may contain an incomplete token is retained until more text
+   *   is written or end() is called.
+   */
+  class HtmlLinkRewriter {
+    constructor(filenameMap, redirects) {
+      this.filenameMap = filenameMap;
+      this.redirects = redirects;
+      this.buffer = '';
+      this.rawTextTag = null;
+      this.foreignTag = null;
+      this.foreignDepth = 0;
+    }
+
+    static rewrite(text, filenameMap, redirects) {
+      const rewriter = new HtmlLinkRewriter(filenameMap, redirects);
+      return rewriter.write(text) + rewriter.end();
+    }
+
+    write(text) {
+      this.buffer += text;
+      return this.process(false);
+    }
+
+    end() {
+      return this.process(true);
+    }
+
+    process(final) {
+      const {buffer} = this;
+      const output = [];
+      let pos = 0;
+      let m;
+
+      while (pos < buffer.length) {
+        if (this.rawTextTag) {
+          if (this.rawTextTag === 'plaintext') {
+            output.push(buffer.slice(pos));
+            pos = buffer.length;
+            break;
+          }
+
+          const regex = new RegExp(`</${this.rawTextTag}[\\t\\n\\f\\r />]`, 'ig');
+          regex.lastIndex = pos;
+          if (m = regex.exec(buffer)) {
+            output.push(buffer.slice(pos, m.index));
+            pos = m.index;
+            this.rawTextTag = null;
+            continue;
+          }
+
+          // retain the text that may be the start of the end tag
+          const end = final ? buffer.length : Math.max(pos, buffer.length - this.rawTextTag.length - 2);
+          output.push(buffer.slice(pos, end));
+          pos = end;
+          break;
+        }
+
+        const lt = buffer.indexOf('<', pos);
+        if (lt === -1) {
+          output.push(buffer.slice(pos));
+          pos = buffer.length;
+          break;
+        }
+        output.push(buffer.slice(pos, lt));
+        pos = lt;
+
+        // comment, CDATA, doctype, and bogus comment
+        let endMark = null;
+        if (buffer.startsWith('<!--', pos)) {
+          endMark = '-->';
+        } else if (this.foreignTag && buffer.startsWith('<![CDATA[', pos)) {
+          endMark = ']]>';
+        } else if (/^<[!?]/.test(buffer.slice(pos, pos + 2))) {
+          endMark = '>';
+        }
+        if (endMark) {
+          const idx = buffer.indexOf(endMark, pos + 2);
+          if (idx === -1) {
+            if (!final) { break; }
+            output.push(buffer.slice(pos));
+            pos = buffer.length;
+            break;
+          }
+          const end = idx + endMark.length;
+          output.push(buffer.slice(pos, end));
+          pos = end;
+          continue;
+        }
+
+        // start or end tag
+        const regexTag = /<(\/?)([A-Za-z][^\t\n\f\r />]*)((?:[^>"']|"[^"]*"|'[^']*')*)>/y;
+        regexTag.lastIndex = pos;
+        if (m = regexTag.exec(buffer)) {
+          output.push(this.processTag(m[0], m[1], m[2].toLowerCase(), m[3]));
+          pos = regexTag.lastIndex;
+          continue;
+        }
+
+        // possibly an incomplete tag
+        if (!final && /<\/?(?:[A-Za-z](?:[^>"']|"[^"]*"|'[^']*')*(?:"[^"]*|'[^']*)?)?$/y.test(buffer.slice(pos))) {
+          break;
+        }
+
+        output.push('<');
+        pos += 1;
+      }
+
+      this.buffer = buffer.slice(pos);
+      return output.join('');
+    }
+
+    processTag(source, slash, name, attrsText) {
+      if (slash) {
+        if (this.foreignTag === name && --this.foreignDepth === 0) {
+          this.foreignTag = null;
+        }
+        return source;
+      }
+
+      const selfClosing = /\/[\t\n\f\r ]*$/.test(attrsText);
+      const attrs = new Map();
+      const regexAttr = /([^\t\n\f\r />][^\t\n\f\r />=]*)(?:[\t\n\f\r ]*=[\t\n\f\r ]*(?:"([^"]*)"|'([^']*)'|([^\t\n\f\r >]*)))?/g;
+      let m;
+      while (m = regexAttr.exec(attrsText)) {
+        const attr = m[1].toLowerCase();
+        if (attrs.has(attr)) { continue; }
+        const raw = m[2] ?? m[3] ?? m[4] ?? '';
+        attrs.set(attr, {
+          start: m.index,
+          end: regexAttr.lastIndex,
+          get value() {
+            // decode lazily as most attributes are not checked
+            const value = decodeAttr(raw);
+            Object.defineProperty(this, 'value', {value});
+            return value;
+          },
+        });
+      }
+
+      const {filenameMap, redirects} = this;
+      const changes = [];
+      const rewriteAttr = (attr, fn) => {
+        const info = attrs.get(attr);
+        if (!info) { return; }
+        const newValue = fn(info.value);
+        if (newValue === null || newValue === info.value) { return; }
+        changes.push({attr, info, newValue});
+      };
+      const rewriteHref = (value) => rewriteUrl(value, filenameMap, redirects);
+      const rewriteHtml = (value) => HtmlLinkRewriter.rewrite(value, filenameMap, redirects);
+
+      switch (this.foreignTag) {
+        case 'svg': {
+          if (name === 'a') {
+            for (const attr of REBUILD_LINK_SVG_HREF_ATTRS) {
+              rewriteAttr(attr, rewriteHref);
+            }
+          }
+          break;
+        }
+        case 'math': {
+          rewriteAttr('href', rewriteHref);
+          break;
+        }
+        default: {
+          switch (name) {
+            case 'a':
+            case 'area': {
+              if (attrs.has('download')) { break; }
+              rewriteAttr('href', rewriteHref);
+              break;
+            }
+            case 'meta': {
+              if (attrs.get('http-equiv')?.value.toLowerCase() !== 'refresh') { break; }
+              rewriteAttr('content', (value) => {
+                const {time, url} = scrapbook.parseHeaderRefresh(value);
+                if (!url) { return null; }
+                const newUrl = rewriteHref(url);
+                if (!newUrl) { return null; }
+                return `${time}; url=${newUrl}`;
+              });
+              break;
+            }
+            case 'iframe': {
+              rewriteAttr('srcdoc', rewriteHtml);
+              break;
+            }
+          }
+          rewriteAttr('data-scrapbook-shadowdom', rewriteHtml);
+          break;
+        }
+      }
+
+      // update foreign content and raw text state
+      if (this.foreignTag) {
+        if (name === this.foreignTag && !selfClosing) {
+          this.foreignDepth++;
+        }
+      } else if (name === 'svg' || name === 'math') {
+        if (!selfClosing) {
+          this.foreignTag = name;
+          this.foreignDepth = 1;
+        }
+      } else if (REBUILD_LINK_RAW_TEXT_ELEMENTS.has(name)) {
+        this.rawTextTag = name;
+      }
+
+      if (!changes.length) {
+        return source;
+      }
+
+      changes.sort((a, b) => b.info.start - a.info.start);
+      for (const {attr, info, newValue} of changes) {
+        attrsText = attrsText.slice(0, info.start) +
+            `${attr}="${escapeAttr(newValue)}"` +
+            attrsText.slice(info.end);
+      }
+      return `<${source.slice(1, 1 + name.length)}${attrsText}>`;
+    }
+  }
+
+  const rebuildLinksDom = async ({blob, filenameMap, redirects, options}) => {
+    const doc = await scrapbook.readFileAsDocument(blob);
+    if (!doc) {
+      return null;
+    }
+
+    processRootNode(doc.documentElement, filenameMap, redirects);
+
+    return scrapbook.documentToBlob(doc, {
+      pretty: options["capture.prettyPrint"],
+      type: blob.type,
+    });
+  };
+
+  const rebuildLinksStream = async ({blob, filenameMap, redirects, options}) => {
+    const rewriter = new HtmlLinkRewriter(filenameMap, redirects);
+    const parts = [];
+    const reader = blob.stream().pipeThrough(new TextDecoderStream()).getReader();
+
+    // split the text into chunks of the specified size, mainly for testing
+    const chunkSize = parseInt(options["capture.rebuildLinksChunkSize"], 10);
+
+    while (true) {
+      const {done, value} = await reader.read();
+      if (done) { break; }
+      if (chunkSize > 0) {
+        for (let i = 0, I = value.length; i < I; i += chunkSize) {
+          parts.push(rewriter.write(value.slice(i, i + chunkSize)));
+        }
+        continue;
+      }
+      parts.push(rewriter.write(value));
+    }
+    parts.push(rewriter.end());
+    return new Blob(parts, {type: blob.type});
+  };
+
+  const getRebuildLinksMode = (blob, mode) => {
+    const {type, parameters: {charset}} = scrapbook.parseHeaderContentType(blob.type);
+    if (type !== 'text/html') {
+      return 'dom';
+    }
+    if (charset && !/^utf-?8$/i.test(charset)) {
+      return 'dom';
+    }
+    if (mode) {
+      return mode;
+    }
+    return blob.size >= REBUILD_LINK_STREAM_MIN_SIZE ? 'stream' : 'dom';
+  };
+
+  const rebuildLinks = capturer.rebuildLinks = async ({timeId, options, mode}) => {
     const {files, filenameMap, redirects} = capturer.captureInfo.get(timeId);
 
     for (const [filename, {path, role, blob}] of files) {
@@ -4118,19 +4904,19 @@ capturer.rebuildLinks = async function (params) {
         continue;
       }
 
-      const doc = await scrapbook.readFileAsDocument(blob);
-      if (!doc) {
+      const fileMode = getRebuildLinksMode(blob, mode);
+      const newBlob = fileMode === 'stream' ?
+          await rebuildLinksStream({blob, filenameMap, redirects, options}) :
+          await rebuildLinksDom({blob, filenameMap, redirects, options});
+      if (!newBlob) {
         capturer.warn(`Failed to rebuild links for file ${filename}: corrupted document.`);
         continue;
       }
 
-      processRootNode(doc.documentElement, filenameMap, redirects);
-
-      const content = scrapbook.documentToString(doc, options["capture.prettyPrint"]);
       await capturer.saveFileCache({
         timeId,
         path,
-        blob: new Blob([content], {type: blob.type}),
+        blob: newBlob,
       });
     }
   };
@@ -4345,6 +5131,10 @@ scrapbook.addMessageListener((message, sender) => {
   return true;
 });
 
+scrapbook.addPortListener((port) => {
+  return port.name === `capturer:${capturer.missionId}`;
+});
+
 browser.downloads.onCreated.addListener((downloadItem) => {
   isDebug && console.debug("downloads.onCreated", downloadItem);
 
@@ -4413,6 +5203,9 @@ const capturePromise = new Promise((resolve, reject) => {
   // use missionId provided from URL params to read task data
   const missionId = capturer.missionId = s.get('mid');
 
+  // number of resumes of the mission when this page is opened
+  const resumes = parseInt(s.get('resume'), 10) || 0;
+
   const closeWindow = async () => {
     await scrapbook.delay(1000);
 
@@ -4437,10 +5230,37 @@ const capturePromise = new Promise((resolve, reject) => {
       }
 
       const key = {table: "captureMissionCache", id: missionId};
-      const taskInfo = await scrapbook.cache.get(key);
+      let taskInfo = await scrapbook.cache.get(key);
       await scrapbook.cache.remove(key);
+
+      let checkpoint = null;
+      if (taskInfo) {
+        // the result of a capture to memory is returned to the invoker and
+        // cannot be resumed
+        if (scrapbook.getOption("capture.resumeMissions") &&
+            Object.assign(await scrapbook.getOptions("capture"), taskInfo.options)["capture.saveTo"] !== "memory") {
+          checkpoint = {taskInfo, completed: 0, results: []};
+        }
+      } else {
+        // resume an interrupted mission
+        checkpoint = await capturer.loadMissionCheckpoint();
+        if (checkpoint && (checkpoint.resumes || 0) !== resumes) {
+          // the mission has been resumed by another capturer page, e.g. when
+          // this page is restored by the browser after the background script
+          // has resumed the mission
+          capturer.missionSuperseded = true;
+          capturer.error(`Error: mission "${missionId}" is run by another capturer page.`);
+          break runTasks;
+        }
+        if (checkpoint) {
+          ({taskInfo} = checkpoint);
+          capturer.log(`Resuming interrupted mission (${checkpoint.completed}/${taskInfo.tasks.length} tasks done)...`);
+        }
+      }
+
       if (!taskInfo || !taskInfo.tasks) {
         capturer.error(`Error: missing task data for mission "${missionId}".`);
+        await capturer.removeMissionCheckpoint();
         break runTasks;
       }
 
@@ -4453,12 +5273,25 @@ const capturePromise = new Promise((resolve, reject) => {
         break runTasks;
       }
 
+      // keep the heartbeat during a long task so that the mission is not
+      // taken as interrupted
+      const heartbeat = checkpoint && setInterval(() => {
+        capturer.saveMissionCheckpoint(checkpoint).catch((ex) => {
+          console.error(ex);
+        });
+      }, MISSION_HEARTBEAT_INTERVAL);
+
       try {
-        results = await capturer.runTasks(taskInfo);
+        results = await capturer.runTasks(taskInfo, checkpoint);
       } catch (ex) {
         console.error(ex);
         capturer.error(`Unexpected error: ${ex.message}`);
         break runTasks;
+      } finally {
+        if (checkpoint) {
+          clearInterval(heartbeat);
+          await capturer.removeMissionCheckpoint();
+        }
       }
     }
 
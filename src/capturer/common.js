@@ -110,7 +110,8 @@ const capturer = {};
  * Invoke an invokable capturer method from another script.
  *
  * - To invoke a background script, provide details.missionId or
- *   args.settings.missionId.
+ *   args.settings.missionId. The call is sent through the Port of the
+ *   mission, which batches the burst of calls for resources.
  * - To invoke a content script method in a frame, provide
  *   details.frameWindow.
  *
@@ -136,7 +137,93 @@ capturer.invoke = async function (method, args, details = {}) {
       throw new Error(`missionId is required to invoke from a content script.`);
     }
     const cmd = "capturer." + method;
-    return await scrapbook.invokeExtensionScript({id, cmd, args});
+    return await scrapbook.invokeExtensionPort({name: `capturer:${id}`, cmd, args});
+  }
+};
+
+/**
+ * @typedef {Object} captureTiming
+ * @property {number} time - total elapsed time (ms)
+ * @property {integer} count - number of runs
+ */
+
+/**
+ * Timings of capture phases run in this script.
+ *
+ * - Time of a phase includes time of any phase nested in it.
+ * - Time of concurrent runs of a phase are summed up, and may exceed the
+ *   overall elapsed time.
+ *
+ * @type {MapWithDefault<string~timeId, Map<string~phase, captureTiming>>}
+ */
+capturer.timings = new MapWithDefault(() => new Map());
+
+/**
+ * Record a run of a capture phase.
+ *
+ * @param {string} timeId
+ * @param {string} phase
+ * @param {number} startTime - a timestamp from performance.now()
+ */
+capturer.recordTiming = function (timeId, phase, startTime) {
+  const timings = capturer.timings.get(timeId);
+  let timing = timings.get(phase);
+  if (!timing) {
+    timing = {time: 0, count: 0};
+    timings.set(phase, timing);
+  }
+  timing.time += performance.now() - startTime;
+  timing.count++;
+};
+
+/**
+ * Run a capture phase and record its timing.
+ *
+ * @param {string} timeId
+ * @param {string} phase
+ * @param {Function} callback
+ * @return {Promise<*>} the return value of callback
+ */
+capturer.timePhase = async function (timeId, phase, callback) {
+  const startTime = performance.now();
+  try {
+    return await callback();
+  } finally {
+    capturer.recordTiming(timeId, phase, startTime);
+  }
+};
+
+/**
+ * Take and clear the recorded timings for a capture.
+ *
+ * @param {string} timeId
+ * @return {Object<string~phase, captureTiming>}
+ */
+capturer.takeTimings = function (timeId) {
+  const rv = Object.fromEntries(capturer.timings.get(timeId));
+  capturer.timings.delete(timeId);
+  return rv;
+};
+
+/**
+ * Add timings recorded elsewhere, e.g. in a content script.
+ *
+ * @type invokable
+ * @memberof capturer
+ * @param {Object} params
+ * @param {Object<string~phase, captureTiming>} params.timings
+ * @param {captureSettings} params.settings
+ */
+capturer.addTimings = function ({timings, settings}) {
+  const target = capturer.timings.get(settings.timeId);
+  for (const [phase, {time, count}] of Object.entries(timings)) {
+    const timing = target.get(phase);
+    if (timing) {
+      timing.time += time;
+      timing.count += count;
+    } else {
+      target.set(phase, {time, count});
+    }
   }
 };
 
@@ -372,12 +459,15 @@ capturer.captureDocument = async function (params) {
   // since cloned nodes may lose some information,
   // e.g. cloned iframes has no content, cloned canvas has no image,
   // and cloned form elements has no current status.
+  // Only elements are looked up by the rewriters, so skip mapping other
+  // descendant nodes to save time and memory for a large document.
   const cloneNodeMapping = (node, deep = false) => {
     return scrapbook.cloneNode(node, deep, {
       newDoc,
       origNodeMap,
       clonedNodeMap,
       includeShadowDom: options["capture.shadowDom"] === "save",
+      whatToShow: NodeFilter.SHOW_ELEMENT,
     });
   };
 
@@ -761,7 +851,7 @@ capturer.captureDocument = async function (params) {
             case "link":
             default: {
               tasks.push(async () => {
-                await cssHandler.rewriteCss({
+                await capturer.timePhase(timeId, 'css', () => cssHandler.rewriteCss({
                   elem,
                   baseUrl: baseUrlCurrent,
                   refUrl,
@@ -772,7 +862,7 @@ capturer.captureDocument = async function (params) {
                     // escape </style> as textContent can contain HTML
                     captureRewriteTextContent(elem, response.cssText.replace(/<\/(style>)/gi, "<\\/$1"));
                   },
-                });
+                }));
               });
               break;
             }
@@ -1026,7 +1116,7 @@ capturer.captureDocument = async function (params) {
                   break;
                 }
                 tasks.push(async () => {
-                  await cssHandler.rewriteCss({
+                  await capturer.timePhase(timeId, 'css', () => cssHandler.rewriteCss({
                     elem,
                     baseUrl: baseUrlCurrent,
                     refUrl,
@@ -1037,7 +1127,7 @@ capturer.captureDocument = async function (params) {
                       captureRewriteAttr(elem, "href", response.url);
                       captureRewriteAttr(elem, "charset", null);
                     },
-                  });
+                  }));
                 });
 
                 // remove crossorigin as the origin has changed
@@ -1211,7 +1301,7 @@ capturer.captureDocument = async function (params) {
                 break;
               }
               tasks.push(async () => {
-                await cssHandler.rewriteCss({
+                await capturer.timePhase(timeId, 'css', () => cssHandler.rewriteCss({
                   elem,
                   baseUrl: baseUrlCurrent,
                   refUrl,
@@ -1235,7 +1325,7 @@ capturer.captureDocument = async function (params) {
                       elem.replaceWith(newElem);
                     }
                   },
-                });
+                }));
               });
               break;
             }
@@ -1404,7 +1494,7 @@ capturer.captureDocument = async function (params) {
                   frame.hasAttribute("srcdoc")) {
                 const captureFrameCallback = async (response) => {
                   isDebug && console.debug("captureFrameCallback", response);
-                  const file = scrapbook.dataUriToFile(response.url);
+                  const file = await scrapbook.dataUriToFile(response.url);
                   const content = await scrapbook.readFileAsText(file);
                   captureRewriteAttr(frame, "srcdoc", content);
                   return response;
@@ -1494,7 +1584,7 @@ capturer.captureDocument = async function (params) {
                 if (response.url.startsWith('data:') &&
                     frame.nodeName.toLowerCase() === 'iframe' &&
                     options["capture.saveDataUriAsSrcdoc"]) {
-                  const file = scrapbook.dataUriToFile(response.url);
+                  const file = await scrapbook.dataUriToFile(response.url);
                   const {type: mime, parameters: {charset}} = scrapbook.parseHeaderContentType(file.type);
                   if (mime === "text/html") {
                     // assume the charset is UTF-8 if not defined
@@ -2991,6 +3081,7 @@ capturer.captureDocument = async function (params) {
   const customElementNames = new Set();
 
   // create a new document to replicate nodes via import
+  let startTime = performance.now();
   const newDoc = scrapbook.cloneDocument(doc, {origNodeMap, clonedNodeMap});
 
   let rootNode, headNode;
@@ -3210,6 +3301,7 @@ capturer.captureDocument = async function (params) {
   for (const elem of rootNode.querySelectorAll(`[data-scrapbook-elem|="toolbar"]`)) {
     elem.remove();
   }
+  capturer.recordTiming(timeId, 'clone', startTime);
 
   // preprocess with helpers
   // Expect options["capture.helpers"] to be parsable when
@@ -3291,8 +3383,10 @@ capturer.captureDocument = async function (params) {
   let metaCharsetNode;
   let favIconUrl;
   let requireBasicLoader = false;
+  startTime = performance.now();
   addAdoptedStyleSheets(doc, rootNode);
   rewriteRecursively(rootNode, null, rewriteNode);
+  capturer.recordTiming(timeId, 'inspect', startTime);
 
   // record metadata
   if (options["capture.recordDocumentMeta"]) {
@@ -3441,6 +3535,7 @@ capturer.captureDocument = async function (params) {
   }
 
   // run async downloading tasks
+  startTime = performance.now();
   if (options["capture.saveResourcesSequentially"]) {
     await tasks.reduce((prevTask, curTask) => {
       return prevTask.then(curTask);
@@ -3448,6 +3543,7 @@ capturer.captureDocument = async function (params) {
   } else {
     await Promise.all(tasks.map(task => task()));
   }
+  capturer.recordTiming(timeId, 'resources', startTime);
 
   // run downLink tasks sequentially
   await downLinkTasks.reduce((prevTask, curTask) => {
@@ -3509,8 +3605,23 @@ capturer.captureDocument = async function (params) {
   });
 
   // save document
-  const content = scrapbook.documentToString(newDoc, options["capture.prettyPrint"]);
-  const blob = new Blob([content], {type: `${mime};charset=UTF-8`});
+  startTime = performance.now();
+  const blob = scrapbook.documentToBlob(newDoc, {
+    pretty: options["capture.prettyPrint"],
+    type: `${mime};charset=UTF-8`,
+  });
+  capturer.recordTiming(timeId, 'serialize', startTime);
+
+  // report timings of this document
+  if (options["capture.recordTimings"]) {
+    await capturer.invoke("addTimings", {
+      timings: capturer.takeTimings(timeId),
+      settings, // for missionId
+    });
+  } else {
+    capturer.timings.delete(timeId);
+  }
+
   const response = await capturer.saveDocument({
     sourceUrl: capturer.getRedirectedUrl(docUrl, docUrlHash),
     documentFileName,
@@ -3555,6 +3666,9 @@ capturer.captureDocument = async function (params) {
  * @param {Object} params
  * @param {Document} [params.doc]
  * @param {boolean} [params.internalize]
+ * @param {string[]} [params.unchangedUrls] - URLs of documents not changed
+ *     since the last save, which are skipped if nothing else requires a
+ *     refresh
  * @param {boolean} params.isMainPage
  * @param {Object} params.item
  * @param {captureOptions} params.options
@@ -3563,26 +3677,38 @@ capturer.captureDocument = async function (params) {
 capturer.retrieveDocumentContent = async function (params) {
   isDebug && console.debug("call: retrieveDocumentContent", params);
 
-  const {doc = document, internalize = false, isMainPage, item, options} = params;
+  const {doc = document, internalize = false, unchangedUrls = [], isMainPage, item, options} = params;
+
+  const unchangedUrlSet = new Set(unchangedUrls);
+  const skippedUrls = new Set();
 
   const data = {};
   const docs = scrapbook.flattenFrames(doc);
   for (let i = 0, I = docs.length; i < I; i++) {
     const doc = docs[i];
     const docUrl = scrapbook.normalizeUrl(scrapbook.splitUrl(doc.URL)[0]);
-    if (docUrl in data) { continue; }
+    if (docUrl in data || skippedUrls.has(docUrl)) { continue; }
 
     // skip non-HTML documents
     if (!["text/html", "application/xhtml+xml"].includes(doc.contentType)) {
       continue;
     }
 
+    // skip unchanged documents
+    if (unchangedUrlSet.has(docUrl) && !capturer.isDocumentRefreshRequired(doc, {
+      deleteErased: options["capture.deleteErasedOnSave"],
+    })) {
+      skippedUrls.add(docUrl);
+      continue;
+    }
+
     const cloneNodeMapping = (node, deep = false) => {
       return scrapbook.cloneNode(node, deep, {
         newDoc,
         origNodeMap,
         clonedNodeMap,
         includeShadowDom: true,
+        whatToShow: NodeFilter.SHOW_ELEMENT,
       });
     };
 
@@ -3914,8 +4040,10 @@ capturer.retrieveDocumentContent = async function (params) {
       insertInfoBar: options["capture.insertInfoBar"],
     });
 
-    const content = scrapbook.documentToString(newDoc, options["capture.prettyPrint"]);
-    let blob = new Blob([content], {type: `${mime};charset=${charset}`});
+    let blob = scrapbook.documentToBlob(newDoc, {
+      pretty: options["capture.prettyPrint"],
+      type: `${mime};charset=${charset}`,
+    });
     blob = await capturer.saveBlobCache(blob);
 
     data[docUrl] = {
@@ -3927,6 +4055,37 @@ capturer.retrieveDocumentContent = async function (params) {
   return data;
 };
 
+/**
+ * Check whether a document not changed since the last save still requires a
+ * resave.
+ *
+ * @param {Document} doc
+ * @param {Object} params
+ * @param {boolean} params.deleteErased
+ * @return {boolean}
+ */
+capturer.isDocumentRefreshRequired = function (doc, {deleteErased}) {
+  // title elements are synced with the item title, which may be changed
+  // elsewhere
+  if (doc.querySelector('[data-scrapbook-elem="title"], [data-scrapbook-elem="title-src"]')) {
+    return true;
+  }
+
+  // erased nodes are to be deleted
+  if (deleteErased) {
+    const nodeIterator = doc.createNodeIterator(
+      doc,
+      NodeFilter.SHOW_COMMENT,
+      node => scrapbook.getScrapBookObjectRemoveType(node) === 3 ? NodeFilter.FILTER_ACCEPT : NodeFilter.FILTER_REJECT,
+    );
+    if (nodeIterator.nextNode()) {
+      return true;
+    }
+  }
+
+  return false;
+};
+
 /**
  * Process DOM before capture or resave.
  *
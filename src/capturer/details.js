@@ -471,7 +471,7 @@ async function onFillDownLinkDocUrlFilterChange(event) {
             if (!Number.isInteger(tabId)) {
               throw new Error('Missing tabId');
             }
-            await scrapbook.initContentScripts(tabId, frameId);
+            await scrapbook.initContentScripts(tabId, frameId, {modules: ['capturer']});
             return await scrapbook.invokeContentScript({tabId, frameId, cmd, args});
           } catch (ex) {
             console.error(ex);
@@ -357,7 +357,7 @@ background.invokeEditorCommand = async function ({cmd, args, frameId = -1, frame
     return response;
   } else if (frameIdExcept !== -1) {
     const tasks = Array.prototype.map.call(
-      await scrapbook.initContentScripts(tabId),
+      await scrapbook.initContentScripts(tabId, undefined, {modules: ['editor']}),
       async ({tabId, frameId, error, injected}) => {
         if (error) { return undefined; }
         if (frameId === frameIdExcept) { return undefined; }
@@ -368,7 +368,7 @@ background.invokeEditorCommand = async function ({cmd, args, frameId = -1, frame
     return Promise.all(tasks);
   } else {
     const tasks = Array.prototype.map.call(
-      await scrapbook.initContentScripts(tabId),
+      await scrapbook.initContentScripts(tabId, undefined, {modules: ['editor']}),
       async ({tabId, frameId, error, injected}) => {
         if (error) { return undefined; }
         return await scrapbook.invokeContentScript({
@@ -462,6 +462,24 @@ Object.assign(background.openModalWindow, {
  * @type invokable
  */
 background.onServerTreeChange = async function (params = {}, sender) {
+  capturer.invalidateAutoCaptureSources();
+  return await notifyServerTreeChange(params, sender);
+};
+
+/**
+ * @type invokable
+ * @param {Object} [params]
+ */
+background.onCaptureEnd = async function (params, sender) {
+  background.setCapturedUrls(params);
+
+  // The captured URLs are added incrementally, and the changed tree is
+  // revalidated later, so that auto-capture does not wait for reloading it.
+  capturer.addAutoCaptureSources(params);
+  await notifyServerTreeChange(params, sender);
+};
+
+async function notifyServerTreeChange(params, sender) {
   const tasks = [];
 
   const errorHandler = (ex) => {
@@ -491,16 +509,7 @@ background.onServerTreeChange = async function (params = {}, sender) {
   }
 
   return await Promise.all(tasks);
-};
-
-/**
- * @type invokable
- * @param {Object} [params]
- */
-background.onCaptureEnd = async function (params, sender) {
-  background.setCapturedUrls(params);
-  await background.onServerTreeChange(params, sender);
-};
+}
 
 /**
  * @type invokable
@@ -554,6 +563,9 @@ function initStorageChangeListener() {
     if ("ui.notifyPageCaptured" in changes) {
       capturer.toggleNotifyPageCaptured(); // async
     }
+    if ("server.url" in changes) {
+      capturer.invalidateAutoCaptureSources();
+    }
     if ("autocapture.rules" in changes) {
       capturer.configAutoCapture(); // async
     }
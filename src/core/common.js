@@ -145,6 +145,10 @@ const DEFAULT_OPTIONS = {
   "capture.downloadWorkers": 4,
   "capture.downloadRetryCount": 3,
   "capture.downloadRetryDelay": 1000,
+  "capture.recordTimings": false,
+  "capture.rebuildLinksMode": null, // null, "dom", "stream"
+  "capture.rebuildLinksChunkSize": null,
+  "capture.resumeMissions": true,
   "capture.saveTo": "folder", // "server", "folder", "file", "memory"
   "capture.saveFolder": "WebScrapBook/data",
   "capture.saveAs": "folder", // "folder", "zip", "maff", "singleHtml"
@@ -212,6 +216,8 @@ const DEFAULT_OPTIONS = {
   "autocapture.rules": "",
   "editor.autoInit": true,
   "editor.useNativeTags": false,
+  "editor.undoMaxSteps": 100,
+  "editor.undoMaxOperations": 100000,
   "editor.lineMarker.style.1": "background: #FFFF00; background: linear-gradient(transparent 40%, rgba(255,255,0,0.9) 90%, transparent 100%);",
   "editor.lineMarker.style.2": "background: #00FF00; background: linear-gradient(transparent 40%, rgba(0,255,0,0.9) 90%, transparent 100%);",
   "editor.lineMarker.style.3": "background: #FF0000; background: linear-gradient(transparent 40%, rgba(255,0,0,0.9) 90%, transparent 100%);",
@@ -502,15 +508,41 @@ const CONTENT_SCRIPT_FILES = [
   "/lib/browser-polyfill.js",
   "/lib/mime.js",
   "/lib/sha.js",
-  "/lib/map-with-default.js",
   "/lib/strftime.js",
   "/core/common.js",
   "/core/options-auto.js",
   "/core/content.js",
-  "/capturer/common.js",
-  "/editor/content.js",
 ];
 
+// modules that are loaded on demand after CONTENT_SCRIPT_FILES
+const CONTENT_SCRIPT_MODULES = {
+  capturer: [
+    "/lib/map-with-default.js",
+    "/capturer/common.js",
+  ],
+  editor: [
+    "/editor/content.js",
+  ],
+};
+
+// max number of requests or responses in a batched message through a Port
+const PORT_BATCH_SIZE_MAX = 256;
+
+// max time to wait for an extension page to accept a connected Port
+const PORT_ACCEPT_TIMEOUT = 30000;
+
+// min size of a Blob to be hashed in the hash worker by streaming
+const HASH_WORKER_SIZE_MIN = 32 * 1024 * 1024;
+
+// max number of digests of short strings to memoize
+const HASH_MEMO_SIZE_MAX = 4096;
+
+// max length of a string whose digest is memoized
+const HASH_MEMO_LENGTH_MAX = 2048;
+
+// HTTP status codes of a transient failure, which is worth a retry
+const RETRY_HTTP_STATUSES = new Set([408, 425, 429, 500, 502, 503, 504]);
+
 const HTTP_STATUS_TEXT = {
   // 1××: Informational
   100: "Continue",
@@ -649,6 +681,22 @@ const ANNOTATION_CSS = `\
 
 const ASCII_WHITESPACE = String.raw`\t\n\f\r `;
 
+// elements whose content is serialized as a whole by documentToStringParts
+// (void, raw text, and other elements requiring special serialization)
+const SERIALIZE_NO_DESCEND_ELEMENTS = new Set([
+  "area", "base", "basefont", "bgsound", "br", "col", "embed", "frame", "hr",
+  "img", "input", "keygen", "link", "meta", "param", "source", "track", "wbr",
+  "iframe", "noembed", "noframes", "noscript", "plaintext", "script", "style", "xmp",
+  "listing", "pre", "template", "textarea",
+]);
+
+const SERIALIZE_TEXT_ESCAPE_MAP = {
+  "&": "&amp;",
+  "<": "&lt;",
+  ">": "&gt;",
+  "\u00A0": "&nbsp;",
+};
+
 // https://dom.spec.whatwg.org/#valid-shadow-host-name
 const VALID_SHADOW_HOST_NAMES = new Set([
   "article", "aside", "blockquote", "body", "div", "footer",
@@ -1433,6 +1481,61 @@ scrapbook.loadLanguages = function (...args) {
  * ScrapBook messaging
  ***************************************************************************/
 
+/**
+ * Resolve an invokable command, e.g. "capturer.downloadFile".
+ *
+ * @param {string} cmd
+ * @return {Function} a function to invoke the command with (args, sender)
+ */
+function resolveCommand(cmd) {
+  const parts = cmd.split('.');
+  const subCmd = parts.pop();
+  const object = parts.reduce((object, part) => {
+    return object[part];
+  }, global);
+
+  if (!object || !subCmd || typeof object[subCmd] !== 'function') {
+    throw new Error(`Unable to invoke unknown command '${cmd}'.`);
+  }
+
+  return (args, sender) => object[subCmd](args, sender);
+}
+
+/**
+ * Create a function that queues items to send through a Port, which are
+ * coalesced into a batched message of {[key]: items} for those queued in
+ * the same task.
+ *
+ * @param {Port} port
+ * @param {string} key
+ * @return {Function}
+ */
+function createPortBatcher(port, key) {
+  let queue = [];
+  let timer = null;
+
+  const flush = () => {
+    clearTimeout(timer);
+    timer = null;
+    const items = queue;
+    queue = [];
+    try {
+      port.postMessage({[key]: items});
+    } catch (ex) {
+      // the port has been disconnected
+    }
+  };
+
+  return (item) => {
+    queue.push(item);
+    if (queue.length >= PORT_BATCH_SIZE_MAX) {
+      flush();
+    } else if (!timer) {
+      timer = setTimeout(flush, 0);
+    }
+  };
+}
+
 /**
  * Add a message listener, with optional filter and errorHandler.
  *
@@ -1455,20 +1558,12 @@ scrapbook.addMessageListener = function (filter, errorHandler = ex => {
 
     isDebug && console.debug(cmd, "receive", senderInfo, args);
 
-    const parts = cmd.split('.');
-    const subCmd = parts.pop();
-    const object = parts.reduce((object, part) => {
-      return object[part];
-    }, global);
-
     // thrown Error don't show here but cause the sender to receive an error
-    if (!object || !subCmd || typeof object[subCmd] !== 'function') {
-      throw new Error(`Unable to invoke unknown command '${cmd}'.`);
-    }
+    const fn = resolveCommand(cmd);
 
     return Promise.resolve()
       .then(() => {
-        return object[subCmd](args, sender);
+        return fn(args, sender);
       })
       .catch(errorHandler);
   };
@@ -1476,14 +1571,93 @@ scrapbook.addMessageListener = function (filter, errorHandler = ex => {
   return listener;
 };
 
+/**
+ * Add a listener for Ports connected by scrapbook.invokeExtensionPort, with
+ * optional filter and errorHandler.
+ *
+ * - Each request of a batched message is invoked as soon as received, and
+ *   the response is sent back as soon as it's ready, coalesced with other
+ *   responses ready in the same task.
+ * - The other end is notified when the Port is accepted and when the page
+ *   is closed, as the Port is not disconnected until all listening pages,
+ *   including those ignoring it, are closed.
+ *
+ * @param {Function} [filter] - called with the connected Port, and the Port
+ *   is ignored if it returns falsy. Don't disconnect it, as it may be for
+ *   another listening page, which would be disconnected too.
+ * @param {Function} [errorHandler]
+ * @return {Function}
+ */
+scrapbook.addPortListener = function (filter, errorHandler = ex => {
+  console.error(ex);
+  throw ex;
+}) {
+  const listener = (port) => {
+    if (filter && !filter(port)) {
+      return;
+    }
+
+    const sender = port.sender;
+    const senderInfo = '[' +
+      (sender?.tab ? sender.tab.id : -1) +
+      (typeof sender?.frameId !== 'undefined' ? ':' + sender.frameId : '') +
+      ']';
+
+    const onPageHide = () => {
+      try {
+        port.postMessage({closed: true});
+      } catch (ex) {
+        // the port has been disconnected
+      }
+    };
+    globalThis.addEventListener?.('pagehide', onPageHide);
+
+    let connected = true;
+    port.onDisconnect.addListener(() => {
+      connected = false;
+      globalThis.removeEventListener?.('pagehide', onPageHide);
+    });
+
+    port.postMessage({accepted: true});
+
+    const send = createPortBatcher(port, 'responses');
+
+    port.onMessage.addListener(({requests}) => {
+      isDebug && console.debug("receive batch", senderInfo, requests.length);
+      for (const {id, cmd, args} of requests) {
+        isDebug && console.debug(cmd, "receive", senderInfo, args);
+        Promise.resolve()
+          .then(() => {
+            return resolveCommand(cmd)(args, sender);
+          })
+          .catch(errorHandler)
+          .then((result) => {
+            if (!connected) { return; }
+            send({id, result});
+          }, (ex) => {
+            if (!connected) { return; }
+            send({id, error: {message: ex.message}});
+          });
+      }
+    });
+  };
+  browser.runtime.onConnect.addListener(listener);
+  return listener;
+};
+
 /**
  * Init content scripts in the specified tab.
  *
  * @param {integer} tabId - The tab's ID to init content script.
  * @param {integer} [frameId] - The frame ID to init content script.
- * @return {Promise<Object>}
+ * @param {Object} [options]
+ * @param {string[]} [options.modules] - The content script modules to load,
+ *   e.g. "capturer", "editor". Default to all modules.
+ * @return {Promise<Object[]>}
  */
-scrapbook.initContentScripts = async function (tabId, frameId) {
+scrapbook.initContentScripts = async function (tabId, frameId, {
+  modules = Object.keys(CONTENT_SCRIPT_MODULES),
+} = {}) {
   // Simply run executeScript for allFrames by checking for nonexistence of
   // the content script in the main frame has a potential leak causing only
   // partial frames have the content script loaded. E.g. the user ran this
@@ -1497,50 +1671,63 @@ scrapbook.initContentScripts = async function (tabId, frameId) {
   for (const {frameId, url} of frameIds) {
     if (!scrapbook.isContentPage(url, allowFileAccess)) { continue; }
 
-    // Send a test message to check whether content script is loaded.
-    // If no content script, we get an error saying connection cannot be established.
-    tasks.push(
-      browser.tabs.sendMessage(tabId, {cmd: "core.isScriptLoaded"}, {frameId})
-        .catch(async (ex) => {
-          isDebug && console.debug("inject content scripts", tabId, frameId, url);
-          try {
-            await browser.scripting.executeScript({
-              target: {tabId, frameIds: [frameId]},
-              injectImmediately: true,
-              files: CONTENT_SCRIPT_FILES,
-            });
-            await browser.scripting.executeScript({
-              target: {tabId, frameIds: [frameId]},
-              injectImmediately: true,
-              func: (frameId) => {
-                // eslint-disable-next-line no-undef
-                core.frameId = frameId;
-              },
-              args: [frameId],
-            });
-          } catch (ex) {
-            // Chromium may fail to inject content script to some pages due to unclear reason.
-            // Record the error and pass.
-            console.error(ex);
-            return ex.message;
-          }
-        })
-        .then((response) => {
-          const result = {
-            tabId,
-            frameId,
-            url,
-            injected: true,
-          };
-          if (response === true) {
-            result.injected = false;
-          } else if (typeof response === "string") {
-            result.injected = false;
-            result.error = {message: response};
-          }
-          return result;
-        }),
-    );
+    tasks.push((async () => {
+      const result = {
+        tabId,
+        frameId,
+        url,
+        injected: false,
+      };
+
+      // Send a test message to check which modules are loaded.
+      // If no content script, we get an error saying connection cannot be established.
+      let loadedModules = null;
+      try {
+        loadedModules = await browser.tabs.sendMessage(tabId, {cmd: "core.getLoadedModules"}, {frameId});
+      } catch (ex) {
+        // content script not loaded
+      }
+
+      const files = loadedModules ? [] : [...CONTENT_SCRIPT_FILES];
+      for (const module of modules) {
+        if (!loadedModules?.[module]) {
+          files.push(...CONTENT_SCRIPT_MODULES[module]);
+        }
+      }
+      if (!files.length) {
+        return result;
+      }
+
+      const startTime = performance.now();
+      try {
+        await browser.scripting.executeScript({
+          target: {tabId, frameIds: [frameId]},
+          injectImmediately: true,
+          files,
+        });
+        if (!loadedModules) {
+          await browser.scripting.executeScript({
+            target: {tabId, frameIds: [frameId]},
+            injectImmediately: true,
+            func: (frameId) => {
+              // eslint-disable-next-line no-undef
+              core.frameId = frameId;
+            },
+            args: [frameId],
+          });
+        }
+      } catch (ex) {
+        // Chromium may fail to inject content script to some pages due to unclear reason.
+        // Record the error and pass.
+        console.error(ex);
+        result.error = {message: ex.message};
+        return result;
+      }
+      result.injected = true;
+      result.time = performance.now() - startTime;
+      isDebug && console.debug("inject content scripts", tabId, frameId, url, files, `${result.time.toFixed(1)} ms`);
+      return result;
+    })());
   }
   return await Promise.all(tasks);
 };
@@ -1567,6 +1754,105 @@ scrapbook.invokeExtensionScript = async function ({id, cmd, args}) {
   return response;
 };
 
+/**
+ * Clients of the Ports opened by scrapbook.invokeExtensionPort.
+ *
+ * @type {Map<string, Object>}
+ */
+const portClients = new Map();
+
+function getPortClient(name) {
+  let client = portClients.get(name);
+  if (client) {
+    return client;
+  }
+
+  const port = browser.runtime.connect({name});
+  const tasks = new Map();
+  const send = createPortBatcher(port, 'requests');
+  let lastId = 0;
+
+  const close = (error) => {
+    clearTimeout(acceptTimer);
+    if (portClients.get(name) === client) {
+      portClients.delete(name);
+    }
+    for (const task of tasks.values()) {
+      task.reject(error);
+    }
+    tasks.clear();
+  };
+
+  // The Port is not disconnected if other extension pages are listening,
+  // even if none of them accepts it, or the accepting page is closed.
+  const acceptTimer = setTimeout(() => {
+    port.disconnect();
+    close(new Error(`Port "${name}" is not accepted by any extension page.`));
+  }, PORT_ACCEPT_TIMEOUT);
+
+  port.onMessage.addListener(({accepted, closed, responses}) => {
+    if (accepted) {
+      clearTimeout(acceptTimer);
+      return;
+    }
+    if (closed) {
+      port.disconnect();
+      close(new Error(`Port "${name}" disconnected.`));
+      return;
+    }
+    isDebug && console.debug("response batch from extension page", name, responses.length);
+    for (const {id, result, error} of responses) {
+      const task = tasks.get(id);
+      if (!task) { continue; }
+      tasks.delete(id);
+      if (error) {
+        task.reject(new Error(error.message));
+      } else {
+        task.resolve(result);
+      }
+    }
+  });
+
+  port.onDisconnect.addListener(() => {
+    close(new Error(`Port "${name}" disconnected.`));
+  });
+
+  client = {
+    invoke(cmd, args) {
+      const id = ++lastId;
+      return new Promise((resolve, reject) => {
+        tasks.set(id, {resolve, reject});
+        send({id, cmd, args});
+      });
+    },
+  };
+  portClients.set(name, client);
+  return client;
+}
+
+/**
+ * Invoke an invokable command in the extension page listening to the Port
+ * of the name (see scrapbook.addPortListener).
+ *
+ * - The Port is opened on the first call and reused for subsequent calls
+ *   until the other end disconnects (e.g. the page is closed).
+ * - Requests are multiplexed by an ID, and those invoked in the same task
+ *   are coalesced into a batched message to reduce messaging overhead for
+ *   a burst of requests.
+ *
+ * @param {Object} params
+ * @param {string} params.name - name of the Port
+ * @param {string} params.cmd
+ * @param {Object} [params.args]
+ * @return {Promise<Object>}
+ */
+scrapbook.invokeExtensionPort = async function ({name, cmd, args}) {
+  isDebug && console.debug(cmd, "send to extension page via port", name, args);
+  const response = await getPortClient(name).invoke(cmd, args);
+  isDebug && console.debug(cmd, "response from extension page via port", name, response);
+  return response;
+};
+
 /**
  * Invoke an invokable command in the content script.
  *
@@ -2272,33 +2558,69 @@ scrapbook.cloneDocument = function (doc, {
 /**
  * Clone a node and generate relation mapping.
  *
+ * For a deep clone, the original and cloned subtrees are walked in a single
+ * pass, and only descendant nodes matching options.whatToShow are mapped.
+ * The cloned node itself, shadow roots, and child nodes of a shadow host
+ * (which may be assigned to a slot) are always mapped.
+ *
  * @param {Node} node
  * @param {boolean} [deep]
  * @param {Object} [options]
  * @param {Map|WeakMap} [options.origNodeMap]
  * @param {Map|WeakMap} [options.clonedNodeMap]
  * @param {boolean} [options.includeShadowDom]
+ * @param {integer} [options.whatToShow] - a bitmask of NodeFilter.SHOW_*
+ *   for descendant nodes to map. Default: NodeFilter.SHOW_ALL.
  */
 scrapbook.cloneNode = function (...args) {
-  const cloneShadowDom = (node, newNode, options = {}) => {
+  const mapNode = (node1, node2, {origNodeMap, clonedNodeMap}) => {
+    origNodeMap?.set(node2, node1);
+    clonedNodeMap?.set(node1, node2);
+  };
+
+  // Walk the original and cloned subtrees, which have identical structures,
+  // in parallel.
+  const mapSubtree = (root1, root2, options) => {
+    const {origNodeMap, clonedNodeMap, includeShadowDom, whatToShow} = options;
+    if (!(origNodeMap || clonedNodeMap || includeShadowDom)) { return; }
+
+    // shadow hosts can only be elements
+    const show = whatToShow | (includeShadowDom ? NodeFilter.SHOW_ELEMENT : 0);
+    const walker1 = root1.ownerDocument.createNodeIterator(root1, show);
+    const walker2 = root2.ownerDocument.createNodeIterator(root2, show);
+    let node1 = walker1.nextNode();
+    let node2 = walker2.nextNode();
+    while (node1) {
+      if (whatToShow & (1 << (node1.nodeType - 1))) {
+        mapNode(node1, node2, options);
+      }
+      if (includeShadowDom && node1.nodeType === 1) {
+        cloneShadowDom(node1, node2, options);
+      }
+      node1 = walker1.nextNode();
+      node2 = walker2.nextNode();
+    }
+  };
+
+  const cloneShadowDom = (node, newNode, options) => {
     const shadowRoot = scrapbook.getShadowRoot(node);
     if (!shadowRoot) { return; }
-    const {origNodeMap, clonedNodeMap, includeShadowDom} = options;
+
+    // map child nodes of the host for slot assignment
+    if (options.whatToShow !== NodeFilter.SHOW_ALL) {
+      const children1 = node.childNodes;
+      const children2 = newNode.childNodes;
+      for (let i = 0, I = children1.length; i < I; i++) {
+        mapNode(children1[i], children2[i], options);
+      }
+    }
+
     let newShadowRoot = scrapbook.getShadowRoot(newNode);
     if (newShadowRoot) {
       // shadowRoot already cloned (when shadowRoot.clonable = true)
       // map the shadowRoot and descendant nodes
-      const walker1 = shadowRoot.ownerDocument.createNodeIterator(shadowRoot);
-      const walker2 = newShadowRoot.ownerDocument.createNodeIterator(newShadowRoot);
-      let node1 = walker1.nextNode();
-      let node2 = walker2.nextNode();
-      while (node1) {
-        origNodeMap?.set(node2, node1);
-        clonedNodeMap?.set(node1, node2);
-        includeShadowDom && cloneShadowDom(node1, node2, options);
-        node1 = walker1.nextNode();
-        node2 = walker2.nextNode();
-      }
+      mapNode(shadowRoot, newShadowRoot, options);
+      mapSubtree(shadowRoot, newShadowRoot, options);
     } else {
       newShadowRoot = newNode.attachShadow({
         mode: shadowRoot.mode,
@@ -2307,10 +2629,9 @@ scrapbook.cloneNode = function (...args) {
         serializable: shadowRoot.serializable,
         slotAssignment: shadowRoot.slotAssignment,
       });
-      origNodeMap?.set(newShadowRoot, shadowRoot);
-      clonedNodeMap?.set(shadowRoot, newShadowRoot);
+      mapNode(shadowRoot, newShadowRoot, options);
       for (const node of shadowRoot.childNodes) {
-        newShadowRoot.appendChild(scrapbook.cloneNode(node, true, options));
+        newShadowRoot.appendChild(cloneNode(node, true, options));
       }
     }
   };
@@ -2318,29 +2639,17 @@ scrapbook.cloneNode = function (...args) {
   const cloneNode = (node, deep = false, options = {}) => {
     const {
       newDoc = node.ownerDocument,
-      origNodeMap,
-      clonedNodeMap,
-      includeShadowDom,
+      whatToShow = NodeFilter.SHOW_ALL,
     } = options;
+    options = Object.assign({}, options, {whatToShow});
 
     const newNode = newDoc.importNode(node, deep);
 
+    mapNode(node, newNode, options);
     if (deep) {
-      const walker1 = node.ownerDocument.createNodeIterator(node);
-      const walker2 = newDoc.createNodeIterator(newNode);
-      let node1 = walker1.nextNode();
-      let node2 = walker2.nextNode();
-      while (node1) {
-        origNodeMap?.set(node2, node1);
-        clonedNodeMap?.set(node1, node2);
-        includeShadowDom && cloneShadowDom(node1, node2, options);
-        node1 = walker1.nextNode();
-        node2 = walker2.nextNode();
-      }
+      mapSubtree(node, newNode, options);
     } else {
-      origNodeMap?.set(newNode, node);
-      clonedNodeMap?.set(node, newNode);
-      includeShadowDom && cloneShadowDom(node, newNode, options);
+      options.includeShadowDom && cloneShadowDom(node, newNode, options);
     }
 
     return newNode;
@@ -2962,6 +3271,75 @@ scrapbook.escapeRegExp = function (str) {
   return fn(str);
 };
 
+/**
+ * Get the literal prefixes of a RegExp anchored at the start.
+ *
+ * - Any string matched by the RegExp starts with one of the prefixes, which
+ *   can be used to index RegExps for a quick filtering.
+ * - An optional literal character (e.g. "s?") forks the prefixes, up to
+ *   maxPrefixes.
+ * - The prefixes are case-sensitive even if the RegExp has the "i" flag.
+ *
+ * @param {RegExp} regex
+ * @param {integer} [maxPrefixes]
+ * @return {?string[]} the prefixes, or null if the RegExp is not anchored
+ *   at the start or has a top-level alternation
+ */
+scrapbook.getRegExpLiteralPrefixes = function (regex, maxPrefixes = 8) {
+  const source = regex.source;
+
+  if (source[0] !== '^') {
+    return null;
+  }
+
+  // check for a top-level alternation
+  for (let i = 0, depth = 0, inClass = false, I = source.length; i < I; i++) {
+    const c = source[i];
+    if (c === '\\') {
+      i++;
+    } else if (inClass) {
+      if (c === ']') { inClass = false; }
+    } else if (c === '[') {
+      inClass = true;
+    } else if (c === '(') {
+      depth++;
+    } else if (c === ')') {
+      depth--;
+    } else if (c === '|' && depth === 0) {
+      return null;
+    }
+  }
+
+  const SPECIAL_CHARS = '^$\\.*+?()[]{}|';
+  const ESCAPABLE_CHARS = SPECIAL_CHARS + '/-';
+  let prefixes = [''];
+  for (let i = 1, I = source.length; i < I; i++) {
+    let c = source[i];
+    if (c === '\\') {
+      c = source[++i];
+      if (!c || !ESCAPABLE_CHARS.includes(c)) { break; }
+    } else if (SPECIAL_CHARS.includes(c)) {
+      break;
+    }
+
+    const quantifier = source[i + 1];
+    if (quantifier === '?') {
+      if (prefixes.length * 2 > maxPrefixes) { break; }
+      prefixes = [...prefixes, ...prefixes.map(p => p + c)];
+      i += source[i + 2] === '?' ? 2 : 1;
+      continue;
+    } else if (quantifier === '*' || quantifier === '{') {
+      break;
+    }
+
+    prefixes = prefixes.map(p => p + c);
+    if (quantifier === '+') {
+      break;
+    }
+  }
+  return prefixes;
+};
+
 /**
  * ref: https://developer.mozilla.org/docs/Web/HTML/Guides/Comments
  * ref: https://html.spec.whatwg.org/multipage/syntax.html#comments
@@ -3105,6 +3483,149 @@ scrapbook.sha1 = function (data, type) {
   return shaObj.getHash("HEX");
 };
 
+const hashMemo = new Map();
+
+/**
+ * Get the SHA-1 hex digest of a short string, e.g. a URL token.
+ *
+ * - Digests are memoized, as the same token is generally computed many
+ *   times during a capture.
+ *
+ * @requires jsSHA
+ * @param {string} str
+ * @return {string}
+ */
+scrapbook.sha1Memo = function (str) {
+  let digest = hashMemo.get(str);
+  if (typeof digest !== 'undefined') {
+    return digest;
+  }
+
+  digest = scrapbook.sha1(str, "TEXT");
+  if (str.length <= HASH_MEMO_LENGTH_MAX) {
+    if (hashMemo.size >= HASH_MEMO_SIZE_MAX) {
+      // drop the earliest inserted entry
+      hashMemo.delete(hashMemo.keys().next().value);
+    }
+    hashMemo.set(str, digest);
+  }
+  return digest;
+};
+
+/**
+ * Get a fast non-cryptographic 64-bit hash of a string.
+ *
+ * - Suitable for keys of in-memory tables. Use a cryptographic digest for
+ *   anything that is persisted or compared across versions.
+ *
+ * @param {string} str
+ * @return {string} the hash in 16 hex digits
+ */
+scrapbook.hashString = function (str) {
+  let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+  for (let i = 0, I = str.length; i < I; i++) {
+    const ch = str.charCodeAt(i);
+    h1 = Math.imul(h1 ^ ch, 2654435761);
+    h2 = Math.imul(h2 ^ ch, 1597334677);
+  }
+  h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+  h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+  return (h2 >>> 0).toString(16).padStart(8, '0') + (h1 >>> 0).toString(16).padStart(8, '0');
+};
+
+/**
+ * Get the hex digest of the data asynchronously.
+ *
+ * - Use the native Web Crypto API if available (which is not in a content
+ *   script of an insecure page), or fallback to jsSHA.
+ * - A large Blob is hashed in the hash worker by streaming if possible, to
+ *   avoid loading the whole content into memory.
+ *
+ * @param {Blob|ArrayBuffer|ArrayBufferView|string} data - a string is
+ *     hashed as UTF-8
+ * @param {string} [algorithm] - "SHA-1", "SHA-256", "SHA-384", or "SHA-512"
+ * @return {Promise<string>}
+ */
+scrapbook.getDigest = async function (data, algorithm = "SHA-1") {
+  if (data instanceof Blob) {
+    if (data.size >= HASH_WORKER_SIZE_MIN && canUseHashWorker()) {
+      return await runHashWorker('digestBlob', [data, algorithm]);
+    }
+    data = await scrapbook.readFileAsArrayBuffer(data);
+  } else if (typeof data === 'string') {
+    data = new TextEncoder().encode(data);
+  }
+
+  if (globalThis.crypto?.subtle) {
+    const digest = await crypto.subtle.digest(algorithm, data);
+    return Array.from(new Uint8Array(digest), x => x.toString(16).padStart(2, '0')).join('');
+  }
+
+  data = ArrayBuffer.isView(data) ?
+    new Uint8Array(data.buffer, data.byteOffset, data.byteLength) :
+    new Uint8Array(data);
+  const shaObj = new jsSHA(algorithm, "UINT8ARRAY");
+  shaObj.update(data);
+  return shaObj.getHash("HEX");
+};
+
+const hashWorkerTasks = new Map();
+let hashWorker = null;
+let hashWorkerTaskId = 0;
+let hashWorkerFailed = false;
+
+/**
+ * The hash worker is available only in an extension page, as a worker of
+ * the extension URL cannot be created by a content script.
+ */
+function canUseHashWorker() {
+  if (hashWorkerFailed || typeof Worker === 'undefined' || typeof browser === 'undefined') {
+    return false;
+  }
+  try {
+    return location.href.startsWith(browser.runtime.getURL(''));
+  } catch (ex) {
+    return false;
+  }
+}
+
+async function runHashWorker(cmd, args) {
+  if (!hashWorker) {
+    hashWorker = new Worker(browser.runtime.getURL('core/hash-worker.js'));
+    hashWorker.addEventListener('message', (event) => {
+      const {id, result, error} = event.data;
+      const task = hashWorkerTasks.get(id);
+      hashWorkerTasks.delete(id);
+      if (typeof error !== 'undefined') {
+        task.reject(new Error(error));
+      } else {
+        task.resolve(result);
+      }
+    });
+    const worker = hashWorker;
+    worker.addEventListener('error', (event) => {
+      console.error(`Hash worker error: ${event.message}`);
+      worker.terminate();
+      hashWorker = null;
+      hashWorkerFailed = true;
+
+      // hash pending Blobs in this thread, which are cloned rather than
+      // transferred and thus still available
+      const tasks = [...hashWorkerTasks.values()];
+      hashWorkerTasks.clear();
+      for (const {args: [blob, algorithm], resolve, reject} of tasks) {
+        scrapbook.getDigest(blob, algorithm).then(resolve, reject);
+      }
+    });
+  }
+
+  const id = ++hashWorkerTaskId;
+  return await new Promise((resolve, reject) => {
+    hashWorkerTasks.set(id, {cmd, args, resolve, reject});
+    hashWorker.postMessage({id, cmd, args});
+  });
+}
+
 /**
  * Alt. 1:
  *
@@ -3630,14 +4151,16 @@ scrapbook.readFileAsDocument = async function (blob) {
 
 /**
  * @requires Mime
- * @requires jsSHA
+ * @param {string} dataUri
+ * @param {boolean} [useFilename]
+ * @return {Promise<?File>}
  */
-scrapbook.dataUriToFile = function (dataUri, useFilename = true) {
+scrapbook.dataUriToFile = async function (dataUri, useFilename = true) {
   const regexFields = /^data:([^,]*?)(;base64)?,([^#]*)/i;
   const regexFieldValue = /^(.*?)=(.*?)$/;
   const regexUtf8 = /[^\x00-\x7F]+/g;
   const fnUtf8 = m => encodeURIComponent(m);
-  const fn = scrapbook.dataUriToFile = function (dataUri, useFilename = true) {
+  const fn = scrapbook.dataUriToFile = async function (dataUri, useFilename = true) {
     if (regexFields.test(dataUri)) {
       const mediatype = RegExp.$1;
       const base64 = !!RegExp.$2;
@@ -3663,7 +4186,7 @@ scrapbook.dataUriToFile = function (dataUri, useFilename = true) {
       } else {
         let ext = parameters.filename && scrapbook.filenameParts(parameters.filename)[1] || Mime.extension(mime);
         ext = ext ? ("." + ext) : "";
-        filename = scrapbook.sha1(ab, "ARRAYBUFFER") + ext;
+        filename = await scrapbook.getDigest(ab, 'SHA-1') + ext;
       }
 
       const file = new File([ab], filename, {type: mediatype});
@@ -3739,6 +4262,141 @@ scrapbook.documentToString = function (doc, pretty = false) {
   }, '');
 };
 
+/**
+ * Generate the serialized parts of a document.
+ *
+ * Top-level elements of an HTML document are descended into up to
+ * maxDepth levels, so that no part is as large as the whole document.
+ * Joining the parts gives the same result as documentToString.
+ *
+ * @param {Document} doc
+ * @param {boolean} [pretty]
+ * @param {integer} [maxDepth]
+ * @yield {string}
+ */
+scrapbook.documentToStringParts = function* (doc, pretty = false, maxDepth = 8) {
+  if (!doc) { return; }
+
+  const isHtml = doc.contentType === "text/html";
+
+  const escapeText = (str) => {
+    return str.replace(/[&<>\u00A0]/g, m => SERIALIZE_TEXT_ESCAPE_MAP[m]);
+  };
+
+  const serializeElement = function* (elem, depth) {
+    if (depth >= maxDepth ||
+        !elem.firstChild ||
+        elem.namespaceURI !== "http://www.w3.org/1999/xhtml" ||
+        SERIALIZE_NO_DESCEND_ELEMENTS.has(elem.localName)) {
+      yield elem.outerHTML;
+      return;
+    }
+
+    // start tag: serialize a shallow clone and strip the end tag
+    const str = elem.cloneNode(false).outerHTML;
+    yield str.slice(0, str.length - elem.localName.length - 3);
+
+    for (const node of elem.childNodes) {
+      switch (node.nodeType) {
+        // element
+        case 1: {
+          yield* serializeElement(node, depth + 1);
+          break;
+        }
+        // text
+        case 3: {
+          yield escapeText(node.nodeValue);
+          break;
+        }
+        // processing instruction
+        case 7: {
+          yield `<?${node.target} ${node.nodeValue}>`;
+          break;
+        }
+        // comment
+        case 8: {
+          yield `<!--${node.nodeValue}-->`;
+          break;
+        }
+      }
+    }
+
+    yield `</${elem.localName}>`;
+  };
+
+  let afterHtml = false;
+  for (const node of doc.childNodes) {
+    switch (node.nodeType) {
+      // element
+      case 1: {
+        if (isHtml) {
+          yield* serializeElement(node, 0);
+        } else {
+          yield node.outerHTML;
+        }
+        afterHtml = true;
+        break;
+      }
+      // comment
+      case 8: {
+        yield `<!--${node.nodeValue}-->`;
+        break;
+      }
+      // doctype
+      case 10: {
+        yield '<!DOCTYPE ' + node.name +
+          (node.publicId ? ' PUBLIC "' + node.publicId + '"' : '') +
+          (node.systemId ? ' "' + node.systemId + '"' : '') +
+          '>';
+        break;
+      }
+    }
+
+    // Add a linefeed for pretty output. (see documentToString)
+    if (pretty && !afterHtml) {
+      yield '\n';
+    }
+  }
+};
+
+/**
+ * Serialize a document into a Blob.
+ *
+ * The serialized parts are flushed into the Blob every chunkSize code units,
+ * so that serializing a very large document doesn't require a giant string,
+ * which doubles the peak memory and may exceed the max string length of the
+ * JavaScript engine.
+ *
+ * @param {Document} doc
+ * @param {Object} [options]
+ * @param {boolean} [options.pretty]
+ * @param {string} [options.type]
+ * @param {integer} [options.chunkSize]
+ * @return {Blob}
+ */
+scrapbook.documentToBlob = function (doc, {
+  pretty = false,
+  type = "",
+  chunkSize = 1024 * 1024,
+} = {}) {
+  let blob = new Blob([], {type});
+  let parts = [];
+  let size = 0;
+  for (const part of scrapbook.documentToStringParts(doc, pretty)) {
+    parts.push(part);
+    size += part.length;
+    if (size >= chunkSize) {
+      blob = new Blob([blob, parts.join('')], {type});
+      parts = [];
+      size = 0;
+    }
+  }
+  if (parts.length) {
+    blob = new Blob([blob, parts.join('')], {type});
+  }
+  return blob;
+};
+
 /**
  * Read charset and text of a CSS file.
  *
@@ -4619,9 +5277,7 @@ scrapbook.xhr = async function (params = {}) {
         resolve(xhr);
       } else {
         // treat "404 Not found" or so as error
-        let statusText = xhr.statusText || HTTP_STATUS_TEXT[xhr.status];
-        statusText = xhr.status + (statusText ? " " + statusText : "");
-        reject(new Error(statusText));
+        reject(scrapbook.createXhrError(xhr));
       }
     };
 
@@ -4656,6 +5312,225 @@ scrapbook.xhr = async function (params = {}) {
   });
 };
 
+/**
+ * Create an error for an HTTP error response of an XMLHttpRequest.
+ *
+ * - The error has status and headers like a RequestError of the backend
+ *   server, which can be checked by scrapbook.Retrier.
+ *
+ * @param {XMLHttpRequest} xhr
+ * @return {Error}
+ */
+scrapbook.createXhrError = function (xhr) {
+  let statusText = xhr.statusText || HTTP_STATUS_TEXT[xhr.status];
+  statusText = xhr.status + (statusText ? " " + statusText : "");
+  const error = new Error(statusText);
+  error.status = xhr.status;
+  error.headers = new Headers();
+  for (const line of xhr.getAllResponseHeaders().split(/\r?\n/)) {
+    const idx = line.indexOf(':');
+    if (idx <= 0) { continue; }
+    try {
+      error.headers.append(line.slice(0, idx).trim(), line.slice(idx + 1).trim());
+    } catch (ex) {
+      // skip an invalid header
+    }
+  }
+  return error;
+};
+
+/**
+ * An engine for retrying failed operations.
+ *
+ * - Retry with exponential backoff and jitter, or after the time requested
+ *   by the Retry-After header of the response.
+ * - Fail fast for a host with too many consecutive operations given up
+ *   (circuit breaker), until the cooldown time has passed.
+ * - Limit the total number of retries to a ratio of the operations (retry
+ *   budget), so that a widespread failure does not multiply the load.
+ */
+scrapbook.Retrier = class Retrier {
+  /**
+   * @param {Object} [params]
+   * @param {number} [params.budgetRatio] - max ratio of retries to operations
+   * @param {integer} [params.budgetMin] - number of retries allowed
+   *   regardless of the ratio
+   * @param {integer} [params.breakerThreshold] - number of consecutive
+   *   operations given up for a host to open its circuit
+   * @param {integer} [params.breakerCooldown] - time (in ms) before an open
+   *   circuit allows a trial
+   * @param {integer} [params.retryDelayMax] - max delay (in ms) before a retry
+   */
+  constructor({
+    budgetRatio = 0.2,
+    budgetMin = 10,
+    breakerThreshold = 5,
+    breakerCooldown = 30000,
+    retryDelayMax = 60000,
+  } = {}) {
+    this.budgetRatio = budgetRatio;
+    this.budgetMin = budgetMin;
+    this.breakerThreshold = breakerThreshold;
+    this.breakerCooldown = breakerCooldown;
+    this.retryDelayMax = retryDelayMax;
+    this.breakers = new Map();
+    this.stats = {
+      operations: 0,
+      retries: 0,
+      failures: 0,
+    };
+  }
+
+  /**
+   * Check whether an HTTP status is a transient failure.
+   *
+   * @param {integer} status
+   * @return {boolean}
+   */
+  static isRetriableStatus(status) {
+    return RETRY_HTTP_STATUSES.has(status);
+  }
+
+  /**
+   * Check whether an operation is worth a retry for the error.
+   *
+   * - An error with an HTTP status is retried only for a transient failure.
+   * - An error without an HTTP status is taken as a network error.
+   *
+   * @param {Error} error
+   * @return {boolean}
+   */
+  static isRetriable(error) {
+    if (Number.isInteger(error.status)) {
+      return Retrier.isRetriableStatus(error.status);
+    }
+    return true;
+  }
+
+  /**
+   * Get the delay requested by the Retry-After header of the response.
+   *
+   * @param {Error} error
+   * @return {?number} the delay (in ms), or null if not provided
+   */
+  static getRetryAfter(error) {
+    const value = error.headers?.get?.('Retry-After');
+    if (!value) {
+      return null;
+    }
+    if (/^\s*\d+\s*$/.test(value)) {
+      return parseInt(value, 10) * 1000;
+    }
+    const time = Date.parse(value);
+    if (!Number.isNaN(time)) {
+      return Math.max(time - Date.now(), 0);
+    }
+    return null;
+  }
+
+  /**
+   * Get an exponential backoff delay with jitter for the nth retry.
+   *
+   * @param {number} retryDelay - the base delay (in ms)
+   * @param {integer} n
+   * @return {number}
+   */
+  static getBackoffDelay(retryDelay, n) {
+    const delay = retryDelay * 2 ** n;
+    return delay / 2 + Math.random() * delay / 2;
+  }
+
+  _getBreaker(url) {
+    let host;
+    try {
+      host = new URL(url).host;
+    } catch (ex) {
+      return null;
+    }
+    let breaker = this.breakers.get(host);
+    if (!breaker) {
+      breaker = {host, failures: 0, openUntil: 0};
+      this.breakers.set(host, breaker);
+    }
+    return breaker;
+  }
+
+  /**
+   * Run an operation and retry it on a retriable error.
+   *
+   * @param {Function} callback - the operation, which is passed the number
+   *   of previous tries and throws on failure
+   * @param {Object} [params]
+   * @param {string} [params.url] - the target URL, whose host is checked by
+   *   the circuit breaker
+   * @param {integer} [params.retryCount] - max times to retry
+   * @param {number} [params.retryDelay] - base delay (in ms) before a retry,
+   *   which is doubled for each retry
+   * @param {Function} [params.isRetriable] - check whether an error is
+   *   retriable
+   * @param {Function} [params.isBreakerFailure] - check whether an error
+   *   given up counts as a failure of the host for the circuit breaker
+   * @param {Function} [params.onRetry] - called with the error, the number of
+   *   tries, and the delay before a retry
+   * @param {Function} [params.onFailure] - called with the error when a
+   *   retriable error is given up
+   * @return {Promise<*>} the return value of callback
+   */
+  async run(callback, {
+    url,
+    retryCount = 3,
+    retryDelay = 1000,
+    isRetriable = Retrier.isRetriable,
+    isBreakerFailure = () => true,
+    onRetry,
+    onFailure,
+  } = {}) {
+    const breaker = url ? this._getBreaker(url) : null;
+    this.stats.operations++;
+
+    for (let i = 0; ; i++) {
+      if (breaker && breaker.openUntil > Date.now()) {
+        const error = new Error(`Too many failures for "${breaker.host}". Try again later.`);
+        this.stats.failures++;
+        onFailure?.(error);
+        throw error;
+      }
+
+      try {
+        const result = await callback(i);
+        if (breaker) {
+          breaker.failures = 0;
+        }
+        return result;
+      } catch (ex) {
+        if (!isRetriable(ex)) {
+          throw ex;
+        }
+
+        const budget = this.budgetMin + this.stats.operations * this.budgetRatio;
+        if (i >= retryCount || this.stats.retries >= budget) {
+          // count once for an operation given up, rather than for each try
+          if (breaker && isBreakerFailure(ex) &&
+              ++breaker.failures >= this.breakerThreshold) {
+            breaker.openUntil = Date.now() + this.breakerCooldown;
+          }
+          this.stats.failures++;
+          onFailure?.(ex);
+          throw ex;
+        }
+
+        const delay = Math.min(
+          Retrier.getRetryAfter(ex) ?? Retrier.getBackoffDelay(retryDelay, i),
+          this.retryDelayMax,
+        );
+        this.stats.retries++;
+        onRetry?.(ex, i + 1, delay);
+        await scrapbook.delay(delay);
+      }
+    }
+  }
+};
+
 /**
  * Check for whether a server backend is set
  *
@@ -9,10 +9,11 @@
   // Browser globals
   if (global.hasOwnProperty('core')) { return; }
   global.core = factory(
+    global,
     global.isDebug,
     global.scrapbook,
   );
-}(this, function (isDebug, scrapbook) {
+}(this, function (global, isDebug, scrapbook) {
 
 'use strict';
 
@@ -27,6 +28,19 @@ core.isScriptLoaded = async function (params) {
   return true;
 };
 
+/**
+ * Return the loaded on-demand content script modules.
+ *
+ * @type invokable
+ * @return {Promise<Object<string, boolean>>}
+ */
+core.getLoadedModules = async function (params) {
+  return {
+    capturer: global.hasOwnProperty('capturer'),
+    editor: global.hasOwnProperty('editor'),
+  };
+};
+
 /**
  * Return frameId of the frame of this content script.
  *
@@ -223,6 +223,38 @@ scrapbook.createWindow = async function (createData) {
   return winNew;
 };
 
+/**
+ * Launch a capturer page for the mission.
+ *
+ * @param {Object} params
+ * @param {string} params.missionId
+ * @param {Object} [params.windowCreateData]
+ * @param {Object} [params.tabCreateData]
+ * @return {Promise<Tab>}
+ */
+async function launchCapturer({missionId, resume, windowCreateData, tabCreateData}) {
+  let url = browser.runtime.getURL("capturer/capturer.html") + `?mid=${missionId}`;
+  if (resume) {
+    url += `&resume=${resume}`;
+  }
+
+  if (browser.windows) {
+    const win = await browser.windows.getCurrent();
+    const {tabs: [tab]} = await scrapbook.createWindow(Object.assign({
+      url,
+      type: 'popup',
+      width: 400,
+      height: 400,
+      incognito: win.incognito,
+    }, windowCreateData));
+    return tab;
+  }
+
+  return await browser.tabs.create(Object.assign({
+    url,
+  }, tabCreateData));
+}
+
 /**
  * Simplified API to invoke a capture with an array of tasks.
  *
@@ -307,31 +339,10 @@ scrapbook.invokeCaptureEx = async function ({
   const missionId = scrapbook.getUuid();
   const key = {table: "captureMissionCache", id: missionId};
   await scrapbook.cache.set(key, taskInfo);
-  const url = browser.runtime.getURL("capturer/capturer.html") + `?mid=${missionId}`;
 
-  // launch capturer
-  let tab;
-  if (browser.windows) {
-    const win = await browser.windows.getCurrent();
-    ({tabs: [tab]} = await scrapbook.createWindow(Object.assign({
-      url,
-      type: 'popup',
-      width: 400,
-      height: 400,
-      incognito: win.incognito,
-    }, windowCreateData)));
-
-    if (!waitForResponse) {
-      return tab;
-    }
-  } else {
-    tab = await browser.tabs.create(Object.assign({
-      url,
-    }, tabCreateData));
-
-    if (!waitForResponse) {
-      return tab;
-    }
+  const tab = await launchCapturer({missionId, windowCreateData, tabCreateData});
+  if (!waitForResponse) {
+    return tab;
   }
 
   // wait until tab loading complete
@@ -344,12 +355,36 @@ scrapbook.invokeCaptureEx = async function ({
     args: {},
   });
 
+  // retrieve timings recorded with "capture.recordTimings"
+  const timings = await scrapbook.invokeExtensionScript({
+    id: missionId,
+    cmd: 'capturer.getMissionTimings',
+    args: {},
+  });
+
   return {
     tab,
     results,
+    timings,
   };
 };
 
+/**
+ * Resume an interrupted capture mission recorded in the mission queue.
+ *
+ * @param {Object} params
+ * @param {string} params.missionId
+ * @param {integer} params.resume - the number of resumes of the mission
+ *     recorded in the mission queue, which the capturer page checks to
+ *     confirm that it owns the mission
+ * @param {Object} [params.windowCreateData]
+ * @param {Object} [params.tabCreateData]
+ * @return {Promise<Tab>}
+ */
+scrapbook.resumeCapture = async function ({missionId, resume, windowCreateData, tabCreateData}) {
+  return await launchCapturer({missionId, resume, windowCreateData, tabCreateData});
+};
+
 /**
  * Shortcut for invoking a general "capture as".
  */
@@ -392,7 +427,7 @@ scrapbook.invokeCaptureBatch = async function (taskInfo) {
  */
 scrapbook.invokeCaptureBatchLinks = async function (taskInfo) {
   const subTasks = taskInfo.tasks.map(({tabId, frameId = 0, fullPage}) => {
-    return scrapbook.initContentScripts(tabId, frameId)
+    return scrapbook.initContentScripts(tabId, frameId, {modules: ['capturer']})
       .then(() => {
         return scrapbook.invokeContentScript({
           tabId,
@@ -524,7 +559,7 @@ scrapbook.openScrapBook = async function ({newTab = true} = {}) {
 };
 
 scrapbook.editTab = async function ({tabId, frameId = 0, willActive, force}) {
-  await scrapbook.initContentScripts(tabId);
+  await scrapbook.initContentScripts(tabId, undefined, {modules: ['editor']});
   return await scrapbook.invokeContentScript({
     tabId,
     frameId,
@@ -0,0 +1,53 @@
+/******************************************************************************
+ * Worker for hashing large data off the UI thread.
+ *
+ * Receives messages in the form of {id, cmd, args} and replies with
+ * {id, result} or {id, error}.
+ *
+ * @module hashWorker
+ *****************************************************************************/
+
+(function (global, factory) {
+  // Worker globals
+  global.importScripts('../lib/sha.js');
+  global.addEventListener('message', factory(global.jsSHA));
+}(this, function (jsSHA) {
+
+'use strict';
+
+const commands = {
+  /**
+   * Get the hex digest of a Blob.
+   *
+   * - The Blob is read and hashed chunk by chunk, so that a large Blob is
+   *   never loaded into memory as a whole.
+   *
+   * @param {Blob} blob
+   * @param {string} algorithm - "SHA-1", "SHA-256", "SHA-384", or "SHA-512"
+   * @return {Promise<string>}
+   */
+  async digestBlob(blob, algorithm) {
+    const shaObj = new jsSHA(algorithm, "UINT8ARRAY");
+    const reader = blob.stream().getReader();
+    while (true) {
+      const {done, value} = await reader.read();
+      if (done) { break; }
+      shaObj.update(value);
+    }
+    return shaObj.getHash("HEX");
+  },
+};
+
+return async function onMessage(event) {
+  const {id, cmd, args} = event.data;
+  let result;
+  try {
+    result = await commands[cmd](...args);
+  } catch (ex) {
+    self.postMessage({id, error: ex.message});
+    return;
+  }
+  self.postMessage({id, result});
+};
+
+}));
@@ -35,7 +35,7 @@ function onDomContentLoaded(details) {
         frameId: 0,
         cmd: "editor.getStatus",
       }),
-      scrapbook.initContentScripts(tabId, frameId),
+      scrapbook.initContentScripts(tabId, frameId, {modules: ['editor']}),
     ]).then(([status, initResults]) => {
       return scrapbook.invokeContentScript({
         tabId,
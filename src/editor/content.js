@@ -466,6 +466,7 @@ editor.init = async function ({willActive = !editor.active, force = false} = {})
   <div id="toolbar-undo" title="${scrapbook.lang('EditorButtonUndo')}">
     <button></button>
     <ul hidden="" title="">
+      <li><button id="toolbar-undo-redo">${scrapbook.lang('EditorButtonRedo')}</button></li>
       <li><button id="toolbar-undo-toggle" checked="">${scrapbook.lang('EditorButtonUndoToggle')}</button></li>
     </ul>
   </div>
@@ -803,6 +804,11 @@ editor.init = async function ({willActive = !editor.active, force = false} = {})
     editor.showContextMenu(event.currentTarget.nextElementSibling, event);
   });
 
+  var elem = wrapper.querySelector('#toolbar-undo-redo');
+  elem.addEventListener("click", (event) => {
+    editor.redo();
+  }, {passive: true});
+
   var elem = wrapper.querySelector('#toolbar-undo-toggle');
   elem.addEventListener("click", (event) => {
     editor.toggleMutationHandler();
@@ -1375,6 +1381,15 @@ editor.undoInternal = function () {
   mutationHandler.applyRestorePoint();
 };
 
+/**
+ * @type invokable
+ */
+editor.redoInternal = function () {
+  if (!document.body) { return; }
+
+  mutationHandler.applyRedoPoint();
+};
+
 /**
  * @type invokable
  */
@@ -1795,6 +1810,17 @@ editor.undo = async function () {
   });
 };
 
+editor.redo = async function () {
+  return await scrapbook.invokeExtensionScript({
+    cmd: "background.invokeEditorCommand",
+    args: {
+      frameId: await editor.getFocusedFrameId(),
+      cmd: "editor.redoInternal",
+      args: {},
+    },
+  });
+};
+
 editor.save = async function (params = {}) {
   mutationHandler.addSavePoint();
 
@@ -3639,15 +3665,133 @@ const mutationHandler = editor.mutationHandler = (function () {
   };
 
   const MUTATION_OBSERVER = new MutationObserver((mutationList, observer) => {
-    for (const mutation of mutationList) {
-      mutationHandler.history.push(mutation);
-    }
+    mutationHandler.recordMutations(mutationList);
   });
 
+  /**
+   * Convert a MutationRecord into a compact operation for undoing it, so
+   * that the record (and the NodeLists it holds) can be released.
+   */
+  const toOperation = (mutation) => {
+    switch (mutation.type) {
+      case 'attributes': {
+        return {
+          type: 'attributes',
+          target: mutation.target,
+          attributeNamespace: mutation.attributeNamespace,
+          attributeName: mutation.attributeName,
+          oldValue: mutation.oldValue,
+        };
+      }
+      case 'characterData': {
+        return {
+          type: 'characterData',
+          target: mutation.target,
+          oldValue: mutation.oldValue,
+        };
+      }
+      case 'childList': {
+        return {
+          type: 'childList',
+          target: mutation.target,
+          addedNodes: Array.from(mutation.addedNodes),
+          removedNodes: Array.from(mutation.removedNodes),
+          nextSibling: mutation.nextSibling,
+        };
+      }
+    }
+  };
+
+  const applyOperation = (op) => {
+    switch (op.type) {
+      case 'attributes': {
+        if (op.oldValue === null) {
+          op.target.removeAttributeNS(op.attributeNamespace, op.attributeName);
+        } else {
+          op.target.setAttributeNS(op.attributeNamespace, op.attributeName, op.oldValue);
+        }
+        break;
+      }
+      case 'characterData': {
+        op.target.textContent = op.oldValue;
+        break;
+      }
+      case 'childList': {
+        for (const node of op.addedNodes) {
+          node.remove();
+        }
+
+        for (const node of op.removedNodes) {
+          op.target.insertBefore(node, op.nextSibling);
+        }
+
+        break;
+      }
+    }
+  };
+
+  /**
+   * Coalesce operations.
+   *
+   * Only the earliest attributes or characterData operation for the same
+   * target (and attribute) is needed, as it restores the oldest value.
+   * Operations are never coalesced across a command entry.
+   *
+   * @param {Object[]} ops
+   * @return {Object[]}
+   */
+  const compactOperations = (ops) => {
+    const rv = [];
+    const seen = new Map();
+    for (const op of ops) {
+      switch (op.type) {
+        case MUTATION_COMMAND_NAME: {
+          seen.clear();
+          break;
+        }
+        case 'attributes':
+        case 'characterData': {
+          const key = op.type === 'attributes' ? `${op.attributeNamespace}:${op.attributeName}` : '';
+          let keys = seen.get(op.target);
+          if (!keys) {
+            keys = new Set();
+            seen.set(op.target, keys);
+          }
+          if (keys.has(key)) { continue; }
+          keys.add(key);
+          break;
+        }
+      }
+      rv.push(op);
+    }
+    return rv;
+  };
+
+  const getOptionLimit = (key) => {
+    const value = scrapbook.getOption(key);
+    return value > 0 ? value : Infinity;
+  };
+
   const mutationHandler = {
     active: true,
+
+    /**
+     * Operations and command entries since the first restore point.
+     */
     history: [],
 
+    /**
+     * Steps that can be redone, each being operations recorded when undoing.
+     */
+    redoHistory: [],
+
+    stepCount: 0,
+
+    /**
+     * When set, recorded operations go here instead of the history.
+     */
+    recording: null,
+
     /**
      * @type invokable
      */
@@ -3662,14 +3806,46 @@ const mutationHandler = editor.mutationHandler = (function () {
           this.flushPendingMutations();
           MUTATION_OBSERVER.disconnect();
           this.history = [];
+          this.redoHistory = [];
+          this.stepCount = 0;
         }
       }
     },
 
+    recordMutations(mutationList) {
+      const target = this.recording || this.history;
+      for (const mutation of mutationList) {
+        target.push(toOperation(mutation));
+      }
+    },
+
     flushPendingMutations() {
-      for (const entry of MUTATION_OBSERVER.takeRecords()) {
-        this.history.push(entry);
+      this.recordMutations(MUTATION_OBSERVER.takeRecords());
+    },
+
+    /**
+     * Get the size of the history.
+     *
+     * @return {{steps: integer, operations: integer, nodes: integer, redoSteps: integer}}
+     */
+    getSize() {
+      this.flushPendingMutations();
+
+      let operations = 0;
+      let nodes = 0;
+      for (const op of this.history) {
+        if (op.type === MUTATION_COMMAND_NAME) { continue; }
+        operations++;
+        if (op.type === 'childList') {
+          nodes += op.addedNodes.length + op.removedNodes.length;
+        }
       }
+      return {
+        steps: this.stepCount,
+        operations,
+        nodes,
+        redoSteps: this.redoHistory.length,
+      };
     },
 
     /**
@@ -3784,9 +3960,21 @@ const mutationHandler = editor.mutationHandler = (function () {
 
       this.flushPendingMutations();
 
+      // a new change invalidates steps to redo
+      this.redoHistory = [];
+
+      this.pushRestorePoint();
+    },
+
+    /**
+     * Compact the last step and push a new restore point.
+     */
+    pushRestorePoint() {
       // start observing since first add
       if (!this.history.length) {
         MUTATION_OBSERVER.observe(document.body, MUTATION_OBSERVER_OPTIONS);
+      } else {
+        this.compactLastStep();
       }
 
       this.history.push({
@@ -3794,8 +3982,70 @@ const mutationHandler = editor.mutationHandler = (function () {
         name: 'point',
         timestamp: Date.now(),
       });
+      this.stepCount++;
+
+      this.enforceLimits();
+    },
+
+    compactLastStep() {
+      let i = this.history.length - 1;
+      while (i >= 0) {
+        const entry = this.history[i];
+        if (entry.type === MUTATION_COMMAND_NAME && entry.name === 'point') {
+          break;
+        }
+        i--;
+      }
+
+      const ops = compactOperations(this.history.splice(i + 1));
+      for (const op of ops) {
+        this.history.push(op);
+      }
     },
 
+    /**
+     * Drop the oldest steps if the history exceeds the limits.
+     *
+     * - A step during an unfinished special mode is never dropped.
+     */
+    enforceLimits() {
+      const maxSteps = getOptionLimit("editor.undoMaxSteps");
+      const maxOperations = getOptionLimit("editor.undoMaxOperations");
+
+      if (this.stepCount <= maxSteps && this.history.length <= maxOperations) {
+        return;
+      }
+
+      let dropCount = 0;
+      let stepCount = this.stepCount;
+      let i = 0;
+      for (const I = this.history.length; i < I; i++) {
+        if (stepCount <= maxSteps && this.history.length - dropCount <= maxOperations) {
+          break;
+        }
+        const entry = this.history[i];
+        if (entry.type !== MUTATION_COMMAND_NAME) { continue; }
+        if (entry.name === 'special') { break; }
+        if (entry.name !== 'point') { continue; }
+        if (i > 0) {
+          // drop entries before this point
+          dropCount = i;
+          stepCount--;
+        }
+
+        // keep at least the current step
+        if (stepCount <= 1) { break; }
+      }
+
+      if (dropCount) {
+        this.history.splice(0, dropCount);
+        this.stepCount = stepCount;
+      }
+    },
+
+    /**
+     * Undo to the last restore point.
+     */
     applyRestorePoint() {
       if (!this.active) { return; }
       if (!this.history.length) { return; }
@@ -3814,49 +4064,42 @@ const mutationHandler = editor.mutationHandler = (function () {
 
       const targetPoint = i;
 
-      // disconnect mutation observer
-      MUTATION_OBSERVER.disconnect();
+      // record mutations of undoing as a step to redo
+      this.recording = [];
 
       // apply restore point
       for (i = this.history.length - 1; i >= targetPoint; i--) {
         const entry = this.history.pop();
         if (entry.type === MUTATION_COMMAND_NAME) { continue; }
+        applyOperation(entry);
+      }
+      this.stepCount--;
 
-        switch (entry.type) {
-          case 'attributes': {
-            if (entry.oldValue === null) {
-              entry.target.removeAttributeNS(entry.attributeNamespace, entry.attributeName);
-            } else {
-              entry.target.setAttributeNS(entry.attributeNamespace, entry.attributeName, entry.oldValue);
-            }
-            break;
-          }
-          case 'characterData': {
-            entry.target.textContent = entry.oldValue;
-            break;
-          }
-          case 'childList': {
-            if (entry.addedNodes.length) {
-              for (const node of entry.addedNodes) {
-                node.remove();
-              }
-            }
-
-            if (entry.removedNodes.length) {
-              for (const node of entry.removedNodes) {
-                entry.target.insertBefore(node, entry.nextSibling);
-              }
-            }
+      this.flushPendingMutations();
+      this.redoHistory.push(compactOperations(this.recording));
+      this.recording = null;
 
-            break;
-          }
-        }
+      // stop observing if there are no more history
+      if (!this.history.length) {
+        MUTATION_OBSERVER.disconnect();
       }
+    },
 
-      // re-observe if there are still history
-      if (this.history.length) {
-        MUTATION_OBSERVER.observe(document.body, MUTATION_OBSERVER_OPTIONS);
+    /**
+     * Redo the last undone step.
+     */
+    applyRedoPoint() {
+      if (!this.active) { return; }
+      if (!this.redoHistory.length) { return; }
+
+      this.flushPendingMutations();
+
+      const ops = this.redoHistory.pop();
+      this.pushRestorePoint();
+      for (let i = ops.length - 1; i >= 0; i--) {
+        applyOperation(ops[i]);
       }
+      this.flushPendingMutations();
     },
 
     addSavePoint() {
@@ -3876,6 +4119,186 @@ const mutationHandler = editor.mutationHandler = (function () {
   return mutationHandler;
 })();
 
+const changeTracker = editor.changeTracker = (function () {
+  const MUTATION_OBSERVER_OPTIONS = {
+    subtree: true,
+    childList: true,
+    attributes: true,
+    characterData: true,
+  };
+
+  const MUTATION_OBSERVER = new MutationObserver((mutationList, observer) => {
+    for (const mutation of mutationList) {
+      if (isRelevantMutation(mutation)) {
+        changeTracker.markDirty();
+        break;
+      }
+    }
+  });
+
+  const isToolbarNode = (node) => {
+    return node.nodeType === 1 && !!node.closest('[data-scrapbook-elem|="toolbar"]');
+  };
+
+  const isRelevantMutation = (mutation) => {
+    switch (mutation.type) {
+      case 'attributes': {
+        if (mutation.target === document.documentElement &&
+            mutation.attributeName === 'data-scrapbook-toolbar-active') {
+          return false;
+        }
+        return !isToolbarNode(mutation.target);
+      }
+      case 'childList': {
+        if (isToolbarNode(mutation.target)) {
+          return false;
+        }
+        for (const nodes of [mutation.addedNodes, mutation.removedNodes]) {
+          for (const node of nodes) {
+            if (!isToolbarNode(node)) {
+              return true;
+            }
+          }
+        }
+        return false;
+      }
+    }
+    return true;
+  };
+
+  const onInput = (event) => {
+    changeTracker.markDirty();
+  };
+
+  /**
+   * Check for states not reflected by a DOM mutation.
+   */
+  const hasUntrackedChanges = () => {
+    // form control states may be changed without a DOM mutation
+    for (const elem of document.querySelectorAll('input, option, textarea')) {
+      switch (elem.nodeName.toLowerCase()) {
+        case 'input': {
+          if (elem.value !== elem.defaultValue || elem.checked !== elem.defaultChecked ||
+              elem.indeterminate !== elem.hasAttribute('data-scrapbook-input-indeterminate')) {
+            return true;
+          }
+          break;
+        }
+        case 'option': {
+          if (elem.selected !== elem.defaultSelected) {
+            return true;
+          }
+          break;
+        }
+        case 'textarea': {
+          if (elem.value !== elem.defaultValue) {
+            return true;
+          }
+          break;
+        }
+      }
+    }
+
+    // mutations in a shadow root are not observed
+    for (const elem of document.querySelectorAll('*')) {
+      if (isToolbarNode(elem)) { continue; }
+      if (scrapbook.getShadowRoot(elem)) {
+        return true;
+      }
+    }
+
+    // a script may change anything, e.g. a canvas or an adopted stylesheet
+    if (editor.isDocumentScripted(document)) {
+      return true;
+    }
+
+    return false;
+  };
+
+  const changeTracker = {
+    observing: false,
+
+    /**
+     * Whether the document may have been changed since the last save.
+     *
+     * The document is taken as changed initially since changes made before
+     * the editor is loaded cannot be known.
+     */
+    dirty: true,
+
+    /**
+     * Whether the document was changed before the pending save.
+     */
+    pending: false,
+
+    revision: 0,
+
+    start() {
+      if (this.dirty) { return; }
+      if (this.observing) { return; }
+      MUTATION_OBSERVER.observe(document.documentElement, MUTATION_OBSERVER_OPTIONS);
+      document.addEventListener("input", onInput, {capture: true, passive: true});
+      document.addEventListener("change", onInput, {capture: true, passive: true});
+      this.observing = true;
+    },
+
+    stop() {
+      if (!this.observing) { return; }
+      MUTATION_OBSERVER.disconnect();
+      document.removeEventListener("input", onInput, {capture: true, passive: true});
+      document.removeEventListener("change", onInput, {capture: true, passive: true});
+      this.observing = false;
+    },
+
+    /**
+     * Stop tracking once a change is found, as there's nothing more to know
+     * until the next save.
+     */
+    markDirty() {
+      this.dirty = true;
+      this.stop();
+    },
+
+    /**
+     * Get the change status of the document for a save, and start tracking
+     * changes made since then.
+     *
+     * @type invokable
+     * @return {{url: string, changed: boolean, revision: integer}}
+     */
+    getStatus() {
+      if (MUTATION_OBSERVER.takeRecords().some(isRelevantMutation)) {
+        this.markDirty();
+      }
+      const changed = this.dirty || this.pending || hasUntrackedChanges();
+      this.pending = changed;
+      this.dirty = false;
+      this.revision++;
+      this.start();
+      return {
+        url: document.URL,
+        changed,
+        revision: this.revision,
+      };
+    },
+
+    /**
+     * Confirm that the document has been saved since the status of the
+     * revision is taken.
+     *
+     * @type invokable
+     * @param {Object} params
+     * @param {integer} params.revision
+     */
+    markSaved({revision}) {
+      if (revision !== this.revision) { return; }
+      this.pending = false;
+    },
+  };
+
+  return changeTracker;
+})();
+
 
 window.addEventListener("focus", (event) => {
   // in Firefox, window of the content script is a sandbox object,
@@ -3,6 +3,7 @@
  *
  * @requires scrapbook
  * @requires Mime
+ * @requires treeFile
  * @module server
  *****************************************************************************/
 
@@ -13,8 +14,9 @@
     global.isDebug,
     global.scrapbook,
     global.Mime,
+    global.treeFile,
   );
-}(this, function (isDebug, scrapbook, Mime) {
+}(this, function (isDebug, scrapbook, Mime, treeFile) {
 
 'use strict';
 
@@ -26,6 +28,127 @@ const LOCK_STALE_TIME = 60 * 1000;
 
 const TRANSCATION_TREE_FILES_REGEX = /^(meta|toc)\d*\.js$/;
 
+const TREE_SNAPSHOT_NAMES = new Set(['meta', 'toc']);
+
+const {parseTreeFile, generateTreeFile} = treeFile;
+
+// commands of the tree worker, to run in this thread as a fallback
+const TREE_WORKER_FALLBACK_COMMANDS = {
+  parseTreeFile(buffer) {
+    return parseTreeFile(new TextDecoder().decode(buffer));
+  },
+  generateTreeFile(name, jsonData) {
+    return generateTreeFile(name, jsonData);
+  },
+};
+
+/**
+ * Pack tree data into a compact columnar snapshot.
+ *
+ * - Strings are interned into a shared table and referenced by index.
+ * - Meta: each string property is stored as an Int32Array column (-1 for
+ *   none), other values are stored sparsely, and the property order of each
+ *   item is kept as an interned "shape".
+ * - Toc: child IDs are flattened into an Int32Array with offsets.
+ *
+ * @param {string} name - "meta" or "toc"
+ * @param {Object} data
+ * @return {Object}
+ */
+function packTreeSnapshot(name, data) {
+  const strings = [];
+  const stringIndexes = new Map();
+  const intern = (str) => {
+    let i = stringIndexes.get(str);
+    if (typeof i === 'undefined') {
+      i = strings.length;
+      strings.push(str);
+      stringIndexes.set(str, i);
+    }
+    return i;
+  };
+
+  const ids = Object.keys(data);
+  const I = ids.length;
+  const idIndexes = Int32Array.from(ids, intern);
+
+  if (name === 'toc') {
+    const offsets = new Int32Array(I + 1);
+    const children = [];
+    for (let i = 0; i < I; i++) {
+      for (const childId of data[ids[i]]) {
+        children.push(intern(childId));
+      }
+      offsets[i + 1] = children.length;
+    }
+    return {strings, ids: idIndexes, offsets, children: Int32Array.from(children)};
+  }
+
+  const shapes = [];
+  const shapeIndexes = new Map();
+  const itemShapes = new Int32Array(I);
+  const columns = {};
+  const others = {};
+  for (let i = 0; i < I; i++) {
+    const item = data[ids[i]];
+    const keys = [];
+    for (const key in item) {
+      const value = item[key];
+      if (typeof value === 'undefined') { continue; }
+      keys.push(key);
+      if (typeof value === 'string') {
+        const column = columns[key] ??= new Int32Array(I).fill(-1);
+        column[i] = intern(value);
+      } else {
+        (others[key] ??= {})[i] = value;
+      }
+    }
+
+    const shape = keys.join('\n');
+    let shapeIndex = shapeIndexes.get(shape);
+    if (typeof shapeIndex === 'undefined') {
+      shapeIndex = shapes.length;
+      shapes.push(keys);
+      shapeIndexes.set(shape, shapeIndex);
+    }
+    itemShapes[i] = shapeIndex;
+  }
+  return {strings, ids: idIndexes, shapes, itemShapes, columns, others};
+}
+
+/**
+ * Unpack tree data from a snapshot generated by packTreeSnapshot.
+ *
+ * @param {string} name - "meta" or "toc"
+ * @param {Object} snapshot
+ * @return {Object}
+ */
+function unpackTreeSnapshot(name, snapshot) {
+  const {strings, ids} = snapshot;
+  const rv = {};
+
+  if (name === 'toc') {
+    const {offsets, children} = snapshot;
+    for (let i = 0, I = ids.length; i < I; i++) {
+      const list = rv[strings[ids[i]]] = [];
+      for (let j = offsets[i], J = offsets[i + 1]; j < J; j++) {
+        list.push(strings[children[j]]);
+      }
+    }
+    return rv;
+  }
+
+  const {shapes, itemShapes, columns, others} = snapshot;
+  for (let i = 0, I = ids.length; i < I; i++) {
+    const item = rv[strings[ids[i]]] = {};
+    for (const key of shapes[itemShapes[i]]) {
+      const column = columns[key];
+      item[key] = (column && column[i] !== -1) ? strings[column[i]] : others[key][i];
+    }
+  }
+  return rv;
+}
+
 class RequestError extends Error {
   constructor(message, response) {
     super(message);
@@ -44,6 +167,10 @@ class Server {
     this._serverRoot = null;
     this._bookId = null;
     this._books = null;
+    this._treeWorker = null;
+    this._treeWorkerFailed = false;
+    this._treeWorkerTasks = new Map();
+    this._treeWorkerTaskId = 0;
   }
 
   get serverRoot() {
@@ -385,9 +512,30 @@ class Server {
       }
     }
 
+    await this.pruneTreeSnapshots();
+
     return true;
   }
 
+  /**
+   * Remove the tree snapshots of other servers and of the books no longer
+   * in the server, which would otherwise be kept in the cache forever.
+   */
+  async pruneTreeSnapshots() {
+    try {
+      await scrapbook.cache.removeAll({
+        includes: {table: "scrapbookTreeSnapshot"},
+        excludes: {serverRoot: this._serverRoot},
+      }, 'indexedDB');
+      await scrapbook.cache.removeAll({
+        includes: {table: "scrapbookTreeSnapshot", serverRoot: this._serverRoot},
+        excludes: {bookId: new Set(Object.keys(this._books))},
+      }, 'indexedDB');
+    } catch (ex) {
+      console.error(ex);
+    }
+  }
+
   /**
    * Acquire an access token from the backend server
    */
@@ -420,6 +568,88 @@ class Server {
     return scrapbook.getMetaRefreshTarget(doc, refUrl);
   }
 
+  /**
+   * Run a task in the tree worker.
+   *
+   * - Run in this thread instead if Worker is not supported in this context
+   *   (e.g. a service worker) or the worker has failed (e.g. the script
+   *   failed to load).
+   *
+   * @param {string} cmd
+   * @param {Array} args
+   * @return {Promise<*>}
+   */
+  async runTreeWorker(cmd, args) {
+    if (!this._treeWorker) {
+      if (typeof Worker === 'undefined' || this._treeWorkerFailed) {
+        return TREE_WORKER_FALLBACK_COMMANDS[cmd](...args);
+      }
+
+      const worker = this._treeWorker = new Worker(browser.runtime.getURL('scrapbook/tree-worker.js'));
+      worker.addEventListener('message', (event) => {
+        const {id, result, error} = event.data;
+        const task = this._treeWorkerTasks.get(id);
+        this._treeWorkerTasks.delete(id);
+        if (typeof error !== 'undefined') {
+          task.reject(new Error(error));
+        } else {
+          task.resolve(result);
+        }
+      });
+      worker.addEventListener('error', (event) => {
+        console.error(`Tree worker error: ${event.message}`);
+        worker.terminate();
+        this._treeWorker = null;
+        this._treeWorkerFailed = true;
+
+        // run pending tasks in this thread
+        const tasks = [...this._treeWorkerTasks.values()];
+        this._treeWorkerTasks.clear();
+        for (const {cmd, args, resolve, reject} of tasks) {
+          try {
+            resolve(TREE_WORKER_FALLBACK_COMMANDS[cmd](...args));
+          } catch (ex) {
+            reject(ex);
+          }
+        }
+      });
+    }
+
+    // Don't transfer the args, so that they are still available for a
+    // fallback if the worker fails.
+    const id = ++this._treeWorkerTaskId;
+    return await new Promise((resolve, reject) => {
+      this._treeWorkerTasks.set(id, {cmd, args, resolve, reject});
+      this._treeWorker.postMessage({id, cmd, args});
+    });
+  }
+
+  /**
+   * Parse the JSON data from the content of a tree file.
+   *
+   * - Parse in the tree worker if possible to avoid blocking the UI thread.
+   *
+   * @param {ArrayBuffer} buffer - the UTF-8 encoded content
+   * @return {Promise<Object>}
+   */
+  async parseTreeFile(buffer) {
+    return await this.runTreeWorker('parseTreeFile', [buffer]);
+  }
+
+  /**
+   * Generate the content of a tree file.
+   *
+   * - Serialize in the tree worker if possible to avoid blocking the UI
+   *   thread.
+   *
+   * @param {string} name - e.g. "meta", "toc"
+   * @param {Object} jsonData
+   * @return {Promise<string|ArrayBuffer>}
+   */
+  async generateTreeFile(name, jsonData) {
+    return await this.runTreeWorker('generateTreeFile', [name, jsonData]);
+  }
+
   async findBookIdFromUrl(url) {
     const u = scrapbook.splitUrl(url)[0];
     for (const [id, book] of Object.entries(this.books)) {
@@ -437,6 +667,7 @@ class Book {
     this.server = server;
     this.config = server.config.book[bookId];
     this.treeLastModified = undefined;
+    this.treeVersions = undefined;
 
     if (!this.config) {
       throw new Error(`unknown scrapbook: ${bookId}`);
@@ -463,6 +694,7 @@ class Book {
     this.treeFiles = null;
     this.toc = null;
     this.meta = null;
+    this.lastIdTime = -Infinity;
   }
 
   get defaultMeta() {
@@ -495,6 +727,7 @@ class Book {
    * Load tree file list.
    *
    * - Also update this.treeLastModified.
+   * - Also update this.treeVersions.
    * - Also update this.treeFiles.
    *
    * @param {boolean} [refresh] - Load from the server even if this.treeFiles exists.
@@ -535,18 +768,22 @@ class Book {
       }
     }
 
-    // generate a checksum for change detection
+    // generate a version token for each tree file and a checksum for change
+    // detection
     const treeFiles = new Map();
+    const treeVersions = new Map();
     let checksum = [];
     for (const file of data) {
       treeFiles.set(file.name, file);
       if (TRANSCATION_TREE_FILES_REGEX.test(file.name) && file.type === 'file') {
+        treeVersions.set(file.name, [file.last_modified, file.size].join('\t'));
         checksum.push([file.name, file.last_modified, file.size].join('\t'));
       }
     }
     checksum = checksum.sort().join('\n');
 
     this.treeLastModified = checksum;
+    this.treeVersions = treeVersions;
     return this.treeFiles = treeFiles;
   }
 
@@ -557,8 +794,17 @@ class Book {
    * @return {Object}
    */
   async loadTreeFile(name) {
-    const rv = {};
     const treeFiles = await this.loadTreeFiles();
+
+    const snapshotVersion = this.getTreeFileVersion(name);
+    if (snapshotVersion) {
+      const data = await this.loadTreeSnapshot(name, snapshotVersion);
+      if (data) {
+        return data;
+      }
+    }
+
+    const rv = {};
     const prefix = this.treeUrl;
     for (let i = 0; ; i++) {
       const file = `${name}${i || ""}.js`;
@@ -569,16 +815,12 @@ class Book {
 
       const url = prefix + encodeURIComponent(file);
       try {
-        const text = await this.server.request({
+        const buffer = await this.server.request({
           url,
           method: "GET",
-        }).then(r => r.text());
-
-        if (!/^(?:\/\*.*\*\/|[^(])+\(([\s\S]*)\)(?:\/\*.*\*\/|[\s;])*$/.test(text)) {
-          throw new Error(`unable to retrieve JSON data.`);
-        }
+        }).then(r => r.arrayBuffer());
 
-        Object.assign(rv, JSON.parse(RegExp.$1));
+        Object.assign(rv, await this.server.parseTreeFile(buffer));
       } catch (ex) {
         throw new Error(`Error loading '${url}': ${ex.message}`);
       }
@@ -590,9 +832,73 @@ class Book {
       if (!rv[key]) { delete rv[key]; }
     }
 
+    if (snapshotVersion) {
+      await this.saveTreeSnapshot(name, snapshotVersion, rv);
+    }
+
     return rv;
   }
 
+  /**
+   * Get a version token for the tree files with the specific name.
+   *
+   * @param {string} name - e.g. "meta" for meta.js, meta1.js, ...
+   * @return {string} the version token, or an empty string if the tree files
+   *   do not exist or do not support a snapshot.
+   */
+  getTreeFileVersion(name) {
+    if (!TREE_SNAPSHOT_NAMES.has(name) || !this.treeVersions) {
+      return '';
+    }
+
+    const rv = [];
+    for (const [file, token] of this.treeVersions) {
+      if (file.replace(/\d*\.js$/, '') === name) {
+        rv.push(file + '\t' + token);
+      }
+    }
+    return rv.sort().join('\n');
+  }
+
+  /**
+   * Load tree data from the local snapshot cache.
+   *
+   * @param {string} name - "meta" or "toc"
+   * @param {string} version - version token of the current tree files
+   * @return {Promise<?Object>} the tree data, or null if the snapshot is
+   *   missing or stale.
+   */
+  async loadTreeSnapshot(name, version) {
+    try {
+      const key = {table: "scrapbookTreeSnapshot", serverRoot: this.server.serverRoot, bookId: this.id, name};
+      const cache = await scrapbook.cache.get(key, 'indexedDB');
+      if (!(cache?.version === version && cache.snapshot?.ids instanceof Int32Array)) {
+        return null;
+      }
+      return unpackTreeSnapshot(name, cache.snapshot);
+    } catch (ex) {
+      console.error(ex);
+      return null;
+    }
+  }
+
+  /**
+   * Save tree data to the local snapshot cache.
+   *
+   * @param {string} name - "meta" or "toc"
+   * @param {string} version - version token of the current tree files
+   * @param {Object} data
+   */
+  async saveTreeSnapshot(name, version, data) {
+    try {
+      const key = {table: "scrapbookTreeSnapshot", serverRoot: this.server.serverRoot, bookId: this.id, name};
+      const snapshot = packTreeSnapshot(name, data);
+      await scrapbook.cache.set(key, {version, snapshot}, 'indexedDB');
+    } catch (ex) {
+      console.error(ex);
+    }
+  }
+
   /**
    * @param {boolean} [refresh] - Load from the server even if this.meta exists.
    * @return {Object}
@@ -639,19 +945,48 @@ class Book {
   /**
    * Refresh loaded tree files if changed on the server.
    *
+   * - Only reload meta or toc if any of its shards has been changed.
+   *
    * @return {boolean} Whether the tree is changed.
    */
   async refreshTreeFiles() {
+    const treeVersions = this.treeVersions;
     const refresh = !await this.validateTree();
+    const changedFiles = this.getChangedTreeFiles(treeVersions);
     if (this.meta) {
-      await this.loadMeta(refresh);
+      await this.loadMeta(refresh && changedFiles.has('meta'));
     }
     if (this.toc) {
-      await this.loadToc(refresh);
+      await this.loadToc(refresh && changedFiles.has('toc'));
     }
     return refresh;
   }
 
+  /**
+   * Get the tree file groups that have been changed since the given versions.
+   *
+   * @param {Map<string, string>} [treeVersions] - version tokens of a
+   *   previous this.treeVersions
+   * @return {Set<string>} changed groups, e.g. "meta" if any of meta.js,
+   *   meta1.js, ... has been added, removed, or modified.
+   */
+  getChangedTreeFiles(treeVersions) {
+    const rv = new Set();
+    const oldVersions = treeVersions || new Map();
+    const newVersions = this.treeVersions || new Map();
+    for (const [name, token] of newVersions) {
+      if (oldVersions.get(name) !== token) {
+        rv.add(name.replace(/\d*\.js$/, ''));
+      }
+    }
+    for (const name of oldVersions.keys()) {
+      if (!newVersions.has(name)) {
+        rv.add(name.replace(/\d*\.js$/, ''));
+      }
+    }
+    return rv;
+  }
+
   async lockTree({
     id,
     timeout = 5,
@@ -703,7 +1038,7 @@ class Book {
    */
   async saveMeta() {
     const exportFile = async (meta, i) => {
-      const content = this.generateMetaFile(meta);
+      const content = await this.server.generateTreeFile('meta', meta);
       const file = new File([content], `meta${i || ""}.js`, {type: "application/javascript"});
       const target = this.treeUrl + file.name;
       await this.server.request({
@@ -766,7 +1101,7 @@ class Book {
    */
   async saveToc() {
     const exportFile = async (toc, i) => {
-      const content = this.generateTocFile(toc);
+      const content = await this.server.generateTreeFile('toc', toc);
       const file = new File([content], `toc${i || ""}.js`, {type: "application/javascript"});
       const target = this.treeUrl + file.name;
       await this.server.request({
@@ -837,7 +1172,10 @@ class Book {
    * @param {string} [params.backupTs] - the timestamp for the automatic backup
    *   ("validate" mode).
    * @param {boolean} [params.updated] - whether the server tree has been
-   *   updated ("refresh" mode).
+   *   updated ("refresh" and "optimistic" mode).
+   * @param {Set<string>} [params.changedFiles] - the tree file groups that
+   *   have been updated, e.g. "meta" or "toc" ("refresh" and "optimistic"
+   *   mode).
    */
 
   /**
@@ -858,12 +1196,23 @@ class Book {
    *     remote tree has been updated.
    *   - "refresh": refresh the tree before the request and pass an extra param
    *     about whether the remote tree has been updated.
+   *   - "optimistic": do not lock the tree. Refresh the tree before the
+   *     request like "refresh" mode, and run the callback again if it fails
+   *     due to a conflict (the tree has been updated by another client or the
+   *     server failed to acquire its tree lock). The callback should send
+   *     queries without the `lock` param to have the server lock the tree
+   *     for each query atomically. Auto backup is not performed in this
+   *     mode.
    * @param {boolean|Promise<boolean>} [params.autoBackup] - whether to
    *   automatically create a temporary tree backup before a transaction and
    *   remove after success.
    * @param {string} [params.autoBackupTs] - timestamp for the auto backup.
    * @param {string} [params.autoBackupNote] - note for the auto backup.
    * @param {integer} [params.timeout] - timeout for lock.
+   * @param {integer} [params.retryCount] - max times to retry when the tree
+   *   has been locked by another process or a conflict occurs.
+   * @param {integer} [params.retryDelay] - base delay (in ms) before a retry,
+   *   which is doubled for each retry.
    */
   async transaction({
     callback,
@@ -872,20 +1221,34 @@ class Book {
     autoBackupTs,
     autoBackupNote = 'transaction',
     timeout = 5,
+    retryCount = 2,
+    retryDelay = 1000,
   }) {
+    if (mode === 'optimistic') {
+      return await this._transactionOptimistic({callback, retryCount, retryDelay});
+    }
+
     let lockId;
     let keeper;
     let backupTs;
     let updated;
+    let changedFiles;
 
     // lock the tree
-    try {
-      lockId = await this.lockTree({timeout});
-    } catch (ex) {
-      if (ex.status === 503) {
-        throw new Error(`Tree of remote book "${this.id}" has been locked by another process. Try again later.`);
-      } else {
-        throw new Error(`Failed to lock tree for remote book "${this.id}".`);
+    for (let i = 0; ; i++) {
+      try {
+        lockId = await this.lockTree({timeout});
+        break;
+      } catch (ex) {
+        if (ex.status === 503) {
+          if (i < retryCount) {
+            await scrapbook.delay(scrapbook.Retrier.getBackoffDelay(retryDelay, i));
+            continue;
+          }
+          throw new Error(`Tree of remote book "${this.id}" has been locked by another process. Try again later.`);
+        } else {
+          throw new Error(`Failed to lock tree for remote book "${this.id}".`);
+        }
       }
     }
 
@@ -910,7 +1273,9 @@ class Book {
           break;
         }
         case 'refresh': {
+          const treeVersions = this.treeVersions;
           updated = !await this.validateTree();
+          changedFiles = this.getChangedTreeFiles(treeVersions);
           break;
         }
       }
@@ -943,7 +1308,7 @@ class Book {
 
       // run the callback
       const discardLock = () => { lockId = null; };
-      await callback.call(this, this, {lockId, discardLock, backupTs, updated});
+      await callback.call(this, this, {lockId, discardLock, backupTs, updated, changedFiles});
 
       // clear auto backup if transaction successful
       if (backupTs) {
@@ -979,34 +1344,68 @@ class Book {
     }
   }
 
+  async _transactionOptimistic({callback, retryCount, retryDelay}) {
+    const discardLock = () => {};
+    for (let i = 0; ; i++) {
+      const treeVersions = this.treeVersions;
+      const updated = !await this.validateTree();
+      const changedFiles = this.getChangedTreeFiles(treeVersions);
+      try {
+        await callback.call(this, this, {lockId: null, discardLock, updated, changedFiles});
+        return;
+      } catch (ex) {
+        if (i >= retryCount) {
+          throw ex;
+        }
+
+        // Retry only for a conflict. A failed query does not change the
+        // tree, so a changed tree means that another client has updated it
+        // in the meantime.
+        if (ex.status !== 503) {
+          const lastModified = this.treeLastModified;
+          const versions = this.treeVersions;
+          await this.loadTreeFiles(true);
+          const conflicted = this.treeLastModified !== lastModified;
+
+          // restore the versions so that the next round gets updated
+          this.treeLastModified = lastModified;
+          this.treeVersions = versions;
+
+          if (!conflicted) {
+            throw ex;
+          }
+        }
+
+        await scrapbook.delay(scrapbook.Retrier.getBackoffDelay(retryDelay, i));
+      }
+    }
+  }
+
   generateMetaFile(jsonData) {
-    // Escape U+2028 and U+2029 for embedded JSON data used as JavaScript
-    // code to prevent script breakage and potential security issue in old
-    // browsers not supporting ES2019, as they are not allowed in a string
-    // literal.
-    // https://stackoverflow.com/questions/16005091/node-js-javascript-stringify
-    return `/**
- * Feel free to edit this file, but keep data code valid JSON format.
- */
-scrapbook.meta(${JSON.stringify(jsonData, null, 2).replace(/\u2028/g, '\\u2028').replace(/\u2029/g, '\\u2029')})`;
+    return generateTreeFile('meta', jsonData);
   }
 
   generateTocFile(jsonData) {
-    // see generateMetaFile for the replacing
-    return `/**
- * Feel free to edit this file, but keep data code valid JSON format.
- */
-scrapbook.toc(${JSON.stringify(jsonData, null, 2).replace(/\u2028/g, '\\u2028').replace(/\u2029/g, '\\u2029')})`;
+    return generateTreeFile('toc', jsonData);
   }
 
+  /**
+   * Generate a new item ID.
+   *
+   * - Allocate monotonically from the last generated ID so that a series of
+   *   generation does not probe the IDs taken by the previous ones again.
+   *
+   * @return {string}
+   */
   generateId() {
-    let d = new Date();
-    let i = d.valueOf();
+    let i = Math.max(Date.now(), this.lastIdTime + 1);
+    const d = new Date(i);
     let id = scrapbook.dateToId(d);
     while (this.meta[id]) {
       d.setTime(++i);
       id = scrapbook.dateToId(d);
     }
+    this.lastIdTime = i;
     return id;
   }
 
@@ -1252,10 +1651,10 @@ scrapbook.toc(${JSON.stringify(jsonData, null, 2).replace(/\u2028/g, '\\u2028').
    * @throws {Error} when the favicon cannot be cached
    */
   async cacheFavIcon({book, item, icon}) {
-    const getShaFile = (data) => {
+    const getShaFile = async (data) => {
       if (!data) { throw new Error(`Unable to fetch a file for this favicon URL.`); }
 
-      let {ab, mime, ext} = data;
+      let {blob, mime, ext} = data;
 
       // validate that we have a correct image mimetype
       if (!mime.startsWith('image/') && mime !== 'application/octet-stream') {
@@ -1265,13 +1664,13 @@ scrapbook.toc(${JSON.stringify(jsonData, null, 2).replace(/\u2028/g, '\\u2028').
       // if no extension, generate one according to mime
       if (!ext) { ext = Mime.extension(mime); }
 
-      const sha = scrapbook.sha1(ab, 'ARRAYBUFFER');
-      return new File([ab], `${sha}${ext ? '.' + ext : ''}`, {type: mime});
+      const sha = await scrapbook.getDigest(blob, 'SHA-1');
+      return new File([blob], `${sha}${ext ? '.' + ext : ''}`, {type: mime});
     };
 
     const getFavIcon = async (favIconUrl) => {
       if (favIconUrl.startsWith("data:")) {
-        return scrapbook.dataUriToFile(favIconUrl, false);
+        return await scrapbook.dataUriToFile(favIconUrl, false);
       }
 
       const headers = {};
@@ -1296,8 +1695,7 @@ scrapbook.toc(${JSON.stringify(jsonData, null, 2).replace(/\u2028/g, '\\u2028').
       const blob = xhr.response;
       const mime = blob.type;
 
-      const ab = await scrapbook.readFileAsArrayBuffer(blob);
-      return getShaFile({ab, mime, ext});
+      return await getShaFile({blob, mime, ext});
     };
 
     if (!scrapbook.isUrlAbsolute(icon)) {
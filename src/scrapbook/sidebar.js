@@ -1623,42 +1623,48 @@ const sidebar = {
   },
 
   async uploadItems(files, targetId, targetIndex) {
-    await this.book.transaction({
-      mode: 'validate',
-      callback: async (book) => {
-        const items = [];
-        for (const file of files) {
-          try {
-            // create new item
-            const newItem = book.addItem({
-              title: file.name,
-              type: "file",
-            });
-            newItem.index = newItem.id + '/index.html';
-
-            let filename = file.name;
-            if (filename === 'index.html') { filename = 'index-1.html'; }
-            filename = scrapbook.validateFilename(filename, scrapbook.getOption("capture.saveAsciiFilename"));
-
-            // upload file
-            {
-              const target = book.dataUrl + scrapbook.escapeFilename(newItem.id + '/' + filename);
-              await server.request({
-                url: target + '?a=save',
-                method: "POST",
-                format: 'json',
-                csrfToken: true,
-                body: {
-                  upload: file,
-                },
-              });
-            }
+    const book = this.book;
+
+    // The tree is locked only when adding the uploaded items, which may take
+    // long for many files. Generate the items without adding them to the
+    // book, so that nothing is left behind if an upload fails.
+    const createItem = (file) => {
+      const id = book.generateId();
+      return Object.assign(book.defaultMeta, {
+        id,
+        index: id + '/index.html',
+        title: file.name,
+        type: "file",
+        create: id,
+        modify: id,
+      });
+    };
+
+    const deleteItemFiles = async (item) => {
+      try {
+        await server.request({
+          url: book.dataUrl + scrapbook.escapeFilename(item.id),
+          query: {
+            a: 'delete',
+          },
+          method: "POST",
+          format: 'json',
+          csrfToken: true,
+        });
+      } catch (ex) {
+        console.error(ex);
+      }
+    };
+
+    const uploadItem = async (item, file) => {
+      let filename = file.name;
+      if (filename === 'index.html') { filename = 'index-1.html'; }
+      filename = scrapbook.validateFilename(filename, scrapbook.getOption("capture.saveAsciiFilename"));
 
-            // upload index.html
-            {
-              const title = newItem.title;
-              const url = scrapbook.escapeFilename(filename);
-              const html = `<!DOCTYPE html>
+      // generate index.html
+      const title = item.title;
+      const url = scrapbook.escapeFilename(filename);
+      const html = `<!DOCTYPE html>
 <html data-scrapbook-type="file">
 <head>
 <meta charset="UTF-8">
@@ -1669,48 +1675,111 @@ Redirecting to file <a href="${scrapbook.escapeHtml(url)}">${scrapbook.escapeHtm
 </body>
 </html>
 `;
-              const file = new File([html], 'index.html', {type: 'text/html'});
-              const target = book.dataUrl + scrapbook.escapeFilename(newItem.id + '/index.html');
-              await server.request({
-                url: target + '?a=save',
-                method: "POST",
-                format: 'json',
-                csrfToken: true,
-                body: {
-                  upload: file,
-                },
-              });
-            }
+      const indexFile = new File([html], 'index.html', {type: 'text/html'});
 
-            items.push(newItem);
-          } catch (ex) {
-            console.error(ex);
-            this.warn(`Unable to upload '${file.name}': ${ex.message}`);
+      // upload file and index.html
+      try {
+        await Promise.all([
+          [filename, file],
+          ['index.html', indexFile],
+        ].map(([filename, file]) => {
+          const target = book.dataUrl + scrapbook.escapeFilename(item.id + '/' + filename);
+          return server.request({
+            url: target + '?a=save',
+            method: "POST",
+            format: 'json',
+            csrfToken: true,
+            body: {
+              upload: file,
+            },
+          });
+        }));
+      } catch (ex) {
+        // remove the file that has been uploaded, if any
+        await deleteItemFiles(item);
+        throw ex;
+      }
+    };
+
+    let workers = scrapbook.getOption("capture.serverUploadWorkers");
+    if (!(workers >= 1)) { workers = Infinity; }
+    workers = Math.min(workers, files.length);
+
+    const uploads = [];
+    let taskIdx = 0;
+    let doneCount = 0;
+    const runTask = async () => {
+      while (taskIdx < files.length) {
+        const idx = taskIdx++;
+        const file = files[idx];
+        const item = createItem(file);
+        try {
+          await uploadItem(item, file);
+          uploads[idx] = {item, file};
+          this.log(`Uploaded "${file.name}" (${++doneCount}/${files.length})`);
+        } catch (ex) {
+          console.error(ex);
+          this.warn(`Unable to upload '${file.name}': ${ex.message}`);
+        }
+      }
+    };
+    await Promise.all(Array.from({length: workers}, () => runTask()));
+
+    const uploaded = uploads.filter(x => x);
+    if (!uploaded.length) {
+      return;
+    }
+
+    // update book
+    await book.transaction({
+      mode: 'refresh',
+      callback: async (book) => {
+        // the tree may have been changed during the upload
+        if (!book.meta[targetId] && !book.isSpecialItem(targetId)) {
+          throw new Error(`target item "${targetId}" does not exist.`);
+        }
+        if (Number.isInteger(targetIndex)) {
+          targetIndex = Math.min(targetIndex, (book.toc[targetId] || []).length);
+        }
+
+        // an item with the same ID may have been added by another client,
+        // in which case upload again with a new ID
+        for (const upload of uploaded) {
+          if (!book.meta[upload.item.id]) {
+            continue;
           }
+          const item = createItem(upload.file);
+          await uploadItem(item, upload.file);
+          upload.item = item;
         }
 
-        // update book
-        await server.request({
-          query: {
-            a: 'query',
-            lock: '',
-          },
-          body: {
-            q: JSON.stringify({
-              book: book.id,
-              cmd: 'add_items',
-              kwargs: {
-                items,
-                target_parent_id: targetId,
-                target_index: targetIndex,
-              },
-            }),
-            auto_cache: JSON.stringify(scrapbook.autoCacheOptions()),
-          },
-          method: 'POST',
-          format: 'json',
-          csrfToken: true,
-        });
+        try {
+          await server.request({
+            query: {
+              a: 'query',
+              lock: '',
+            },
+            body: {
+              q: JSON.stringify({
+                book: book.id,
+                cmd: 'add_items',
+                kwargs: {
+                  items: uploaded.map(x => x.item),
+                  target_parent_id: targetId,
+                  target_index: targetIndex,
+                },
+              }),
+              auto_cache: JSON.stringify(scrapbook.autoCacheOptions()),
+            },
+            method: 'POST',
+            format: 'json',
+            csrfToken: true,
+          });
+        } catch (ex) {
+          // remove the uploaded files, which are not referenced by any item
+          await Promise.all(uploaded.map(({item}) => deleteItemFiles(item)));
+          throw ex;
+        }
 
         await this.rebuild();
       },
@@ -0,0 +1,63 @@
+/******************************************************************************
+ * Shared functions for the tree files (meta#.js, toc#.js, etc.) of a book.
+ *
+ * Loaded by the server module, the tree worker, and the benchmark tests, so
+ * that they share the same implementation.
+ *
+ * @module treeFile
+ *****************************************************************************/
+
+(function (global, factory) {
+  if (typeof exports === "object" && typeof module === "object") {
+    // CommonJS
+    module.exports = factory();
+  } else if (typeof define === "function" && define.amd) {
+    // AMD
+    define(factory);
+  } else {
+    // Browser globals
+    global = typeof globalThis !== "undefined" ? globalThis : global || self;
+    global.treeFile = factory();
+  }
+}(this, function () {
+
+'use strict';
+
+/**
+ * Parse the JSON data from the content of a tree file.
+ *
+ * @param {string} text
+ * @return {Object}
+ */
+function parseTreeFile(text) {
+  if (!/^(?:\/\*.*\*\/|[^(])+\(([\s\S]*)\)(?:\/\*.*\*\/|[\s;])*$/.test(text)) {
+    throw new Error(`unable to retrieve JSON data.`);
+  }
+  return JSON.parse(RegExp.$1);
+}
+
+/**
+ * Generate the content of a tree file.
+ *
+ * @param {string} name - e.g. "meta", "toc"
+ * @param {Object} jsonData
+ * @return {string}
+ */
+function generateTreeFile(name, jsonData) {
+  // Escape U+2028 and U+2029 for embedded JSON data used as JavaScript
+  // code to prevent script breakage and potential security issue in old
+  // browsers not supporting ES2019, as they are not allowed in a string
+  // literal.
+  // https://stackoverflow.com/questions/16005091/node-js-javascript-stringify
+  return `/**
+ * Feel free to edit this file, but keep data code valid JSON format.
+ */
+scrapbook.${name}(${JSON.stringify(jsonData, null, 2).replace(/\u2028/g, '\\u2028').replace(/\u2029/g, '\\u2029')})`;
+}
+
+return {
+  parseTreeFile,
+  generateTreeFile,
+};
+
+}));
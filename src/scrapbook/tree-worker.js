@@ -0,0 +1,58 @@
+/******************************************************************************
+ * Worker for parsing and serializing tree files off the UI thread.
+ *
+ * Receives messages in the form of {id, cmd, args} and replies with
+ * {id, result} or {id, error}.
+ *
+ * @module treeWorker
+ *****************************************************************************/
+
+(function (global, factory) {
+  // Worker globals
+  global.importScripts('tree-file.js');
+  global.addEventListener('message', factory(global.treeFile));
+}(this, function (treeFile) {
+
+'use strict';
+
+const encoder = new TextEncoder();
+const decoder = new TextDecoder();
+
+const commands = {
+  /**
+   * Parse the JSON data from the content of a tree file.
+   *
+   * @param {ArrayBuffer} buffer
+   * @return {Object}
+   */
+  parseTreeFile(buffer) {
+    return {result: treeFile.parseTreeFile(decoder.decode(buffer))};
+  },
+
+  /**
+   * Generate the content of a tree file.
+   *
+   * @param {string} name - e.g. "meta", "toc"
+   * @param {Object} jsonData
+   * @return {ArrayBuffer} the UTF-8 encoded content (transferred)
+   */
+  generateTreeFile(name, jsonData) {
+    const text = treeFile.generateTreeFile(name, jsonData);
+    const buffer = encoder.encode(text).buffer;
+    return {result: buffer, transfer: [buffer]};
+  },
+};
+
+return function onMessage(event) {
+  const {id, cmd, args} = event.data;
+  let rv;
+  try {
+    rv = commands[cmd](...args);
+  } catch (ex) {
+    self.postMessage({id, error: ex.message});
+    return;
+  }
+  self.postMessage({id, result: rv.result}, rv.transfer || []);
+};
+
+}));
@@ -143,6 +143,75 @@ async function clearViewerCaches() {
   await scrapbook.cache.removeAll(filter, 'storage');
 }
 
+/**
+ * Serve a file of a loaded archive, at "viewer/!/<id>/<path>".
+ *
+ * @param {Request} request
+ * @return {Promise<Response>}
+ */
+async function serveArchiveFile(request) {
+  const base = browser.runtime.getURL("viewer/!/");
+  const urlObj = new URL(request.url);
+  urlObj.search = "";
+  urlObj.hash = "";
+  const [id, ...parts] = urlObj.href.slice(base.length).split("/");
+  const path = parts.map(x => scrapbook.decodeURIComponent(x)).join("/");
+
+  const key = {table: "pageCache", id: scrapbook.decodeURIComponent(id), path};
+  const file = await scrapbook.cache.get(key, 'indexedDB');
+  if (!file || file.type === "inode/directory") {
+    return new Response(null, {status: 404, statusText: "Not Found"});
+  }
+
+  const headers = {
+    "Content-Type": file.type || "application/octet-stream",
+    "Accept-Ranges": "bytes",
+    // forbid scripts as the file is served in the extension origin
+    "Content-Security-Policy": "sandbox allow-same-origin allow-popups allow-downloads; script-src 'none'; object-src 'none'",
+  };
+
+  // support a single range for media streaming
+  const range = /^bytes=(\d*)-(\d*)$/.exec(request.headers.get("Range") || "");
+  if (range && (range[1] || range[2])) {
+    const size = file.size;
+    let start, end;
+    if (range[1]) {
+      start = parseInt(range[1], 10);
+      end = range[2] ? Math.min(parseInt(range[2], 10), size - 1) : size - 1;
+    } else {
+      start = Math.max(size - parseInt(range[2], 10), 0);
+      end = size - 1;
+    }
+    if (start > end || start >= size) {
+      return new Response(null, {
+        status: 416,
+        statusText: "Range Not Satisfiable",
+        headers: {"Content-Range": `bytes */${size}`},
+      });
+    }
+    headers["Content-Range"] = `bytes ${start}-${end}/${size}`;
+    headers["Content-Length"] = String(end - start + 1);
+    return new Response(request.method === "HEAD" ? null : file.slice(start, end + 1), {
+      status: 206,
+      statusText: "Partial Content",
+      headers,
+    });
+  }
+
+  headers["Content-Length"] = String(file.size);
+  return new Response(request.method === "HEAD" ? null : file, {
+    status: 200,
+    headers,
+  });
+}
+
+function onFetch(event) {
+  if (!event.request.url.startsWith(browser.runtime.getURL("viewer/!/"))) {
+    return;
+  }
+  event.respondWith(serveArchiveFile(event.request));
+}
+
 async function init() {
   clearViewerCaches(); // async
 
@@ -151,6 +220,12 @@ async function init() {
   toggleViewerListeners();
 }
 
+// In a service worker, serve files of loaded archives to the viewer.
+// This must be registered during the initial evaluation of the script.
+if (typeof ServiceWorkerGlobalScope !== 'undefined' && self instanceof ServiceWorkerGlobalScope) {
+  self.addEventListener('fetch', onFetch);
+}
+
 init();
 
 return {
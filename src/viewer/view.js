@@ -16,6 +16,9 @@
 
 scrapbook.loadLanguages(document);
 
+const VIEWER_REWRITE_CACHE_VERSION = 1;
+const VIEWER_REWRITE_CACHE_MAX_SIZE = 64 * 1024 * 1024;
+
 const urlObj = new URL(document.URL);
 
 const viewerData = {
@@ -23,6 +26,7 @@ const viewerData = {
   id: urlObj.searchParams.get('id'),
   dir: urlObj.searchParams.get('d'),
   indexFile: urlObj.searchParams.get('p'),
+  serveArchive: false,
 };
 
 const viewer = {
@@ -32,11 +36,47 @@ const viewer = {
   blobUrlToInZipPath: new Map(),
   rewrittenBlobUrl: new Set(),
 
+  rewriteTemplates: new Map(),
+  rewriteCacheUsed: new Map(),
+
   inZipPathToUrl(inZipPath) {
     return viewerData.virtualBase + (inZipPath || "").split("/").map(x => encodeURIComponent(x)).join("/");
   },
 
-  parseUrl(url, refUrl) {
+  /**
+   * Check whether the files of the archive can be served by the service
+   * worker, which answers requests to "viewer/!/<id>/<path>" directly from
+   * the cache, so that pages are loaded with their original URLs.
+   *
+   * @param {string} indexFile
+   * @return {Promise<boolean>}
+   */
+  async checkArchiveServing(indexFile) {
+    if (!navigator.serviceWorker?.controller) {
+      return false;
+    }
+    const base = browser.runtime.getURL("viewer/!/" + encodeURIComponent(viewerData.id) + "/");
+    try {
+      const url = base + indexFile.split("/").map(x => encodeURIComponent(x)).join("/");
+      const response = await fetch(url, {method: "HEAD"});
+      if (!response.ok) {
+        return false;
+      }
+    } catch (ex) {
+      return false;
+    }
+    viewerData.virtualBase = base;
+    return true;
+  },
+
+  /**
+   * Resolve a URL, regardless of whether the targeted file exists in the zip.
+   *
+   * @param {string} url
+   * @param {string} [refUrl]
+   * @return {Object}
+   */
+  resolveUrl(url, refUrl) {
     let absoluteUrl;
     try {
       absoluteUrl = new URL(url, refUrl || undefined);
@@ -54,109 +94,300 @@ const viewer = {
       let inZipPath = absoluteUrl.href.slice(viewerData.virtualBase.length);
       inZipPath = inZipPath.split("/").map(x => scrapbook.decodeURIComponent(x)).join("/");
 
-      const f = viewer.inZipFiles.get(inZipPath);
-      if (f) {
-        // url targets a file in zip, return its blob URL
-        return {
-          url: f.url + hash, // blob URL with a search is invalid
-          virtualUrl: absoluteUrl.href + hash,
-          inZip: true,
-          inZipPath,
-          mime: f.file.type,
-          search,
-          hash,
-        };
-      } else {
-        // url targets a non-exist file in zip, return original (invalid)
-        return {url, inZip: false};
-      }
+      return {
+        url,
+        virtualUrl: absoluteUrl.href + hash,
+        inZip: true,
+        inZipPath,
+        search,
+        hash,
+      };
     }
     // url target not in zip, return absolute URL
     return {url: absoluteUrl.href, inZip: false};
   },
 
   /**
-   * @callback fetchFileRewriteFunc
    * @param {Object} params
-   * @param {Blob} params.data
-   * @param {string} params.charset
+   * @param {string} params.inZipPath
    * @param {string} params.url
-   * @return {Promise<Object>}
+   * @param {Array} params.recurseChain
+   * @return {Promise<string>} The URL of the page.
    */
+  async fetchPage({inZipPath, url, recurseChain}) {
+    let searchAndHash = "";
+    if (url) {
+      const [base, search, hash] = scrapbook.splitUrl(url);
+      searchAndHash = hash; // blob URL with a search is invalid
+    }
+    const fetchedUrl = await viewer.fetchFile({
+      inZipPath,
+      kind: "page",
+      recurseChain,
+    });
+    return fetchedUrl ? fetchedUrl + searchAndHash : fetchedUrl;
+  },
 
   /**
+   * Bind a file with fresh blob URLs and create an object URL for it.
+   *
    * @param {Object} params
    * @param {string} params.inZipPath
-   * @param {fetchFileRewriteFunc} [params.rewriteFunc]
+   * @param {string} params.kind - "page" or "css"
    * @param {Array} params.recurseChain
    * @return {Promise<string>} The object URL of the file.
    */
-  async fetchFile({inZipPath, rewriteFunc, recurseChain}) {
+  async fetchFile({inZipPath, kind, recurseChain}) {
     const f = viewer.inZipFiles.get(inZipPath);
-    if (f) {
-      if (rewriteFunc) {
-        const rewrittenFile = await rewriteFunc({
-          data: f.file,
-          charset: null,
-          url: viewer.inZipPathToUrl(inZipPath),
-          recurseChain,
-        });
-        const u = URL.createObjectURL(rewrittenFile);
-        viewer.blobUrlToInZipPath.set(u, inZipPath);
-        viewer.rewrittenBlobUrl.add(u);
-        return u;
-      }
-      return f.url;
+    if (!f) {
+      return null;
+    }
+
+    let blob;
+    try {
+      const template = await viewer.getRewriteTemplate({inZipPath, kind});
+      blob = template ?
+          await viewer.bindRewriteTemplate(template, [...recurseChain, viewer.inZipPathToUrl(inZipPath)]) :
+          f.file;
+    } catch (ex) {
+      console.error(ex);
+      blob = f.file;
     }
-    return null;
+
+    const u = URL.createObjectURL(blob);
+    viewer.blobUrlToInZipPath.set(u, inZipPath);
+    viewer.rewrittenBlobUrl.add(u);
+    return u;
   },
 
   /**
+   * @typedef {Object} rewriteTemplate
+   * @property {string} type - the MIME type of the rewritten file
+   * @property {string} text - the rewritten text, with URL slots in the form
+   *   of "urn:scrapbook:url:<key>"
+   * @property {boolean} [byteString] - whether text is a byte string
+   * @property {Object<string, rewriteTemplateSlot>} slots
+   */
+
+  /**
+   * @typedef {Object} rewriteTemplateSlot
+   * @property {string} kind - "file", "page", "css", "refresh", or "blocked"
+   * @property {string} [inZipPath]
+   * @property {string} url - the URL to use if the target file doesn't exist
+   */
+
+  /**
+   * Get the rewrite template of a file.
+   *
+   * A template is independent of blob URLs and the files that exist in the
+   * zip, and is cached persistently by the digest of the file content.
+   *
    * @param {Object} params
    * @param {string} params.inZipPath
-   * @param {string} params.url
-   * @param {Array} params.recurseChain
-   * @return {Promise<string>} The URL of the page.
+   * @param {string} params.kind - "page" or "css"
+   * @return {Promise<?rewriteTemplate>} null if the file shouldn't be rewritten
    */
-  async fetchPage({inZipPath, url, recurseChain}) {
-    let searchAndHash = "";
-    if (url) {
-      const [base, search, hash] = scrapbook.splitUrl(url);
-      searchAndHash = hash; // blob URL with a search is invalid
+  async getRewriteTemplate({inZipPath, kind}) {
+    const {file} = viewer.inZipFiles.get(inZipPath);
+    if (kind === "page" && !["text/html", "application/xhtml+xml", "image/svg+xml"].includes(file.type)) {
+      return null;
     }
-    const fetchedUrl = await viewer.fetchFile({
-      inZipPath: inZipPath,
-      rewriteFunc: async ({data, charset, recurseChain}) => {
-        if (["text/html", "application/xhtml+xml", "image/svg+xml"].includes(data.type)) {
+
+    const memoKey = JSON.stringify([kind, inZipPath]);
+    let promise = viewer.rewriteTemplates.get(memoKey);
+    if (!promise) {
+      promise = (async () => {
+        const digest = await scrapbook.getDigest(file, 'SHA-256');
+        const key = {
+          table: "viewerRewriteCache",
+          version: VIEWER_REWRITE_CACHE_VERSION,
+          kind,
+          path: inZipPath,
+          digest,
+        };
+        const keyStr = JSON.stringify(key);
+
+        let template = await scrapbook.cache.get(key, 'indexedDB');
+        if (!template) {
+          template = kind === "css" ?
+              await viewer.processCssFile({inZipPath}) :
+              await viewer.processPageFile({inZipPath});
           try {
-            const doc = await scrapbook.readFileAsDocument(data);
-            if (!doc) { throw new Error("document cannot be loaded"); }
-            return await viewer.parseDocument({
-              doc,
-              inZipPath,
-              recurseChain,
-            });
+            await scrapbook.cache.set(key, template, 'indexedDB');
           } catch (ex) {
-            return data;
+            console.error(ex);
           }
         }
-        return data;
-      },
-      recurseChain,
+
+        viewer.rewriteCacheUsed.set(keyStr, template.text.length + JSON.stringify(template.slots).length);
+        viewer.pruneRewriteCache(); // async
+        return template;
+      })();
+      viewer.rewriteTemplates.set(memoKey, promise);
+    }
+    return await promise;
+  },
+
+  /**
+   * @param {rewriteTemplate} template
+   * @param {Array} recurseChain - URLs of the files from the top, including
+   *   the file of the template
+   * @return {Promise<Blob>}
+   */
+  async bindRewriteTemplate(template, recurseChain) {
+    const urls = {};
+    await Promise.all(Object.entries(template.slots).map(async ([key, slot]) => {
+      urls[key] = await viewer.bindRewriteSlot(slot, recurseChain);
+    }));
+
+    const text = template.text.replace(/urn:scrapbook:url:([0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12})/g, (match, key) => {
+      if (key in urls) { return urls[key]; }
+      // This could happen when a web page really contains a content text in our format.
+      // We return the original text for keys not defineded in the map to prevent a bad replace
+      // since it's nearly impossible for them to hit on the hash keys we are using.
+      return match;
     });
-    return fetchedUrl ? fetchedUrl + searchAndHash : fetchedUrl;
+
+    if (template.byteString) {
+      return new Blob([scrapbook.byteStringToArrayBuffer(text)], {type: template.type});
+    }
+    return new Blob([text], {type: template.type});
+  },
+
+  /**
+   * @param {rewriteTemplateSlot} slot
+   * @param {Array} recurseChain
+   * @return {Promise<string>}
+   */
+  async bindRewriteSlot(slot, recurseChain) {
+    const f = slot.inZipPath !== undefined ? viewer.inZipFiles.get(slot.inZipPath) : null;
+    switch (slot.kind) {
+      case "file": {
+        return f ? f.url : slot.url;
+      }
+      case "blocked": {
+        // In Chromium, "blob:" is still allowed even if it's not set in the
+        // content_security_policy, and thus offensive scripts could run.
+        // Replace the src with a dummy URL so that scripts are never loaded.
+        return f ? "blob:" : slot.url;
+      }
+      case "page":
+      case "css":
+      case "refresh": {
+        if (f) {
+          const targetUrl = viewer.inZipPathToUrl(slot.inZipPath);
+          if (recurseChain.includes(targetUrl)) {
+            // console.warn("Resource '" + recurseChain[recurseChain.length - 1] + "' has a circular reference to '" + targetUrl + "'.");
+            return "about:blank";
+          }
+          return await viewer.fetchFile({
+            inZipPath: slot.inZipPath,
+            kind: slot.kind === "css" ? "css" : "page",
+            recurseChain,
+          });
+        }
+
+        if (slot.kind === "refresh") {
+          const content = `<!DOCTYPE html>
+<html ${viewer.metaRefreshIdentifier}="1">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+</head>
+<body>
+Redirecting to: <a href="${scrapbook.escapeHtml(slot.url)}">${scrapbook.escapeHtml(slot.url, true)}</a>
+</body>
+</html>
+`;
+          return URL.createObjectURL(new Blob([content], {type: "text/html"}));
+        }
+
+        return slot.url;
+      }
+    }
+    return slot.url;
+  },
+
+  /**
+   * Record the access of the used templates and evict the least recently
+   * used ones if the cache exceeds the size limit.
+   */
+  pruneRewriteCache: scrapbook.debounce(async () => {
+    const indexKey = {table: "viewerRewriteCacheIndex"};
+    const index = await scrapbook.cache.get(indexKey, 'indexedDB') || {};
+    const now = Date.now();
+    for (const [keyStr, size] of viewer.rewriteCacheUsed) {
+      index[keyStr] = {size, time: now};
+    }
+
+    const entries = Object.entries(index).sort((a, b) => b[1].time - a[1].time);
+    let total = 0;
+    for (const [keyStr, {size}] of entries) {
+      total += size;
+      if (total > VIEWER_REWRITE_CACHE_MAX_SIZE && !viewer.rewriteCacheUsed.has(keyStr)) {
+        await scrapbook.cache.remove(keyStr, 'indexedDB');
+        delete index[keyStr];
+      }
+    }
+
+    await scrapbook.cache.set(indexKey, index, 'indexedDB');
+  }, {delay: 1000}),
+
+  /**
+   * @param {Object} params
+   * @param {string} params.inZipPath
+   * @return {Promise<?rewriteTemplate>}
+   */
+  async processPageFile({inZipPath}) {
+    const {file} = viewer.inZipFiles.get(inZipPath);
+    const doc = await scrapbook.readFileAsDocument(file);
+    if (!doc) { throw new Error("document cannot be loaded"); }
+    return await viewer.parseDocument({doc, inZipPath});
   },
 
   /**
    * @param {Object} params
    * @param {Document} params.doc
    * @param {string} params.inZipPath
-   * @param {Array} params.recurseChain
-   * @return {Promise<Blob>}
+   * @return {Promise<rewriteTemplate>}
    */
-  async parseDocument({doc, inZipPath, recurseChain}) {
+  async parseDocument({doc, inZipPath}) {
+    const slots = new UrlSlots();
+
+    // rewrite a URL to the targeted file
     const rewriteUrl = function (url, refUrlOverwrite) {
-      return viewer.parseUrl(url, refUrlOverwrite || refUrl).url;
+      const info = viewer.resolveUrl(url, refUrlOverwrite || refUrl);
+      if (info.inZip) {
+        return slots.add("file", info);
+      }
+      return info.url;
+    };
+
+    // rewrite a URL to a file that could run a script
+    const rewriteUrlBlocked = function (url) {
+      const info = viewer.resolveUrl(url, refUrl);
+      if (info.inZip) {
+        return slots.add("blocked", info, {keepHash: false});
+      }
+      if (info.url.startsWith('blob:')) {
+        return "blob:";
+      }
+      return info.url;
+    };
+
+    // rewrite a URL to a document or a file
+    const rewriteLink = function (url) {
+      const info = viewer.resolveUrl(url, refUrl);
+      if (info.inZip) {
+        if (info.inZipPath !== inZipPath) {
+          return slots.add("file", info);
+        } else {
+          // link to self
+          return info.hash || "#";
+        }
+      }
+      // link target is not in the zip
+      return info.url;
     };
 
     // the callback should return a falsy value if the elem is removed from DOM
@@ -190,47 +421,14 @@ const viewer = {
       if (rootName === "svg") {
         // href and xlink:href in SVG elements
         if (elem.hasAttribute("href")) {
-          const info = viewer.parseUrl(elem.getAttribute("href"), refUrl);
-          if (info.inZip) {
-            if (info.inZipPath !== inZipPath) {
-              elem.setAttribute("href", info.url);
-            } else {
-              // link to self
-              elem.setAttribute("href", info.hash || "#");
-            }
-          } else {
-            // link target is not in the zip
-            elem.setAttribute("href", info.url);
-          }
+          elem.setAttribute("href", rewriteLink(elem.getAttribute("href")));
         }
         if (elem.hasAttribute("xlink:href")) {
-          const info = viewer.parseUrl(elem.getAttribute("xlink:href"), refUrl);
-          if (info.inZip) {
-            if (info.inZipPath !== inZipPath) {
-              elem.setAttribute("xlink:href", info.url);
-            } else {
-              // link to self
-              elem.setAttribute("xlink:href", info.hash || "#");
-            }
-          } else {
-            // link target is not in the zip
-            elem.setAttribute("xlink:href", info.url);
-          }
+          elem.setAttribute("xlink:href", rewriteLink(elem.getAttribute("xlink:href")));
         }
       } else if (rootName === "math") {
         if (elem.hasAttribute("href")) {
-          const info = viewer.parseUrl(elem.getAttribute("href"), refUrl);
-          if (info.inZip) {
-            if (info.inZipPath !== inZipPath) {
-              elem.setAttribute("href", info.url);
-            } else {
-              // link to self
-              elem.setAttribute("href", info.hash || "#");
-            }
-          } else {
-            // link target is not in the zip
-            elem.setAttribute("href", info.url);
-          }
+          elem.setAttribute("href", rewriteLink(elem.getAttribute("href")));
         }
       } else {
         switch (elem.nodeName.toLowerCase()) {
@@ -238,41 +436,15 @@ const viewer = {
             if (elem.matches('meta[http-equiv="refresh"][content]')) {
               const metaRefresh = scrapbook.parseHeaderRefresh(elem.getAttribute("content"));
               if (metaRefresh.url) {
-                const info = viewer.parseUrl(metaRefresh.url, refUrl);
+                const info = viewer.resolveUrl(metaRefresh.url, refUrl);
                 const [sourcePage] = scrapbook.splitUrlByAnchor(refUrl);
                 const [targetPage, targetPageHash] = scrapbook.splitUrlByAnchor(info.virtualUrl || info.url);
                 if (targetPage !== sourcePage) {
-                  if (recurseChain.includes(targetPage)) {
-                    // console.warn("Resource '" + sourcePage + "' has a circular reference to '" + targetPage + "'.");
-                    elem.setAttribute("content", metaRefresh.time + "; url=about:blank");
-                    break;
-                  }
-                  if (info.inZip) {
-                    tasks[tasks.length] =
-                    viewer.fetchPage({
-                      inZipPath: info.inZipPath,
-                      url: info.url,
-                      recurseChain: [...recurseChain, refUrl],
-                    }).then((fetchedUrl) => {
-                      const url = fetchedUrl || info.url;
-                      elem.setAttribute("content", metaRefresh.time + ";url=" + url);
-                      return url;
-                    });
-                  } else {
-                    const content = `<!DOCTYPE html>
-<html ${viewer.metaRefreshIdentifier}="1">
-<head>
-<meta charset="UTF-8">
-<meta name="viewport" content="width=device-width,initial-scale=1">
-</head>
-<body>
-Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHtml(info.url, true)}</a>
-</body>
-</html>
-`;
-                    const url = URL.createObjectURL(new Blob([content], {type: "text/html"})) + targetPageHash;
-                    elem.setAttribute("content", metaRefresh.time + "; url=" + url);
-                  }
+                  // a page in the zip, or a redirect page for other URLs
+                  const url = info.inZip ?
+                      slots.add("refresh", info) :
+                      slots.add("refresh", info, {keepHash: false}) + targetPageHash;
+                  elem.setAttribute("content", metaRefresh.time + "; url=" + url);
                 } else {
                   elem.setAttribute("content", metaRefresh.time + (targetPageHash ? "; url=" + targetPageHash : ""));
                 }
@@ -286,17 +458,8 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
           case "link": {
             if (elem.hasAttribute("href")) {
               if (elem.matches('[rel~="stylesheet"]')) {
-                const info = viewer.parseUrl(elem.getAttribute("href"), refUrl);
-                tasks[tasks.length] =
-                viewer.fetchFile({
-                  inZipPath: info.inZipPath,
-                  rewriteFunc: viewer.processCssFile,
-                  recurseChain: [refUrl],
-                }).then((fetchedUrl) => {
-                  const url = fetchedUrl || info.url;
-                  elem.setAttribute("href", url);
-                  return url;
-                });
+                const info = viewer.resolveUrl(elem.getAttribute("href"), refUrl);
+                elem.setAttribute("href", info.inZip ? slots.add("css", info, {keepHash: false}) : info.url);
               } else {
                 elem.setAttribute("href", rewriteUrl(elem.getAttribute("href")));
               }
@@ -306,7 +469,7 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
 
           case "style": {
             tasks[tasks.length] =
-            viewer.processCssText(elem.textContent, refUrl, recurseChain).then((response) => {
+            viewer.processCssText(elem.textContent, refUrl, slots).then((response) => {
               elem.textContent = response;
               return response;
             });
@@ -315,14 +478,7 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
 
           case "script": {
             if (elem.hasAttribute("src")) {
-              elem.setAttribute("src", rewriteUrl(elem.getAttribute("src"), refUrl));
-
-              // In Chromium, "blob:" is still allowed even if it's not set in the
-              // content_security_policy, and thus offensive scripts could run.
-              // Replace the src with a dummy URL so that scripts are never loaded.
-              if (elem.src.startsWith('blob:')) {
-                elem.setAttribute("src", "blob:");
-              }
+              elem.setAttribute("src", rewriteUrlBlocked(elem.getAttribute("src")));
             }
             break;
           }
@@ -342,27 +498,8 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
           case "frame":
           case "iframe": {
             if (elem.hasAttribute("src")) {
-              const frameRecurseChain = [...recurseChain, refUrl];
-              const info = viewer.parseUrl(elem.getAttribute("src"), refUrl);
-              if (info.inZip) {
-                const targetUrl = viewer.inZipPathToUrl(info.inZipPath);
-                if (frameRecurseChain.includes(targetUrl)) {
-                  // console.warn("Resource '" + refUrl + "' has a circular reference to '" + targetUrl + "'.");
-                  elem.setAttribute("src", "about:blank");
-                  break;
-                }
-              }
-
-              tasks[tasks.length] =
-              viewer.fetchPage({
-                inZipPath: info.inZipPath,
-                url: info.url,
-                recurseChain: frameRecurseChain,
-              }).then((fetchedUrl) => {
-                const url = fetchedUrl || info.url;
-                elem.setAttribute("src", url);
-                return url;
-              });
+              const info = viewer.resolveUrl(elem.getAttribute("src"), refUrl);
+              elem.setAttribute("src", info.inZip ? slots.add("page", info) : info.url);
             }
             break;
           }
@@ -370,18 +507,7 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
           case "a":
           case "area": {
             if (elem.hasAttribute("href")) {
-              const info = viewer.parseUrl(elem.getAttribute("href"), refUrl);
-              if (info.inZip) {
-                if (info.inZipPath !== inZipPath) {
-                  elem.setAttribute("href", info.url);
-                } else {
-                  // link to self
-                  elem.setAttribute("href", info.hash || "#");
-                }
-              } else {
-                // link target is not in the zip
-                elem.setAttribute("href", info.url);
-              }
+              elem.setAttribute("href", rewriteLink(elem.getAttribute("href")));
             }
             break;
           }
@@ -440,53 +566,25 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
 
           case "embed": {
             if (elem.hasAttribute("src")) {
-              elem.setAttribute("src", rewriteUrl(elem.getAttribute("src"), refUrl));
-
-              // In Chromium, "blob:" is still allowed even if it's not set in the
-              // content_security_policy, and thus offensive scripts could run.
-              // Replace the src with a dummy URL so that scripts are never loaded.
-              if (elem.src.startsWith('blob:')) {
-                elem.setAttribute("src", "blob:");
-              }
+              elem.setAttribute("src", rewriteUrlBlocked(elem.getAttribute("src")));
             }
             break;
           }
 
           case "object": {
             if (elem.hasAttribute("data")) {
-              elem.setAttribute("data", rewriteUrl(elem.getAttribute("data"), refUrl));
-
-              // In Chromium, "blob:" is still allowed even if it's not set in the
-              // content_security_policy, and thus offensive scripts could run.
-              // Replace the src with a dummy URL so that scripts are never loaded.
-              if (elem.data.startsWith('blob:')) {
-                elem.setAttribute("data", "blob:");
-              }
+              elem.setAttribute("data", rewriteUrlBlocked(elem.getAttribute("data")));
             }
             break;
           }
 
           case "applet": {
             if (elem.hasAttribute("code")) {
-              elem.setAttribute("code", rewriteUrl(elem.getAttribute("code"), refUrl));
-
-              // In Chromium, "blob:" is still allowed even if it's not set in the
-              // content_security_policy, and thus offensive scripts could run.
-              // Replace the src with a dummy URL so that scripts are never loaded.
-              if (elem.getAttribute("code").startsWith('blob:')) {
-                elem.setAttribute("code", "blob:");
-              }
+              elem.setAttribute("code", rewriteUrlBlocked(elem.getAttribute("code")));
             }
 
             if (elem.hasAttribute("archive")) {
-              elem.setAttribute("archive", rewriteUrl(elem.getAttribute("archive"), refUrl));
-
-              // In Chromium, "blob:" is still allowed even if it's not set in the
-              // content_security_policy, and thus offensive scripts could run.
-              // Replace the src with a dummy URL so that scripts are never loaded.
-              if (elem.getAttribute("archive").startsWith('blob:')) {
-                elem.setAttribute("archive", "blob:");
-              }
+              elem.setAttribute("archive", rewriteUrlBlocked(elem.getAttribute("archive")));
             }
             break;
           }
@@ -514,7 +612,7 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
         // styles: style attribute
         if (elem.hasAttribute("style")) {
           tasks[tasks.length] =
-          viewer.processCssText(elem.getAttribute("style"), refUrl, recurseChain).then((response) => {
+          viewer.processCssText(elem.getAttribute("style"), refUrl, slots).then((response) => {
             elem.setAttribute("style", response);
             return response;
           });
@@ -550,93 +648,83 @@ Redirecting to: <a href="${scrapbook.escapeHtml(info.url)}">${scrapbook.escapeHt
 
     await Promise.all(tasks);
 
-    const content = scrapbook.documentToString(doc);
-    return new Blob([content], {type: doc.contentType});
+    return {
+      type: doc.contentType,
+      text: scrapbook.documentToString(doc),
+      slots: slots.slots,
+    };
   },
 
-  async processCssFile({data, charset, url: refUrl, recurseChain}) {
-    return await scrapbook.rewriteCssFile(data, charset, async (text) => {
-      return await viewer.processCssText(text, refUrl, recurseChain);
-    });
+  /**
+   * @param {Object} params
+   * @param {string} params.inZipPath
+   * @return {Promise<rewriteTemplate>}
+   */
+  async processCssFile({inZipPath}) {
+    const {file} = viewer.inZipFiles.get(inZipPath);
+    const refUrl = viewer.inZipPathToUrl(inZipPath);
+    const slots = new UrlSlots();
+    const {text, charset} = await scrapbook.parseCssFile(file, null);
+    const rewrittenText = await viewer.processCssText(text, refUrl, slots);
+    if (charset) {
+      return {type: "text/css;charset=UTF-8", text: rewrittenText, slots: slots.slots};
+    }
+    return {type: "text/css", text: rewrittenText, byteString: true, slots: slots.slots};
   },
 
-  async processCssText(cssText, refUrl, recurseChain) {
-    const fetcher = new ComplexUrlFetcher(refUrl, recurseChain);
+  async processCssText(cssText, refUrl, slots) {
+    const rewriteUrl = (url, kind) => {
+      const info = viewer.resolveUrl(url, refUrl);
+      if (info.inZip) {
+        return slots.add(kind, info, {keepHash: false});
+      }
+      return info.url;
+    };
 
-    const rewritten = scrapbook.rewriteCssText(cssText, {
+    return scrapbook.rewriteCssText(cssText, {
       rewriteImportUrl(url) {
-        return {url: fetcher.getUrlHash(url, viewer.processCssFile)};
+        return {url: rewriteUrl(url, "css")};
       },
       rewriteFontFaceUrl(url) {
-        return {url: fetcher.getUrlHash(url)};
+        return {url: rewriteUrl(url, "file")};
       },
       rewriteBackgroundUrl(url) {
-        return {url: fetcher.getUrlHash(url)};
+        return {url: rewriteUrl(url, "file")};
       },
     });
-
-    await fetcher.startFetches();
-    return fetcher.finalRewrite(rewritten);
   },
 };
 
-class ComplexUrlFetcher {
-  constructor(refUrl, recurseChain = []) {
-    this.urlHash = {};
-    this.urlRewrittenCount = 0;
-    this.recurseChain = [...recurseChain];
-    if (refUrl) {
-      // if a refUrl is specified, record the recurse chain
-      // for future check of circular referencing
-      this.recurseChain.push(scrapbook.splitUrlByAnchor(refUrl)[0]);
-    }
+class UrlSlots {
+  constructor() {
+    this.slots = {};
   }
 
-  getUrlHash(url, rewriteFunc) {
+  /**
+   * Add a URL slot to be bound with a fresh URL when the template is used.
+   *
+   * @param {string} kind
+   * @param {Object} info - the info from viewer.resolveUrl
+   * @param {Object} [options]
+   * @param {boolean} [options.keepHash] - keep the hash of the URL after the
+   *   bound URL.
+   * @return {string} the placeholder of the slot
+   */
+  add(kind, info, {keepHash = true} = {}) {
     const key = scrapbook.getUuid();
-    this.urlHash[key] = {
-      url,
-      newUrl: null,
-      rewriteFunc,
-    };
+    const slot = {kind};
+    if (info.inZip) {
+      slot.inZipPath = info.inZipPath;
+    }
+    if (keepHash) {
+      slot.url = scrapbook.splitUrlByAnchor(info.url)[0];
+      this.slots[key] = slot;
+      return "urn:scrapbook:url:" + key + (info.hash || "");
+    }
+    slot.url = info.url;
+    this.slots[key] = slot;
     return "urn:scrapbook:url:" + key;
   }
-
-  async startFetches() {
-    const tasks = Object.keys(this.urlHash).map(async (key) => {
-      const sourceUrl = this.recurseChain[this.recurseChain.length - 1];
-      const info = viewer.parseUrl(this.urlHash[key].url, sourceUrl);
-
-      if (info.inZip) {
-        const targetUrl = viewer.inZipPathToUrl(info.inZipPath);
-        if (this.recurseChain.includes(scrapbook.splitUrlByAnchor(targetUrl)[0])) {
-          // console.warn("Resource '" + sourceUrl + "' has a circular reference to '" + targetUrl + "'.");
-          return "about:blank";
-        }
-      }
-
-      const response = (await viewer.fetchFile({
-        inZipPath: info.inZipPath,
-        rewriteFunc: this.urlHash[key].rewriteFunc,
-        url: viewer.inZipPathToUrl(info.inZipPath),
-        recurseChain: this.recurseChain,
-      })) || info.url;
-
-      this.urlHash[key].newUrl = response;
-      return response;
-    });
-    return Promise.all(tasks);
-  }
-
-  finalRewrite(text) {
-    return text.replace(/urn:scrapbook:url:([0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12})/g, (match, key) => {
-      if (this.urlHash[key]) { return this.urlHash[key].newUrl; }
-      // This could happen when a web page really contains a content text in our format.
-      // We return the original text for keys not defineded in the map to prevent a bad replace
-      // since it's nearly impossible for them to hit on the hash keys we are using.
-      return match;
-    });
-  }
 }
 
 async function init() {
@@ -698,6 +786,17 @@ async function init() {
       if (frame === iframe) {
         document.title = frameDoc.title;
 
+        // sync the URL of the current page when served by the service worker
+        if (viewerData.serveArchive) {
+          const info = viewer.resolveUrl(frameDoc.URL);
+          if (info.inZip) {
+            const urlObj = new URL(document.URL);
+            urlObj.searchParams.set('p', info.inZipPath);
+            urlObj.hash = info.hash;
+            history.replaceState({}, null, urlObj.href);
+          }
+        }
+
         // "rel" is matched case-insensitively
         // The "~=" selector checks for "icon" separated by space,
         // not including "-icon" or "_icon".
@@ -725,6 +824,11 @@ async function init() {
         const target = getTarget(elem);
         const url = elem.href;
         if (target === iframe.contentWindow) {
+          if (viewerData.serveArchive && url.startsWith(viewerData.virtualBase)) {
+            // in-zip file link served by the service worker
+            return;
+          }
+
           if (url.startsWith("blob:")) {
             // in-zip file link
             const [main, search, hash] = scrapbook.splitUrl(url);
@@ -801,34 +905,41 @@ async function init() {
     const dir = viewerData.dir;
     const indexFile = viewerData.indexFile || "index.html";
 
-    /* load zip content from previous cache */
-    const entries = Object.entries(await scrapbook.cache.getAll({includes: key}, 'indexedDB'));
+    let fetchedUrl;
+    viewerData.serveArchive = await viewer.checkArchiveServing(indexFile);
+    if (viewerData.serveArchive) {
+      /* show the page served by the service worker */
+      fetchedUrl = viewer.inZipPathToUrl(indexFile) + urlSearch + urlHash;
+    } else {
+      /* load zip content from previous cache */
+      const entries = Object.entries(await scrapbook.cache.getAll({includes: key}, 'indexedDB'));
+
+      if (!entries.length) {
+        throw new Error(`Archive '${id}' does not exist or has been cleared.`);
+      }
 
-    if (!entries.length) {
-      throw new Error(`Archive '${id}' does not exist or has been cleared.`);
-    }
+      for (const [info, file] of entries) {
+        const path = JSON.parse(info).path;
 
-    for (const [info, file] of entries) {
-      const path = JSON.parse(info).path;
+        // exclude directories
+        if (file.type === "inode/directory") { continue; }
 
-      // exclude directories
-      if (file.type === "inode/directory") { continue; }
+        // filter by directory prefix
+        if (dir && !path.startsWith(dir + '/')) { continue; }
 
-      // filter by directory prefix
-      if (dir && !path.startsWith(dir + '/')) { continue; }
+        const url = URL.createObjectURL(file);
+        viewer.inZipFiles.set(path, {file, url});
+        viewer.blobUrlToInZipPath.set(url, path);
+      }
 
-      const url = URL.createObjectURL(file);
-      viewer.inZipFiles.set(path, {file, url});
-      viewer.blobUrlToInZipPath.set(url, path);
+      /* show the page */
+      fetchedUrl = await viewer.fetchPage({
+        inZipPath: indexFile,
+        url: urlSearch + urlHash,
+        recurseChain: [],
+      });
     }
 
-    /* show the page */
-    const fetchedUrl = await viewer.fetchPage({
-      inZipPath: indexFile,
-      url: urlSearch + urlHash,
-      recurseChain: [],
-    });
-
     if (!fetchedUrl) {
       throw new Error(`Specified file '${indexFile}' not found.`);
     }
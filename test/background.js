@@ -11,12 +11,12 @@ if (typeof browser !== 'undefined') {
 function initMenusListener() {
   const handlers = {
     testAutomated(info, tab) {
-      const url = browser.runtime.getURL("test.html?grep=^(?!Manual tests)");
+      const url = browser.runtime.getURL("test.html?grep=^(?!Manual tests|Benchmarks)");
       browser.tabs.create({url});
     },
 
     testLibrary(info, tab) {
-      const url = browser.runtime.getURL("test.html?grep=^(?!Capture tests|Manual tests)");
+      const url = browser.runtime.getURL("test.html?grep=^(?!Capture tests|Manual tests|Benchmarks)");
       browser.tabs.create({url});
     },
 
@@ -30,6 +30,11 @@ function initMenusListener() {
       browser.tabs.create({url});
     },
 
+    testBenchmark(info, tab) {
+      const url = browser.runtime.getURL("test.html?grep=^Benchmarks");
+      browser.tabs.create({url});
+    },
+
     testList(info, tab) {
       const url = browser.runtime.getURL("test.html?dryrun=1");
       browser.tabs.create({url});
@@ -66,6 +71,12 @@ function updateMenus() {
     contexts: [browser.contextMenus.ContextType.ACTION],
   });
 
+  browser.contextMenus.create({
+    id: "testBenchmark",
+    title: 'Run benchmarks',
+    contexts: [browser.contextMenus.ContextType.ACTION],
+  });
+
   browser.contextMenus.create({
     id: "testList",
     title: 'List all tests to run manually',
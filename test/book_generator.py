@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Generate a synthetic scrapbook book of configurable size.
+
+The generated tree files are in the same format as those saved by the
+extension (see server.js), and are split into shards (meta.js, meta1.js,
+...) at configurable thresholds, so that the loading and saving of a large
+or multi-shard tree can be tested without a real huge book.
+"""
+import argparse
+import json
+import os
+import random
+from collections import deque
+from datetime import datetime, timedelta
+
+TREE_FILE_TEMPLATE = """/**
+ * Feel free to edit this file, but keep data code valid JSON format.
+ */
+scrapbook.{name}({data})"""
+
+# item types and their weight of a non-folder item
+ITEM_TYPES = (
+    ('', 70),
+    ('bookmark', 20),
+    ('note', 5),
+    ('separator', 5),
+)
+
+# probability of an item in a non-leaf level to be a folder
+FOLDER_RATIO = 0.2
+
+WORDS = (
+    'alpha', 'bravo', 'charlie', 'delta', 'echo', 'foxtrot', 'golf', 'hotel',
+    'india', 'juliet', 'kilo', 'lima', 'mike', 'november', 'oscar', 'papa',
+    'quebec', 'romeo', 'sierra', 'tango', 'uniform', 'victor', 'whiskey',
+    'xray', 'yankee', 'zulu', 'scrapbook', 'capture', 'archive', 'page',
+)
+
+BASE_TIME = datetime(2000, 1, 1)
+
+
+def make_id(i):
+    """Generate a unique item ID in the form of YYYYMMDDhhmmssSSS."""
+    dt = BASE_TIME + timedelta(seconds=i)
+    return dt.strftime('%Y%m%d%H%M%S') + '000'
+
+
+def generate_text(rand, size, token):
+    """Generate a text of around size characters, with a unique token
+    searchable for the item."""
+    words = [token]
+    length = len(token)
+    while length < size:
+        word = rand.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return ' '.join(words)
+
+
+def generate_tree(items, depth, fanout, fulltext_size, seed=0):
+    """Generate tree data of a book.
+
+    Args:
+        items: total number of items
+        depth: max depth of the folder tree (1 for a flat book)
+        fanout: max number of children of a folder
+        fulltext_size: number of characters of fulltext of each item
+        seed: seed for the random generator
+
+    Returns:
+        tuple: (meta, toc, fulltext)
+    """
+    rand = random.Random(seed)
+    types, weights = zip(*ITEM_TYPES)
+    meta = {}
+    toc = {}
+    fulltext = {}
+
+    count = 0
+    queue = deque([('root', 0)])
+    while count < items:
+        try:
+            parent_id, level = queue.popleft()
+        except IndexError:
+            # no more folders to fill, put remaining items under root
+            parent_id, level = 'root', 0
+            limit = items - count
+        else:
+            limit = min(fanout, items - count)
+
+        children = toc.setdefault(parent_id, [])
+        for _ in range(limit):
+            id = make_id(count)
+            count += 1
+            children.append(id)
+            token = f'item{count}'
+
+            if level + 1 < depth and rand.random() < FOLDER_RATIO:
+                meta[id] = {
+                    'title': f'Folder {count}',
+                    'type': 'folder',
+                    'create': id,
+                    'modify': id,
+                }
+                queue.append((id, level + 1))
+                continue
+
+            type = rand.choices(types, weights)[0]
+            if type == 'separator':
+                meta[id] = {
+                    'title': '',
+                    'type': type,
+                    'create': id,
+                    'modify': id,
+                }
+                continue
+
+            item = meta[id] = {
+                'title': f'Item {count} {rand.choice(WORDS)}',
+                'type': type,
+                'create': id,
+                'modify': id,
+            }
+            if type == 'bookmark':
+                item['source'] = f'https://example.com/{token}'
+            else:
+                item['index'] = f'{id}/index.html'
+                if type == '':
+                    item['source'] = f'https://example.com/{token}'
+                    item['charset'] = 'UTF-8'
+                if fulltext_size:
+                    fulltext[id] = {
+                        'index.html': {
+                            'content': generate_text(rand, fulltext_size, token),
+                        },
+                    }
+            if rand.random() < 0.1:
+                item['comment'] = generate_text(rand, 100, token)
+
+    return meta, toc, fulltext
+
+
+def shard_data(data, threshold, measure=lambda value: 1):
+    """Split data into shards whose total measure is around threshold.
+
+    - Always generate at least one shard, even if data is empty.
+    """
+    shard = {}
+    size = 0
+    count = 0
+    for key, value in data.items():
+        shard[key] = value
+        size += measure(value)
+        if size >= threshold:
+            yield shard
+            count += 1
+            shard = {}
+            size = 0
+    if shard or not count:
+        yield shard
+
+
+def write_tree_files(tree_dir, name, shards):
+    """Write shards as tree files and return the number of files."""
+    i = 0
+    for i, shard in enumerate(shards):
+        file = os.path.join(tree_dir, f'{name}{i or ""}.js')
+        data = json.dumps(shard, ensure_ascii=False, indent=2)
+        data = data.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        with open(file, 'w', encoding='UTF-8') as fh:
+            fh.write(TREE_FILE_TEMPLATE.format(name=name, data=data))
+    return i + 1
+
+
+def generate_book(top_dir, items=1000, depth=3, fanout=50, fulltext_size=1000,
+                  meta_shard=256 * 1024, toc_shard=4 * 1024 * 1024,
+                  fulltext_shard=128 * 1024 * 1024, files=False, seed=0):
+    """Generate a book under top_dir.
+
+    Args:
+        top_dir: top directory of the book, whose data and tree directory
+            are data/ and tree/
+        items: total number of items
+        depth: max depth of the folder tree (1 for a flat book)
+        fanout: max number of children of a folder
+        fulltext_size: number of characters of fulltext of each item
+        meta_shard: number of items of each meta*.js
+        toc_shard: number of entries of each toc*.js
+        fulltext_shard: number of characters of fulltext of each fulltext*.js
+        files: whether to generate the index file of each item
+        seed: seed for the random generator
+
+    Returns:
+        dict: statistics of the generated book
+    """
+    meta, toc, fulltext = generate_tree(items, depth, fanout, fulltext_size, seed=seed)
+
+    tree_dir = os.path.join(top_dir, 'tree')
+    data_dir = os.path.join(top_dir, 'data')
+    os.makedirs(tree_dir, exist_ok=True)
+    os.makedirs(data_dir, exist_ok=True)
+
+    if files:
+        for id, item in meta.items():
+            index = item.get('index')
+            if not index:
+                continue
+            file = os.path.join(data_dir, index.replace('/', os.sep))
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            with open(file, 'w', encoding='UTF-8') as fh:
+                content = fulltext.get(id, {}).get('index.html', {}).get('content', '')
+                fh.write(f'<!DOCTYPE html><html><head><meta charset="UTF-8">'
+                         f'<title>{item["title"]}</title></head><body>{content}</body></html>')
+
+    # write fulltext last so that it's not considered outdated
+    stats = {
+        'items': len(meta),
+        'meta_files': write_tree_files(tree_dir, 'meta', shard_data(meta, meta_shard)),
+        'toc_files': write_tree_files(tree_dir, 'toc', shard_data(toc, toc_shard, lambda v: 1 + len(v))),
+    }
+    if fulltext:
+        stats['fulltext_files'] = write_tree_files(
+            tree_dir, 'fulltext',
+            shard_data(fulltext, fulltext_shard, lambda v: len(v['index.html']['content'])),
+        )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('top_dir', help="""top directory of the book to generate""")
+    parser.add_argument('--items', type=int, default=1000, help="""total number of items (default: %(default)s)""")
+    parser.add_argument('--depth', type=int, default=3, help="""max depth of the folder tree (default: %(default)s)""")
+    parser.add_argument('--fanout', type=int, default=50, help="""max number of children of a folder (default: %(default)s)""")
+    parser.add_argument('--fulltext-size', type=int, default=1000,
+                        help="""number of characters of fulltext of each item (default: %(default)s)""")
+    parser.add_argument('--meta-shard', type=int, default=256 * 1024,
+                        help="""number of items of each meta*.js (default: %(default)s)""")
+    parser.add_argument('--toc-shard', type=int, default=4 * 1024 * 1024,
+                        help="""number of entries of each toc*.js (default: %(default)s)""")
+    parser.add_argument('--fulltext-shard', type=int, default=128 * 1024 * 1024,
+                        help="""number of characters of fulltext of each fulltext*.js (default: %(default)s)""")
+    parser.add_argument('--files', action='store_true', help="""generate the index file of each item""")
+    parser.add_argument('--seed', type=int, default=0, help="""seed for the random generator (default: %(default)s)""")
+    args = vars(parser.parse_args())
+
+    stats = generate_book(args.pop('top_dir'), **args)
+    print(json.dumps(stats))
+
+
+if __name__ == '__main__':
+    main()
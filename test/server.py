@@ -1,14 +1,290 @@
 #!/usr/bin/env python3
+import http.client
 import http.server
+import importlib.util
 import json
 import os
+import random
+import re
 import shutil
+import socket
+import struct
+import sys
 import time
 import tempfile
-from threading import Thread
+import traceback
+from threading import Lock, Thread
+from urllib.parse import unquote, urlsplit
 
+import book_generator
 
-class HTTPRequestHandler(http.server.CGIHTTPRequestHandler):
+
+class FixtureRegistry:
+    """Load fixture modules in process and cache them.
+
+    A fixture is a .py or .pyw file that defines a `handle(env, out)`
+    function, which works like a CGI script: `env` is a dict of CGI-like
+    environment variables (plus "wsb.config"), and `out` is a binary stream
+    which takes a header block, a blank line, and then the body.
+
+    A module is loaded once and reloaded only when its file is modified.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.modules = {}
+        self.lock = Lock()
+
+    def get_handler(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            try:
+                module_mtime, module = self.modules[path]
+            except KeyError:
+                pass
+            else:
+                if module_mtime == mtime:
+                    return module.handle
+
+            name = 'fixture:' + os.path.relpath(path, self.root).replace(os.sep, '/')
+            spec = importlib.util.spec_from_file_location(name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.modules[path] = (mtime, module)
+            return module.handle
+
+
+class FixtureOutput:
+    """The output stream of a fixture handler.
+
+    - Headers are sent once the header block is complete. A "Status" header
+      sets the response status, as for CGI.
+    - The body is streamed to the client as written, so that a handler can
+      send a partial response and flush it.
+    """
+    HEADER_END_REGEX = re.compile(rb'\r?\n\r?\n')
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.buffer = b''
+        self.headers_sent = False
+
+    def write(self, data):
+        if self.headers_sent:
+            self._write_body(data)
+            return len(data)
+
+        self.buffer += data
+        m = self.HEADER_END_REGEX.search(self.buffer)
+        if m:
+            head, body = self.buffer[:m.start()], self.buffer[m.end():]
+            self.buffer = b''
+            self._send_headers(head)
+            self._write_body(body)
+        return len(data)
+
+    def flush(self):
+        if self.headers_sent:
+            self.handler.wfile.flush()
+
+    def close(self):
+        if not self.headers_sent:
+            head, self.buffer = self.buffer, b''
+            self._send_headers(head)
+        self.handler.wfile.flush()
+
+    def _send_headers(self, head):
+        status, message = 200, None
+        headers = []
+        for line in head.decode('ISO-8859-1').splitlines():
+            if not line.strip():
+                continue
+            key, _, value = line.partition(':')
+            key, value = key.strip(), value.strip()
+            if key.lower() == 'status':
+                code, _, message = value.partition(' ')
+                status, message = int(code), message or None
+                continue
+            headers.append((key, value))
+
+        self.handler.send_response(status, message)
+        for key, value in headers:
+            self.handler.send_header(key, value)
+        if not any(key.lower() == 'cache-control' for key, _ in headers):
+            self.handler.send_header('Cache-Control', 'no-store')
+        http.server.BaseHTTPRequestHandler.end_headers(self.handler)
+        self.headers_sent = True
+
+    def _write_body(self, data):
+        if data and self.handler.command != 'HEAD':
+            self.handler.wfile.write(data)
+
+
+class NetworkRule:
+    """A rule to simulate a network condition for matched requests.
+
+    Options (all optional):
+        path: a regex to search in the request path (including the query)
+        port: the port of the server that receives the request
+        latency: milliseconds to wait before handling the request
+        jitter: max milliseconds to randomly add to latency
+        bandwidth: max bytes per second to send the response
+        chunk_size: send the response in chunks of this number of bytes
+        chunk_delay: milliseconds to wait after sending each chunk
+        error_rate: probability to reply with an error instead
+        error_status: HTTP status (or a list to randomly pick from) of the
+            error, default 503
+        retry_after: seconds for the Retry-After header of the error
+        reset_rate: probability to reset the connection
+        reset_after: number of bytes of the response to send before a
+            reset, default 0
+    """
+    def __init__(self, path=None, port=None, latency=0, jitter=0,
+                 bandwidth=None, chunk_size=None, chunk_delay=0,
+                 error_rate=0, error_status=503, retry_after=None,
+                 reset_rate=0, reset_after=0):
+        self.path = re.compile(path) if path is not None else None
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status if isinstance(error_status, list) else [error_status]
+        self.retry_after = retry_after
+        self.reset_rate = reset_rate
+        self.reset_after = reset_after
+
+    def match(self, port, path):
+        if self.port is not None and self.port != port:
+            return False
+        if self.path is not None and not self.path.search(path):
+            return False
+        return True
+
+
+class ShapedOutput:
+    """A wrapper of the output stream of a request handler which throttles
+    the response and/or resets the connection after some bytes."""
+    def __init__(self, handler, wfile, bandwidth=None, chunk_size=None,
+                 chunk_delay=0, reset_after=None):
+        self.handler = handler
+        self.wfile = wfile
+        self.bandwidth = bandwidth
+        self.chunk_size = chunk_size or (max(bandwidth // 20, 1) if bandwidth else None)
+        self.chunk_delay = chunk_delay
+        self.reset_after = reset_after
+        self.start = time.monotonic()
+        self.sent = 0
+        self.closed = False
+
+    def write(self, data):
+        size = len(data)
+        view = memoryview(data)
+        while view and not self.closed:
+            chunk_size = self.chunk_size or len(view)
+            if self.reset_after is not None:
+                if self.sent >= self.reset_after:
+                    self.handler.reset_connection()
+                    self.closed = True
+                    break
+                chunk_size = min(chunk_size, self.reset_after - self.sent)
+
+            chunk, view = view[:chunk_size], view[chunk_size:]
+            self.wfile.write(chunk)
+            self.sent += len(chunk)
+
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay / 1000)
+
+            if self.bandwidth:
+                wait = self.start + self.sent / self.bandwidth - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+        return size
+
+    def flush(self):
+        if not self.closed:
+            self.wfile.flush()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.wfile.close()
+
+
+class NetworkShapingMixin:
+    """Simulate network conditions according to the matched NetworkRule.
+
+    - Rules are checked in order and the first matched one is applied.
+    """
+    network_rules = ()
+    network_random = random.Random()
+
+    def parse_request(self):
+        if not super().parse_request():
+            return False
+        return self.shape_request()
+
+    def shape_request(self):
+        """Apply the network rule for the request.
+
+        Returns:
+            bool: False if the request has been handled.
+        """
+        port = self.server.server_port
+        rule = next((r for r in self.network_rules if r.match(port, self.path)), None)
+        if rule is None:
+            return True
+
+        rand = self.network_random
+        delay = rule.latency + rand.uniform(0, rule.jitter)
+        if delay:
+            time.sleep(delay / 1000)
+
+        if rule.reset_rate and rand.random() < rule.reset_rate:
+            if not rule.reset_after:
+                self.log_message('Network shaping: connection reset')
+                self.reset_connection()
+                return False
+            self.log_message('Network shaping: connection reset after %i bytes', rule.reset_after)
+            reset_after = rule.reset_after
+        else:
+            reset_after = None
+
+        if rule.error_rate and rand.random() < rule.error_rate:
+            status = rand.choice(rule.error_status)
+            self.log_message('Network shaping: injected error %i', status)
+            self.send_response(status)
+            if rule.retry_after is not None:
+                self.send_header('Retry-After', str(rule.retry_after))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            self.close_connection = True
+            return False
+
+        if rule.bandwidth or rule.chunk_size or rule.chunk_delay or reset_after is not None:
+            self.wfile = ShapedOutput(
+                self, self.wfile,
+                bandwidth=rule.bandwidth,
+                chunk_size=rule.chunk_size,
+                chunk_delay=rule.chunk_delay,
+                reset_after=reset_after,
+            )
+
+        return True
+
+    def reset_connection(self):
+        """Abort the connection with a TCP RST."""
+        self.close_connection = True
+        try:
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+            self.connection.close()
+        except OSError:
+            pass
+
+
+class HTTPRequestHandler(NetworkShapingMixin, http.server.SimpleHTTPRequestHandler):
     extensions_map = {
         **http.server.SimpleHTTPRequestHandler.extensions_map,
         '.md': 'text/markdown',
@@ -29,15 +305,34 @@ class HTTPRequestHandler(http.server.CGIHTTPRequestHandler):
         self.send_header('Cache-Control', 'no-store')
         super().end_headers()
 
+    fixtures = None
+
+    def do_POST(self):
+        """Serve a POST request.
+
+        - Only fixtures can handle a POST request.
+        """
+        path = self.translate_path(self.path)
+        if not self.is_fixture(path):
+            self.send_error(501, 'Can only POST to fixtures')
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+
+        self.run_fixture(path)
+
     def send_head(self):
-        """Modified default CGIHTTPRequestHandler:
+        """Modified default SimpleHTTPRequestHandler:
 
+        - Run .py or .pyw file as an in-process fixture handler.
         - Output .pyr file as HTTP redirection.
         """
-        if self.is_cgi():
-            return self.run_cgi()
-
         path = self.translate_path(self.path)
+        if self.is_fixture(path):
+            return self.run_fixture(path)
+
         if os.path.isfile(path):
             head, tail = os.path.splitext(path)
             if tail.lower() in ('.pyr',):
@@ -53,23 +348,84 @@ class HTTPRequestHandler(http.server.CGIHTTPRequestHandler):
 
         return http.server.SimpleHTTPRequestHandler.send_head(self)
 
-    def is_cgi(self):
-        """Modified default CGIHTTPRequestHandler:
+    def is_fixture(self, path):
+        """Any .py or .pyw file in any subdirectory is a fixture."""
+        _, ext = os.path.splitext(path)
+        return ext.lower() in ('.py', '.pyw') and os.path.isfile(path)
 
-        - Any .py or .pyw file in any subdirectory is a CGI script.
-        - Any non-CGI script path is handled by SimpleHTTPRequestHandler.
-        """
-        path = self.translate_path(self.path)
-        if os.path.isfile(path) and self.is_python(path):
-            collapsed_path = http.server._url_collapse_path(self.path)
-            dir_sep = collapsed_path.find('/', 1)
-            head, tail = collapsed_path[:dir_sep], collapsed_path[dir_sep + 1:]
-            self.cgi_info = head, tail
-            return True
-        return False
+    def get_fixture_env(self):
+        """Generate CGI-like environment variables for a fixture."""
+        parts = urlsplit(self.path)
+        env = {
+            'SERVER_SOFTWARE': self.version_string(),
+            'SERVER_NAME': self.server.server_name,
+            'SERVER_PORT': str(self.server.server_port),
+            'SERVER_PROTOCOL': self.protocol_version,
+            'REQUEST_METHOD': self.command,
+            'SCRIPT_NAME': unquote(parts.path),
+            'QUERY_STRING': parts.query,
+            'REMOTE_ADDR': self.client_address[0],
+            'CONTENT_TYPE': self.headers.get('Content-Type', ''),
+            'CONTENT_LENGTH': self.headers.get('Content-Length', ''),
+            'wsb.config': os.environ['wsb.config'],
+        }
+        for key, value in self.headers.items():
+            key = 'HTTP_' + key.upper().replace('-', '_')
+            if key not in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+                env[key] = value
+        return env
 
+    def run_fixture(self, path):
+        """Run a fixture handler and stream its output."""
+        out = FixtureOutput(self)
+        try:
+            handler = self.fixtures.get_handler(path)
+            handler(self.get_fixture_env(), out)
+        except Exception:
+            self.log_error('Fixture error: %s\n%s', path, traceback.format_exc())
+            if not out.headers_sent:
+                self.send_error(500, 'Fixture error')
+                return
+        out.close()
 
-def backend(port):
+
+class BackendProxyHandler(NetworkShapingMixin, http.server.BaseHTTPRequestHandler):
+    """Proxy requests to the backend server, with network shaping."""
+    HOP_BY_HOP_HEADERS = {
+        'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+        'te', 'trailers', 'transfer-encoding', 'upgrade',
+    }
+
+    backend_port = None
+
+    def do_proxy(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        headers = {k: v for k, v in self.headers.items() if k.lower() not in self.HOP_BY_HOP_HEADERS}
+
+        conn = http.client.HTTPConnection('localhost', self.backend_port)
+        try:
+            try:
+                conn.request(self.command, self.path, body=body, headers=headers)
+                res = conn.getresponse()
+            except OSError:
+                self.send_error(502)
+                return
+
+            self.send_response(res.status, res.reason)
+            for key, value in res.getheaders():
+                if key.lower() not in self.HOP_BY_HOP_HEADERS | {'date', 'server'}:
+                    self.send_header(key, value)
+            self.end_headers()
+            if self.command != 'HEAD':
+                shutil.copyfileobj(res, self.wfile)
+        finally:
+            conn.close()
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = do_PATCH = do_proxy
+
+
+def backend(port, books=()):
     try:
         from webscrapbook import WSB_DIR, WSB_CONFIG
         import webscrapbook.server
@@ -79,6 +435,15 @@ def backend(port):
 
     with tempfile.TemporaryDirectory() as root:
         config_file = os.path.normpath(os.path.join(root, WSB_DIR, WSB_CONFIG))
+        book_configs = ''.join(f"""
+[book "{book['id']}"]
+name = {book.get('name', book['id'])}
+top_dir = books/{book['id']}
+data_dir = data
+tree_dir = tree
+index = tree/map.html
+no_tree = false
+""" for book in books)
         config = f"""\
 [app]
 name = WebScrapBook
@@ -99,7 +464,7 @@ inclusive_frames = true
 static_index = false
 rss_root = 
 rss_item_count = 50
-
+{book_configs}
 [server]
 port = {port}
 host = localhost
@@ -110,6 +475,12 @@ browse = false
         with open(config_file, 'w', encoding='UTF-8') as fh:
             fh.write(config)
 
+        for book in books:
+            options = {k: v for k, v in book.items() if k not in ('id', 'name')}
+            print(f'Generating book "{book["id"]}" ...')
+            stats = book_generator.generate_book(os.path.join(root, 'books', book['id']), **options)
+            print(f'Generated book "{book["id"]}": {json.dumps(stats)}')
+
         webscrapbook.server.serve(root)
 
 
@@ -134,11 +505,18 @@ def main():
     # start server
     site_root = os.path.join(root, 't')
     os.chdir(site_root)
-    os.environ['PYTHONPATH'] = site_root
+    sys.path.insert(0, site_root)
+    sys.dont_write_bytecode = True
     os.environ['wsb.config'] = json.dumps(config, ensure_ascii=False)
+    HTTPRequestHandler.fixtures = FixtureRegistry(site_root)
+
+    # network shaping
+    NetworkShapingMixin.network_rules = [NetworkRule(**rule) for rule in config.get('network_rules') or ()]
+    NetworkShapingMixin.network_random = random.Random(config.get('network_seed'))
 
     thread = Thread(target=http.server.test, kwargs={
         'HandlerClass': HTTPRequestHandler,
+        'ServerClass': http.server.ThreadingHTTPServer,
         'port': int(config['server_port']),
         'bind': '127.0.0.1',
     })
@@ -147,6 +525,7 @@ def main():
 
     thread = Thread(target=http.server.test, kwargs={
         'HandlerClass': HTTPRequestHandler,
+        'ServerClass': http.server.ThreadingHTTPServer,
         'port': int(config['server_port2']),
         'bind': '127.0.0.1',
     })
@@ -155,10 +534,22 @@ def main():
 
     thread = Thread(target=backend, kwargs={
         'port': int(config['backend_port']),
+        'books': config.get('backend_books') or (),
     })
     thread.daemon = True
     thread.start()
 
+    if config.get('backend_proxy_port'):
+        BackendProxyHandler.backend_port = int(config['backend_port'])
+        thread = Thread(target=http.server.test, kwargs={
+            'HandlerClass': BackendProxyHandler,
+            'ServerClass': http.server.ThreadingHTTPServer,
+            'port': int(config['backend_proxy_port']),
+            'bind': '127.0.0.1',
+        })
+        thread.daemon = True
+        thread.start()
+
     try:
         while True:
             time.sleep(100)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Generate a synthetic heavy page for capture benchmarks.
+
+Query parameters:
+    type: "images", "frames", "css", "shadow", or "links"
+    n: scale of the page, whose meaning depends on type:
+        images: number of images
+        frames: depth of the frame tree (each frame has 2 subframes)
+        css: number of CSS rules
+        shadow: number of shadow hosts (each with 50 descendant elements)
+        links: number of pages in the link graph
+    id: ID of the page in the link graph (for "links")
+    fanout: number of links of each page (for "links")
+"""
+from urllib.parse import parse_qs
+
+
+def param(q, key, default):
+    return next(iter(q.get(key, [])), default)
+
+
+def images(q, n):
+    return '\n'.join(f'<img src="image.py?id={i}" width="10" height="10">' for i in range(n))
+
+
+def frames(q, n):
+    if n <= 0:
+        return '<p>leaf frame</p><img src="image.py?id=leaf" width="10" height="10">'
+    return '\n'.join(
+        f'<iframe src="page.py?type=frames&amp;n={n - 1}&amp;branch={i}"></iframe>'
+        for i in range(2)
+    )
+
+
+def css(q, n):
+    return (
+        f'<link rel="stylesheet" href="style.py?n={n}">\n'
+        + '\n'.join(f'<div class="r{i}"><span>{i}</span></div>' for i in range(0, n, 10))
+    )
+
+
+def shadow(q, n):
+    return f"""\
+<div id="hosts">{'<div class="host"></div>' * n}</div>
+<script>
+for (const host of document.querySelectorAll('#hosts > .host')) {{
+  const shadow = host.attachShadow({{mode: 'open'}});
+  shadow.innerHTML = '<style>p {{ color: green; }}</style>'
+      + '<p><span>shadow</span> <img src="image.py?id=shadow" width="10" height="10"></p>'.repeat(25);
+}}
+</script>"""
+
+
+def links(q, n):
+    page_id = int(param(q, 'id', 0))
+    fanout = int(param(q, 'fanout', 5))
+    return '\n'.join(
+        f'<a href="page.py?type=links&amp;n={n}&amp;fanout={fanout}&amp;id={(page_id * fanout + k + 1) % n}">link {k}</a>'
+        + f'<img src="image.py?id=link-{page_id}-{k}" width="10" height="10">'
+        for k in range(fanout)
+    )
+
+
+GENERATORS = {
+    'images': (images, 2000),
+    'frames': (frames, 4),
+    'css': (css, 10000),
+    'shadow': (shadow, 500),
+    'links': (links, 200),
+}
+
+
+def handle(env, out):
+    q = parse_qs(env['QUERY_STRING'])
+    page_type = param(q, 'type', 'images')
+    generator, default = GENERATORS[page_type]
+    n = int(param(q, 'n', default))
+
+    out.write(f"""Content-Type: text/html; charset=UTF-8
+
+<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>Benchmark: {page_type} ({n})</title>
+</head>
+<body>
+{generator(q, n)}
+</body>
+</html>
+""".encode('UTF-8'))
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Generate a giant stylesheet.
+
+Query parameters:
+    n: number of rules
+    urls: number of rules referencing an image
+"""
+from urllib.parse import parse_qs
+
+
+def handle(env, out):
+    q = parse_qs(env['QUERY_STRING'])
+    n = int(next(iter(q.get('n', [])), 10000))
+    urls = int(next(iter(q.get('urls', [])), n // 10))
+
+    rules = []
+    for i in range(n):
+        if i < urls:
+            rules.append(f'.r{i} {{ background-image: url("image.py?id=css-{i}"); }}')
+        else:
+            rules.append(f'.r{i} > span:not(.x{i}) {{ margin: {i % 17}px; color: #{i % 0xFFFFFF:06x}; }}')
+
+    out.write(('Content-Type: text/css\n\n' + '\n'.join(rules) + '\n').encode('UTF-8'))
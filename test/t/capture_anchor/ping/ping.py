@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/plain;charset=UTF-8
+
+def handle(env, out):
+    out.write("""Content-Type: text/plain;charset=UTF-8
 Cache-Control: no-store
 
 """.encode('ASCII'))
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/css; charset=UTF-8
+
+def handle(env, out):
+    out.write("""Content-Type: text/css; charset=UTF-8
 
 @charset "Big5";
 #test6::after { content: "中文"; }""".encode('UTF-8'))
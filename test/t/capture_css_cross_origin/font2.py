@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import os
-import sys
 
-os.chdir(os.path.dirname(__file__))
-sys.stdout.buffer.write("""Content-Type: font/woff
+
+def handle(env, out):
+    out.write("""Content-Type: font/woff
 Content-Disposition: inline; filename="font2.woff"
 Access-Control-Allow-Origin: *
 
 """.encode('ASCII'))
-with open('font.woff', 'rb') as fh:
-    sys.stdout.buffer.write(fh.read())
+    with open(os.path.join(os.path.dirname(__file__), 'font.woff'), 'rb') as fh:
+        out.write(fh.read())
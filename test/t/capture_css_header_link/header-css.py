@@ -4,9 +4,10 @@
 - Supported in Firefox (76.*) but not accessible via CSSOM.
 - Not supported in Chromium (80.*).
 """
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/html
+
+def handle(env, out):
+    out.write("""Content-Type: text/html
 Link: <header.css>; rel="stylesheet"
 
 <!DOCTYPE html>
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/html
+
+def handle(env, out):
+    out.write("""Content-Type: text/html
 Link: <header/header.css>; rel=stylesheet
 
 <!DOCTYPE html>
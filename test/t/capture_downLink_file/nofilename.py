@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write(b"""\
+
+def handle(env, out):
+    out.write(b"""\
 Content-Disposition: inline
 
 """ + """Test file content.""".encode('UTF-8'))
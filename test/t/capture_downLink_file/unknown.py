@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write(b"""\
+
+def handle(env, out):
+    out.write(b"""\
 Content-Type: application/wsb.unknown
 Content-Disposition: inline; filename="unknown.bin"
 
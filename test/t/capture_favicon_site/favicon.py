@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write(b"""Content-Type: text/html
+
+def handle(env, out):
+    out.write(b"""Content-Type: text/html
 Content-Disposition: attachment; filename="favicon.html"
 
 <!DOCTYPE html>
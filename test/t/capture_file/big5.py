@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/plain;charset=Big5
+
+def handle(env, out):
+    out.write("""Content-Type: text/plain;charset=Big5
 
 Big5 中文內容""".encode('Big5'))
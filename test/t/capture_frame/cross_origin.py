@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 import json
-import os
-import sys
 
-port = json.loads(os.environ['wsb.config'])['server_port2']
-port = '' if port == 80 else f':{port}'
-sys.stdout.buffer.write(f"""Content-Type: text/html
+
+def handle(env, out):
+    port = json.loads(env['wsb.config'])['server_port2']
+    port = '' if port == 80 else f':{port}'
+    out.write(f"""Content-Type: text/html
 
 <!DOCTYPE html>
 <html>
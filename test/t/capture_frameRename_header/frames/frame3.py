@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/html; charset=UTF-8
+
+def handle(env, out):
+    out.write("""Content-Type: text/html; charset=UTF-8
 
 Subframe content.""".encode('UTF-8'))
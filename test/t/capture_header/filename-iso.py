@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import os
 import shutil
-import sys
 
-os.chdir(os.path.dirname(sys.argv[0]))
-with open('image.bmp', 'rb') as fh:
-    sys.stdout.buffer.write(b"""Content-Type: image/bmp
+
+def handle(env, out):
+    with open(os.path.join(os.path.dirname(__file__), 'image.bmp'), 'rb') as fh:
+        out.write(b"""Content-Type: image/bmp
 Content-Disposition: inline; filename="US-$ rates"; filename*=iso-8859-1'en'%A3%20rates.bmp
 
 """)
-    shutil.copyfileobj(fh, sys.stdout.buffer)
+        shutil.copyfileobj(fh, out)
@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import os
 import shutil
-import sys
 
-os.chdir(os.path.dirname(sys.argv[0]))
-with open('image.bmp', 'rb') as fh:
-    sys.stdout.buffer.write(br"""Content-Type: image/bmp
+
+def handle(env, out):
+    with open(os.path.join(os.path.dirname(__file__), 'image.bmp'), 'rb') as fh:
+        out.write(br"""Content-Type: image/bmp
 Content-Disposition: inline; filename = "file \"X\".bmp"
 
 """)
-    shutil.copyfileobj(fh, sys.stdout.buffer)
+        shutil.copyfileobj(fh, out)
@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import os
 import shutil
-import sys
 
-os.chdir(os.path.dirname(sys.argv[0]))
-with open('image.svg', 'rb') as fh:
-    sys.stdout.buffer.write(b"""Content-Type: image/svg+xml
+
+def handle(env, out):
+    with open(os.path.join(os.path.dirname(__file__), 'image.svg'), 'rb') as fh:
+        out.write(b"""Content-Type: image/svg+xml
 Content-Disposition: inline; filename="image.SVG"
 
 """)
-    shutil.copyfileobj(fh, sys.stdout.buffer)
+        shutil.copyfileobj(fh, out)
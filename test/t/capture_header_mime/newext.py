@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write(b"""Content-Type: video/h264
+
+def handle(env, out):
+    out.write(b"""Content-Type: video/h264
 Content-Disposition: inline; filename="newext.mp1"
 
 """)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write(b"""Content-Type: application/msword
+
+def handle(env, out):
+    out.write(b"""Content-Type: application/msword
 Content-Disposition: inline; filename="noext"
 
 """)
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
-import sys
 import time
 
-sys.stdout.buffer.write("""Content-Type: text/html
+
+def handle(env, out):
+    out.write("""Content-Type: text/html
 
 <!DOCTYPE html>
 <html>
@@ -13,11 +14,11 @@ img { width: 60px; }
 </style>
 </head>
 """.encode('UTF-8'))
-sys.stdout.flush()
+    out.flush()
 
-time.sleep(10)
+    time.sleep(10)
 
-sys.stdout.buffer.write("""<body>
+    out.write("""<body>
 <p>Frame content.</p>
 <img src="red.py">
 </body>
@@ -1,12 +1,12 @@
 #!/usr/bin/env python3
 import json
-import os
-import sys
 import time
 
-port = json.loads(os.environ['wsb.config'])['server_port2']
-port = '' if port == 80 else f':{port}'
-sys.stdout.buffer.write("""Content-Type: text/html
+
+def handle(env, out):
+    port = json.loads(env['wsb.config'])['server_port2']
+    port = '' if port == 80 else f':{port}'
+    out.write("""Content-Type: text/html
 
 <!DOCTYPE html>
 <html>
@@ -18,11 +18,11 @@ img { width: 60px; }
 </style>
 </head>
 """.encode('UTF-8'))
-sys.stdout.flush()
+    out.flush()
 
-time.sleep(5)
+    time.sleep(5)
 
-sys.stdout.buffer.write(f"""<body>
+    out.write(f"""<body>
 <p>Page content.</p>
 <img src="red.py">
 <iframe src="//localhost{port}/capture_incomplete/frame.py"></iframe>
@@ -1,16 +1,17 @@
 #!/usr/bin/env python3
 import os
-import sys
 import time
 
-file = os.path.join(os.path.dirname(__file__), 'red.bmp')
-with open(file, 'rb') as fh:
-    blob = fh.read()
 
-time.sleep(10)
+def handle(env, out):
+    file = os.path.join(os.path.dirname(__file__), 'red.bmp')
+    with open(file, 'rb') as fh:
+        blob = fh.read()
 
-sys.stdout.buffer.write("""Content-Type: image/bmp
+    time.sleep(10)
+
+    out.write("""Content-Type: image/bmp
 Content-Disposition: inline; filename="red.bmp"
 
 """.encode('ASCII'))
-sys.stdout.buffer.write(blob)
+    out.write(blob)
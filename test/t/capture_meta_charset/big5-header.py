@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import sys
 
-sys.stdout.buffer.write("""Content-Type: text/html;charset=Big5
+
+def handle(env, out):
+    out.write("""Content-Type: text/html;charset=Big5
 
 <!DOCTYPE html>
 <html>
@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: Big5 -*-
-print('Content-Type: text/plain;charset=Big5')
-print('')
-print('Big5 夺e')
+
+
+def handle(env, out):
+    out.write("""Content-Type: text/plain;charset=Big5
+
+Big5 夺e
+""".encode('Big5'))
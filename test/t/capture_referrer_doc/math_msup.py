@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
-import os
-import sys
 
-sys.stdout.buffer.write(f"""Content-Type: text/plain;charset=UTF-8
+
+def handle(env, out):
+    out.write(f"""Content-Type: text/plain;charset=UTF-8
 Cache-Control: no-store
 
-{os.environ['HTTP_REFERER']}""".encode('UTF-8'))
+{env['HTTP_REFERER']}""".encode('UTF-8'))
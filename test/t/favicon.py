@@ -1,7 +1,6 @@
 #!/usr/bin/env python3
 """Create/delete site favicon
 """
-import sys
 import os
 import base64
 import urllib.parse
@@ -10,8 +9,8 @@ image = 'Qk08AAAAAAAAADYAAAAoAAAAAQAAAAEAAAABACAAAAAAAAYAAAASCwAAEgsAAAAAAAAAAAA
 file = os.path.join(os.path.dirname(__file__), 'favicon.ico')
 
 
-def main():
-    args = urllib.parse.parse_qs(os.environ['QUERY_STRING'])
+def handle(env, out):
+    args = urllib.parse.parse_qs(env['QUERY_STRING'])
     action = args.get('a', [None])[-1]
 
     if action == 'create':
@@ -22,7 +21,3 @@ def main():
     if action == 'delete':
         os.remove(file)
         return
-
-
-if __name__ == '__main__':
-    main()
@@ -1,35 +1,172 @@
 #!/usr/bin/env python3
-"""Common utils for CGI scripts."""
-import io
+"""Common utils for fixture handlers."""
+import hashlib
+import json
 import os
-import sys
+import re
+import tempfile
+import threading
 import zipfile
-from textwrap import dedent
 
+ARCHIVE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'webscrapbook-test-archives')
 
-def zip_folder(root_dir, formatter=None, filter=None):
+CHUNK_SIZE = 65536
+
+RANGE_REGEX = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+_archive_locks = {}
+_archive_locks_lock = threading.Lock()
+
+
+def list_folder(root_dir):
+    """List files under the specified directory.
+
+    Returns:
+        list: (arcname, path) of each file, sorted by arcname
+    """
+    root_dir = os.path.normpath(root_dir)
+    base_len = len(root_dir + os.sep)
+    rv = []
+    for root, _, files in os.walk(root_dir):
+        for file in files:
+            file = os.path.join(root, file)
+            arcname = file[base_len:].replace(os.sep, '/')
+            rv.append((arcname, file))
+    rv.sort()
+    return rv
+
+
+def zip_folder(root_dir, file, formatter=None, filter=None):
     """Pack files and directories under the specified directory in to a ZIP.
 
     Args:
         root_dir: the directory to pack
+        file: the path or file object to write the ZIP to
         formatter: a dict to format the content
         filter: a compiled re to filter arcnames for the formatter
     """
-    blob = io.BytesIO()
-    root_dir = os.path.normpath(root_dir)
-    base_len = len(root_dir + os.sep)
-    with zipfile.ZipFile(blob, mode='w', compression=zipfile.ZIP_DEFLATED) as zh:
-        for root, _, files in os.walk(root_dir):
-            for file in files:
-                file = os.path.join(root, file)
-                arcname = file[base_len:].replace(os.sep, '/')
-                if formatter and (filter is None or filter.match(arcname)):
-                    with open(file, encoding='UTF-8') as fh:
-                        zh.writestr(arcname, fh.read().format(**formatter))
-                else:
-                    zh.write(file, arcname)
-        zh.close()
-    return blob
+    with zipfile.ZipFile(file, mode='w', compression=zipfile.ZIP_DEFLATED) as zh:
+        for arcname, path in list_folder(root_dir):
+            if formatter and (filter is None or filter.match(arcname)):
+                with open(path, encoding='UTF-8') as fh:
+                    zh.writestr(arcname, fh.read().format(**formatter))
+            else:
+                zh.write(path, arcname)
+
+
+def get_archive(root_dir, formatter=None, filter=None):
+    """Get a ZIP of the specified directory, which is built once and cached.
+
+    - The cache file is named by a hash of the directory, formatter, filter,
+      and the path, size, and mtime of each file, so that the archive is
+      rebuilt only when any of them changes.
+
+    Args:
+        root_dir: the directory to pack
+        formatter: a dict to format the content
+        filter: a compiled re to filter arcnames for the formatter
+
+    Returns:
+        str: path of the cached ZIP file
+    """
+    root_dir = os.path.normpath(os.path.abspath(root_dir))
+    digest = hashlib.sha1()
+    digest.update(json.dumps(
+        [root_dir, formatter, filter.pattern if filter else None],
+        sort_keys=True, default=str,
+    ).encode('UTF-8'))
+    for arcname, file in list_folder(root_dir):
+        stat = os.stat(file)
+        digest.update(f'\0{arcname}\0{stat.st_size}\0{stat.st_mtime_ns}'.encode('UTF-8'))
+    cache_file = os.path.join(ARCHIVE_CACHE_DIR, digest.hexdigest() + '.zip')
+
+    if os.path.isfile(cache_file):
+        return cache_file
+
+    with _archive_locks_lock:
+        lock = _archive_locks.setdefault(cache_file, threading.Lock())
+
+    with lock:
+        if not os.path.isfile(cache_file):
+            os.makedirs(ARCHIVE_CACHE_DIR, exist_ok=True)
+            fd, temp_file = tempfile.mkstemp(suffix='.tmp', dir=ARCHIVE_CACHE_DIR)
+            try:
+                with os.fdopen(fd, 'wb') as fh:
+                    zip_folder(root_dir, fh, formatter=formatter, filter=filter)
+                os.replace(temp_file, cache_file)
+            except BaseException:
+                os.remove(temp_file)
+                raise
+
+    return cache_file
+
+
+def parse_range(value, size):
+    """Parse the Range header of a request.
+
+    Returns:
+        tuple: (start, end) of the requested range (end is exclusive), or
+            None if no or an unsupported (e.g. multiple) range is requested
+
+    Raises:
+        ValueError: if the range is not satisfiable
+    """
+    m = RANGE_REGEX.search(value.strip()) if value else None
+    if not m:
+        return None
+
+    start, end = m.group(1), m.group(2)
+    if not start:
+        if not end:
+            return None
+        start, end = max(size - int(end), 0), size
+    else:
+        start = int(start)
+        end = min(int(end) + 1, size) if end else size
+
+    if start >= size or start >= end:
+        raise ValueError(f'unsatisfiable range: {value!r}')
+
+    return start, end
+
+
+def send_file(env, out, file, headers=()):
+    """Stream a file, with support of a single byte range request.
+
+    Args:
+        env: the environment variables of the fixture handler
+        out: the output stream of the fixture handler
+        file: path of the file to send
+        headers: additional headers as (key, value) pairs
+    """
+    size = os.path.getsize(file)
+
+    try:
+        byte_range = parse_range(env.get('HTTP_RANGE'), size)
+    except ValueError:
+        out.write(f'Status: 416 Range Not Satisfiable\nContent-Range: bytes */{size}\n\n'.encode('ASCII'))
+        return
+
+    headers = [*headers, ('Accept-Ranges', 'bytes')]
+    if byte_range:
+        start, end = byte_range
+        headers.insert(0, ('Status', '206 Partial Content'))
+        headers.append(('Content-Range', f'bytes {start}-{end - 1}/{size}'))
+    else:
+        start, end = 0, size
+    headers.append(('Content-Length', str(end - start)))
+
+    out.write(''.join(f'{key}: {value}\n' for key, value in headers).encode('ASCII') + b'\n')
+
+    with open(file, 'rb') as fh:
+        fh.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = fh.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            out.write(chunk)
+            remaining -= len(chunk)
 
 
 ARCHIVE_TYPES_MAP = {
@@ -38,27 +175,23 @@ ARCHIVE_TYPES_MAP = {
 }
 
 
-def send_archive(base_file, type='htz', dispos='inline', **kwargs):
-    """Send a directory as an archive on the fly.
+def send_archive(env, out, base_file, type='htz', dispos='inline', **kwargs):
+    """Send a directory as an archive, which is built once and cached.
 
     Args:
+        env: the environment variables of the fixture handler
+        out: the output stream of the fixture handler
         base_file: the directory to pack is base_file minus the extension
         type: 'htz' or 'maff'
         dispos: 'inline' or 'attachment'
-        **kwargs: arguments to pass to zip_folder
+        **kwargs: arguments to pass to get_archive
     """
     dir, file = os.path.split(base_file)
     basename, _ = os.path.splitext(file)
-    blob = zip_folder(os.path.join(dir, basename), **kwargs)
+    archive = get_archive(os.path.join(dir, basename), **kwargs)
     mime = ARCHIVE_TYPES_MAP[type]
 
-    sys.stdout.buffer.write(
-        dedent(
-            f"""\
-            Content-Type: {mime}
-            Content-Disposition: {dispos}; filename="{basename}.{type}"
-
-            """
-        ).encode('ASCII')
-    )
-    sys.stdout.buffer.write(blob.getvalue())
+    send_file(env, out, archive, [
+        ('Content-Type', mime),
+        ('Content-Disposition', f'{dispos}; filename="{basename}.{type}"'),
+    ])
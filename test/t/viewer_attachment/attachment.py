@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
 import utils
 
-utils.send_archive(__file__, 'maff', 'attachment')
+
+def handle(env, out):
+    utils.send_archive(env, out, __file__, 'maff', 'attachment')
@@ -3,13 +3,14 @@
 """
 import json
 import os
-import sys
 
-port = json.loads(os.environ['wsb.config'])['server_port2']
-port = '' if port == 80 else f':{port}'
-sys.stdout.buffer.write("""Content-Type: text/html
+
+def handle(env, out):
+    port = json.loads(env['wsb.config'])['server_port2']
+    port = '' if port == 80 else f':{port}'
+    out.write("""Content-Type: text/html
 Content-Disposition: inline; filename="index.html"
 
 """.encode('ASCII'))
-with open(os.path.join(os.path.dirname(__file__), 'index.html')) as fh:
-    sys.stdout.buffer.write(fh.read().format(port=port).encode('UTF-8'))
+    with open(os.path.join(os.path.dirname(__file__), 'index.html')) as fh:
+        out.write(fh.read().format(port=port).encode('UTF-8'))
@@ -200,9 +200,11 @@ class TestSuite {
    * @param {boolean} [options.headless]
    * @param {float} [options.delay]
    * @param {boolean} [options.rawResponse]
+   * @param {boolean} [options.withTimings] - also return the recorded
+   *     timings as `{result, timings}` (requires "capture.recordTimings")
    */
   async capture(params, options = {}) {
-    const {headless = false, delay: delayTime, rawResponse = false} = options;
+    const {headless = false, delay: delayTime, rawResponse = false, withTimings = false} = options;
     const pageTab = !headless && await this.openPageTab(params.url);
 
     if (typeof delayTime === 'number') {
@@ -248,6 +250,13 @@ class TestSuite {
       throw new Error(result.error.message);
     }
 
+    if (withTimings) {
+      return {
+        result: deserializeObject(result),
+        timings: response.timings,
+      };
+    }
+
     return deserializeObject(result);
   }
 
@@ -395,6 +404,8 @@ class TestSuite {
     captureHeadless: suite.captureHeadless.bind(suite),
     openTestTab: suite.openTestTab.bind(suite),
     backendRequest: suite.backendRequest.bind(suite),
+    benchmarkRuns: parseInt(suite.config["benchmark_runs"], 10) || 3,
+    benchmarkBook: suite.config["backend_books"]?.[0]?.id ?? null,
   });
 
   // import all tests
@@ -406,6 +417,7 @@ class TestSuite {
   await import('./test_src_capturer_common.js');
   await import('./test_capture.js');
   await import('./test_manual.js');
+  await import('./test_benchmark.js');
 
   mocha.run();
 })();
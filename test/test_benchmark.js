@@ -0,0 +1,372 @@
+(function (global, factory) {
+  global = typeof globalThis !== "undefined" ? globalThis : global || self;
+  if (typeof exports === "object" && typeof module === "object") {
+    // CommonJS
+    module.exports = factory(global, require('./lib/unittest'), require('./shared/scrapbook/tree-file'));
+  } else if (typeof define === "function" && define.amd) {
+    // AMD
+    define(['./lib/unittest', './shared/scrapbook/tree-file'], (...args) => {
+      return factory(global, ...args);
+    });
+  } else {
+    // Browser globals
+    factory(global, global.unittest, global.treeFile);
+  }
+}(this, function (global, unittest, treeFile) {
+
+'use strict';
+
+const {assert, userAgent} = unittest;
+const {parseTreeFile, generateTreeFile} = treeFile;
+
+const baseOptions = {
+  "capture.saveTo": "memory",
+  "capture.saveAs": "zip",
+  "capture.saveResourcesSequentially": false,
+  "capture.resourceSizeLimit": null,
+  "capture.image": "save",
+  "capture.imageBackground": "save",
+  "capture.frame": "save",
+  "capture.font": "save",
+  "capture.style": "save",
+  "capture.styleInline": "save",
+  "capture.rewriteCss": "url",
+  "capture.script": "remove",
+  "capture.shadowDom": "save",
+  "capture.downLink.file.mode": "none",
+  "capture.downLink.doc.depth": null,
+  "capture.recordRewrites": false,
+  "capture.prettyPrint": false,
+  "capture.helpersEnabled": false,
+  "capture.recordTimings": true,
+};
+
+/**
+ * Benchmark scenarios of synthetic heavy pages.
+ *
+ * - Don't change an existing scenario, or its results won't be comparable
+ *   across commits. Add a new one instead.
+ */
+const SCENARIOS = [
+  {
+    name: 'images',
+    url: 'benchmark_capture/page.py?type=images&n=2000',
+  },
+  {
+    name: 'frames',
+    url: 'benchmark_capture/page.py?type=frames&n=5',
+  },
+  {
+    name: 'css',
+    url: 'benchmark_capture/page.py?type=css&n=20000',
+  },
+  {
+    name: 'css-used',
+    url: 'benchmark_capture/page.py?type=css&n=20000',
+    options: {
+      "capture.imageBackground": "save-used",
+      "capture.rewriteCss": "match",
+    },
+  },
+  {
+    name: 'shadow',
+    url: 'benchmark_capture/page.py?type=shadow&n=500',
+  },
+  {
+    name: 'links',
+    url: 'benchmark_capture/page.py?type=links&n=200&fanout=5',
+    options: {
+      "capture.downLink.doc.depth": 2,
+    },
+  },
+  {
+    name: 'singleHtml',
+    url: 'benchmark_capture/page.py?type=images&n=500',
+    options: {
+      "capture.saveAs": "singleHtml",
+    },
+  },
+];
+
+/**
+ * Thresholds to split the tree files, which should correspond with
+ * Book.saveMeta and Book.saveToc.
+ */
+const META_SHARD_SIZE = 256 * 1024;
+const TOC_SHARD_SIZE = 4 * 1024 * 1024;
+
+/**
+ * Sum up the timings of all captures in a mission.
+ */
+function mergeTimings(missionTimings = []) {
+  const rv = {};
+  for (const {timings} of missionTimings) {
+    for (const [phase, {time, count}] of Object.entries(timings)) {
+      const timing = rv[phase] = rv[phase] || {time: 0, count: 0};
+      timing.time += time;
+      timing.count += count;
+    }
+  }
+  return rv;
+}
+
+function median(values) {
+  const sorted = [...values].sort((a, b) => a - b);
+  const mid = Math.floor(sorted.length / 2);
+  return sorted.length % 2 ? sorted[mid] : (sorted[mid - 1] + sorted[mid]) / 2;
+}
+
+async function timeIt(callback) {
+  const startTime = performance.now();
+  const result = await callback();
+  return {time: performance.now() - startTime, result};
+}
+
+/**
+ * Load tree files like Book.loadTreeFile.
+ */
+async function loadTreeFiles(treeUrl, treeFiles, name) {
+  const rv = {};
+  let size = 0;
+  for (let i = 0; ; i++) {
+    const file = `${name}${i || ""}.js`;
+    if (!treeFiles.has(file)) { break; }
+    const text = await backendRequest({url: treeUrl + file}).then(r => r.text());
+    size += text.length;
+    Object.assign(rv, parseTreeFile(text));
+  }
+  return {data: rv, size};
+}
+
+/**
+ * Render the fully expanded tree, like BookTree.
+ */
+function renderTree(meta, toc, parentId = 'root', ancestors = new Set()) {
+  const ul = document.createElement('ul');
+  for (const id of toc[parentId] || []) {
+    const item = meta[id];
+    const li = ul.appendChild(document.createElement('li'));
+    const a = li.appendChild(document.createElement('a'));
+    a.textContent = item?.title || id;
+    if (item?.source) { a.href = item.source; }
+    if (toc[id] && !ancestors.has(id)) {
+      ancestors.add(id);
+      li.appendChild(renderTree(meta, toc, id, ancestors));
+      ancestors.delete(id);
+    }
+  }
+  return ul;
+}
+
+/**
+ * Save tree files like Book.saveMeta and Book.saveToc.
+ */
+async function saveTreeFiles(treeUrl, treeFiles, name, data, measure) {
+  let i = 0;
+  let size = 1;
+  let shard = {};
+  const exportFile = async () => {
+    const file = new File([generateTreeFile(name, shard)], `${name}${i || ""}.js`, {type: "application/javascript"});
+    await backendRequest({
+      url: treeUrl + file.name,
+      query: {a: 'save', f: 'json'},
+      body: {upload: file},
+      csrfToken: true,
+    });
+    i += 1;
+    size = 0;
+    shard = {};
+  };
+  for (const id in data) {
+    shard[id] = data[id];
+    size += measure(data[id]);
+    if (size >= (name === 'meta' ? META_SHARD_SIZE : TOC_SHARD_SIZE)) {
+      await exportFile();
+    }
+  }
+  if (size) {
+    await exportFile();
+  }
+
+  // remove stale files
+  for (; treeFiles.has(`${name}${i}.js`); i++) {
+    await backendRequest({
+      url: treeUrl + `${name}${i}.js`,
+      query: {a: 'delete', f: 'json'},
+      csrfToken: true,
+    });
+  }
+}
+
+async function moveItems(bookId, items, targetParentId, targetIndex) {
+  await backendRequest({
+    query: {a: 'query', f: 'json'},
+    body: {
+      q: JSON.stringify({
+        book: bookId,
+        cmd: 'move_items',
+        kwargs: {
+          items,
+          target_parent_id: targetParentId,
+          target_index: targetIndex,
+        },
+      }),
+    },
+    csrfToken: true,
+  });
+}
+
+function outputReport(report) {
+  const json = JSON.stringify(report, null, 2);
+
+  const wrapper = document.body.appendChild(document.createElement('div'));
+  wrapper.id = 'benchmark-report';
+
+  const a = wrapper.appendChild(document.createElement('a'));
+  a.href = URL.createObjectURL(new Blob([json], {type: 'application/json'}));
+  a.download = `benchmark-${report.date.replace(/\D/g, '')}.json`;
+  a.textContent = 'Download benchmark report';
+
+  const pre = wrapper.appendChild(document.createElement('pre'));
+  pre.textContent = json;
+}
+
+describe('Benchmarks', function () {
+  const report = {
+    date: new Date().toISOString(),
+    userAgent: navigator.userAgent,
+    browserVersion: userAgent.major,
+    runs: benchmarkRuns,
+    scenarios: [],
+    tree: null,
+  };
+
+  after(function () {
+    outputReport(report);
+  });
+
+  describe('Capture', function () {
+    before(async function () {
+      await Promise.all([
+        checkTestServer(),
+        checkExtension(),
+      ]);
+    });
+
+    for (const scenario of SCENARIOS) {
+      it(scenario.name, async function () {
+        const options = Object.assign({}, baseOptions, scenario.options);
+        const entry = {
+          name: scenario.name,
+          url: scenario.url,
+          options: scenario.options || {},
+          runs: [],
+        };
+
+        for (let i = 0; i < benchmarkRuns; i++) {
+          const startTime = performance.now();
+          const {result, timings} = await capture({
+            url: `${localhost}/${scenario.url}`,
+            options,
+          }, {withTimings: true});
+          const time = performance.now() - startTime;
+
+          assert.instanceOf(result, Blob);
+          entry.runs.push({
+            time,
+            size: result.size,
+            timings: mergeTimings(timings),
+          });
+        }
+
+        entry.medianTime = median(entry.runs.map(r => r.time));
+        report.scenarios.push(entry);
+      });
+    }
+  });
+
+  /**
+   * Time the backend round trips and data processing of the tree-heavy
+   * operations of the sidebar against a generated large book (see
+   * `backend_books` in the config).
+   */
+  describe('Tree', function () {
+    before(async function () {
+      if (!benchmarkBook) {
+        this.skip();
+      }
+      await checkBackendServer();
+    });
+
+    it('open, render, search, move, and save', async function () {
+      const entry = report.tree = {
+        book: benchmarkBook,
+        runs: [],
+      };
+
+      for (let i = 0; i < benchmarkRuns; i++) {
+        const run = {};
+
+        // open: load config and tree files
+        const {time: openTime, result: {treeUrl, treeFiles, meta, toc, size}} = await timeIt(async () => {
+          const {data: config} = await backendRequest({
+            query: {a: 'config', f: 'json'},
+          }).then(r => r.json());
+          const book = config.book[benchmarkBook];
+          const treeUrl = new URL(`${book.top_dir ? book.top_dir + '/' : ''}${book.tree_dir}/`, backend + '/').href;
+          const {data: list} = await backendRequest({
+            url: treeUrl,
+            query: {a: 'list', f: 'json'},
+          }).then(r => r.json());
+          const treeFiles = new Set(list.map(f => f.name));
+          const [meta, toc] = await Promise.all([
+            loadTreeFiles(treeUrl, treeFiles, 'meta'),
+            loadTreeFiles(treeUrl, treeFiles, 'toc'),
+          ]);
+          return {treeUrl, treeFiles, meta: meta.data, toc: toc.data, size: meta.size + toc.size};
+        });
+        run.open = {time: openTime, items: Object.keys(meta).length, size};
+
+        // render: build the fully expanded tree
+        const {time: renderTime} = await timeIt(() => renderTree(meta, toc));
+        run.render = {time: renderTime};
+
+        // search: fulltext search of a common word
+        const {time: searchTime, result: hits} = await timeIt(async () => {
+          const {data} = await backendRequest({
+            query: {
+              a: 'search',
+              f: 'json',
+              q: `book:"${benchmarkBook}" tango`,
+              fulltext: 100,
+            },
+            csrfToken: true,
+          }).then(r => r.json());
+          return (data[benchmarkBook] || []).length;
+        });
+        run.search = {time: searchTime, hits};
+
+        // move: move the first root item and then move it back
+        const {time: moveTime} = await timeIt(() => moveItems(benchmarkBook, [['root', 0]], 'root', 2));
+        run.move = {time: moveTime};
+        await moveItems(benchmarkBook, [['root', 1]], 'root', 0);
+
+        // save: save all meta and toc files
+        const {time: saveTime} = await timeIt(async () => {
+          await saveTreeFiles(treeUrl, treeFiles, 'meta', meta, () => 1);
+          await saveTreeFiles(treeUrl, treeFiles, 'toc', toc, v => 1 + v.length);
+        });
+        run.save = {time: saveTime};
+
+        entry.runs.push(run);
+      }
+
+      entry.medianTimes = {};
+      for (const phase of ['open', 'render', 'search', 'move', 'save']) {
+        entry.medianTimes[phase] = median(entry.runs.map(r => r[phase].time));
+      }
+    });
+  });
+});
+
+}));
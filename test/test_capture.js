@@ -15398,6 +15398,77 @@ ${localhost}/capture_downLink_indepth/linked2-1.html`,
       });
     });
 
+    describe('should rebuild links identically in DOM and stream mode', function () {
+      async function getRebuiltLinks(options) {
+        var blob = await capture({
+          url: `${localhost}/capture_downLink_indepth_rebuildStream/in-depth.html`,
+          options,
+        });
+
+        var zip = await new JSZip().loadAsync(blob);
+
+        var indexFile = zip.file('index.html');
+        var indexBlob = new Blob([await indexFile.async('blob')], {type: "text/html"});
+        var doc = await readFileAsDocument(indexBlob);
+
+        var host = doc.querySelector('div');
+        var frag = doc.createElement("template");
+        frag.innerHTML = host.getAttribute("data-scrapbook-shadowdom");
+        var shadow = frag.content;
+
+        return {
+          links: [...doc.querySelectorAll('a')].map(a => a.getAttribute('href') || a.getAttribute('xlink:href')),
+          rawText: doc.querySelector('xmp').textContent,
+          shadowLinks: [...shadow.querySelectorAll('a')].map(a => a.getAttribute('href')),
+        };
+      }
+
+      it('depth = 1', async function () {
+        var options = Object.assign({}, baseOptions, {
+          "capture.downLink.doc.depth": 1,
+          "capture.rebuildLinksMode": "dom",
+        });
+        var expected = await getRebuiltLinks(options);
+        assert.deepEqual(expected, {
+          links: [
+            `linked1.html#a=1&b=2`,
+            `linked1.html#a=1&section=2`,
+            `linked1.html#svg1`,
+            `linked2.html#svg2`,
+            `linked1.html#foreignObject`,
+            `linked2.html#after-svg`,
+          ],
+          rawText: `<a href="./linked1.html#xmp">raw text</a>`,
+          shadowLinks: [
+            `linked2.html#shadow`,
+          ],
+        });
+
+        var options = Object.assign({}, baseOptions, {
+          "capture.downLink.doc.depth": 1,
+          "capture.rebuildLinksMode": "stream",
+        });
+        assert.deepEqual(await getRebuiltLinks(options), expected);
+      });
+
+      it('depth = 1 (stream mode with tokens split across chunks)', async function () {
+        var options = Object.assign({}, baseOptions, {
+          "capture.downLink.doc.depth": 1,
+          "capture.rebuildLinksMode": "dom",
+        });
+        var expected = await getRebuiltLinks(options);
+
+        for (const chunkSize of [1, 3, 7]) {
+          var options = Object.assign({}, baseOptions, {
+            "capture.downLink.doc.depth": 1,
+            "capture.rebuildLinksMode": "stream",
+            "capture.rebuildLinksChunkSize": chunkSize,
+          });
+          assert.deepEqual(await getRebuiltLinks(options), expected, `chunk size: ${chunkSize}`);
+        }
+      });
+    });
+
     describe('should treat meta refresh as having extra depth', function () {
       it('depth = 1', async function () {
         var options = Object.assign({}, baseOptions, {
@@ -412,6 +412,136 @@ describe('core/common.js', function () {
     }
   });
 
+  $describe.skipIf($.noExtensionBrowser)('scrapbook.addPortListener', function () {
+    const listeners = [];
+
+    function createPort(name) {
+      const port = {
+        name,
+        sender: {},
+        disconnected: false,
+        messages: [],
+        onMessageListeners: [],
+        onDisconnectListeners: [],
+        onMessage: {addListener: (fn) => port.onMessageListeners.push(fn)},
+        onDisconnect: {addListener: (fn) => port.onDisconnectListeners.push(fn)},
+        postMessage: (message) => port.messages.push(message),
+        disconnect: () => { port.disconnected = true; },
+      };
+      return port;
+    }
+
+    before(function () {
+      globalThis.testPortCommands = {
+        echo: (args) => args,
+      };
+    });
+
+    after(function () {
+      delete globalThis.testPortCommands;
+    });
+
+    afterEach(function () {
+      for (const listener of listeners) {
+        browser.runtime.onConnect.removeListener(listener);
+      }
+      listeners.length = 0;
+    });
+
+    it('should handle a Port passing the filter and ignore it for others', async function () {
+      listeners.push(scrapbook.addPortListener(port => port.name === 'page1'));
+      listeners.push(scrapbook.addPortListener(port => port.name === 'page2'));
+
+      // a Port is dispatched to every listening page
+      const port = createPort('page1');
+      for (const listener of listeners) {
+        listener(port);
+      }
+
+      assert.isFalse(port.disconnected);
+      assert.strictEqual(port.onMessageListeners.length, 1);
+      assert.strictEqual(port.onDisconnectListeners.length, 1);
+      assert.deepEqual(port.messages, [{accepted: true}]);
+
+      port.onMessageListeners[0]({requests: [
+        {id: 1, cmd: 'testPortCommands.echo', args: {value: 1}},
+        {id: 2, cmd: 'testPortCommands.echo', args: {value: 2}},
+      ]});
+      await scrapbook.delay(10);
+      assert.deepEqual(port.messages, [{accepted: true}, {responses: [
+        {id: 1, result: {value: 1}},
+        {id: 2, result: {value: 2}},
+      ]}]);
+
+      port.onDisconnectListeners[0]();
+    });
+
+    it('should notify the other end of an accepted Port when the page is closed', async function () {
+      listeners.push(scrapbook.addPortListener(port => port.name === 'page1'));
+
+      const port = createPort('page1');
+      listeners[0](port);
+      globalThis.dispatchEvent(new Event('pagehide'));
+      assert.deepEqual(port.messages, [{accepted: true}, {closed: true}]);
+
+      // no more notification after disconnected
+      port.onDisconnectListeners[0]();
+      globalThis.dispatchEvent(new Event('pagehide'));
+      assert.deepEqual(port.messages, [{accepted: true}, {closed: true}]);
+    });
+  });
+
+  describe('scrapbook.getRegExpLiteralPrefixes', function () {
+    it('basic', function () {
+      assert.deepEqual(
+        scrapbook.getRegExpLiteralPrefixes(/^https:\/\/example\.com\/path/),
+        ['https://example.com/path'],
+      );
+      assert.deepEqual(
+        scrapbook.getRegExpLiteralPrefixes(/^https:\/\/example\.com\/.*\.html$/i),
+        ['https://example.com/'],
+      );
+    });
+
+    it('stop at a non-literal token', function () {
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/\w+\.com\//), ['https://']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/(?:www\.)?example\.com\//), ['https://']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/[a-z]+\.com\//), ['https://']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^$/), ['']);
+    });
+
+    it('handle quantifiers', function () {
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^ab*c/), ['a']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^ab{2}c/), ['a']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^ab+c/), ['ab']);
+      assert.deepEqual(
+        scrapbook.getRegExpLiteralPrefixes(/^https?:\/\/example\.com\//),
+        ['http://example.com/', 'https://example.com/'],
+      );
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^ab??c/), ['ac', 'abc']);
+    });
+
+    it('limit the number of forked prefixes', function () {
+      assert.deepEqual(
+        scrapbook.getRegExpLiteralPrefixes(/^a?b?c?d/, 4),
+        ['', 'a', 'b', 'ab'],
+      );
+    });
+
+    it('return null for an unanchored RegExp', function () {
+      assert.isNull(scrapbook.getRegExpLiteralPrefixes(/example\.com/));
+    });
+
+    it('return null for a top-level alternation', function () {
+      assert.isNull(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/a\.com\/|^https:\/\/b\.com\//));
+
+      // alternation in a group or a character class is not top-level
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/(a|b)\.com\//), ['https://']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/[|]/), ['https://']);
+      assert.deepEqual(scrapbook.getRegExpLiteralPrefixes(/^https:\/\/\|/), ['https://|']);
+    });
+  });
+
   describe('scrapbook.escapeHtmlComment', function () {
     it('basic', function () {
       // starts with ">"
@@ -939,6 +1069,55 @@ describe('core/common.js', function () {
     });
   });
 
+  describe('scrapbook.sha1Memo', function () {
+    it('basic', function () {
+      assert.strictEqual(scrapbook.sha1Memo('abc'), 'a9993e364706816aba3e25717850c26c9cd0d89d');
+      assert.strictEqual(scrapbook.sha1Memo('abc'), 'a9993e364706816aba3e25717850c26c9cd0d89d');
+      assert.strictEqual(scrapbook.sha1Memo('　'), scrapbook.sha1('　', 'TEXT'));
+    });
+  });
+
+  describe('scrapbook.hashString', function () {
+    it('basic', function () {
+      assert.match(scrapbook.hashString(''), /^[0-9a-f]{16}$/);
+      assert.match(scrapbook.hashString('http://example.com/\tresource'), /^[0-9a-f]{16}$/);
+    });
+
+    it('should be deterministic', function () {
+      assert.strictEqual(scrapbook.hashString('abc'), scrapbook.hashString('abc'));
+    });
+
+    it('should be distinct for similar strings', function () {
+      const hashes = new Set();
+      for (let i = 0; i < 10000; i++) {
+        hashes.add(scrapbook.hashString(`http://example.com/${i}\tresource`));
+      }
+      assert.strictEqual(hashes.size, 10000);
+    });
+  });
+
+  $describe.skipIf($.noBrowser)('scrapbook.getDigest', function () {
+    it('string', async function () {
+      assert.strictEqual(await scrapbook.getDigest('abc'), 'a9993e364706816aba3e25717850c26c9cd0d89d');
+      assert.strictEqual(await scrapbook.getDigest('　'), scrapbook.sha1('　', 'TEXT'));
+    });
+
+    it('ArrayBuffer and ArrayBufferView', async function () {
+      const u8ar = new Uint8Array([0x61, 0x62, 0x63]);
+      assert.strictEqual(await scrapbook.getDigest(u8ar.buffer), 'a9993e364706816aba3e25717850c26c9cd0d89d');
+      assert.strictEqual(await scrapbook.getDigest(u8ar), 'a9993e364706816aba3e25717850c26c9cd0d89d');
+    });
+
+    it('Blob', async function () {
+      const blob = new Blob(['abc']);
+      assert.strictEqual(await scrapbook.getDigest(blob), 'a9993e364706816aba3e25717850c26c9cd0d89d');
+      assert.strictEqual(
+        await scrapbook.getDigest(blob, 'SHA-256'),
+        'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad',
+      );
+    });
+  });
+
   describe('scrapbook.byteStringToArrayBuffer', function () {
     it('basic', function () {
       // "一天" in Big5
@@ -3152,6 +3331,115 @@ div { image-background: var(${/(--sb(\d+)-2)/}); }`;
     });
   });
 
+  describe('scrapbook.cloneNode', function () {
+    it('should map all descendant nodes by default', function () {
+      const sample = document.createElement('template');
+      sample.innerHTML = `<section><p>My <strong>weight</strong> text.</p><!-- comment --></section>`;
+      const section = sample.content.querySelector('section');
+      const origNodeMap = new WeakMap();
+      const clonedNodeMap = new WeakMap();
+      const newSection = scrapbook.cloneNode(section, true, {origNodeMap, clonedNodeMap});
+
+      assert.strictEqual(newSection.outerHTML, section.outerHTML);
+      assert.strictEqual(origNodeMap.get(newSection), section);
+      assert.strictEqual(clonedNodeMap.get(section), newSection);
+
+      const walker1 = document.createNodeIterator(section);
+      const walker2 = document.createNodeIterator(newSection);
+      let node1, node2;
+      while (node1 = walker1.nextNode()) {
+        node2 = walker2.nextNode();
+        assert.strictEqual(origNodeMap.get(node2), node1);
+        assert.strictEqual(clonedNodeMap.get(node1), node2);
+      }
+    });
+
+    it('should map only descendant nodes matching `whatToShow`', function () {
+      const sample = document.createElement('template');
+      sample.innerHTML = `<section><p>My <strong>weight</strong> text.</p><!-- comment --></section>`;
+      const section = sample.content.querySelector('section');
+      const origNodeMap = new WeakMap();
+      const clonedNodeMap = new WeakMap();
+      const newSection = scrapbook.cloneNode(section, true, {
+        origNodeMap,
+        clonedNodeMap,
+        whatToShow: NodeFilter.SHOW_ELEMENT,
+      });
+
+      assert.strictEqual(newSection.outerHTML, section.outerHTML);
+      assert.strictEqual(origNodeMap.get(newSection), section);
+      assert.strictEqual(clonedNodeMap.get(section), newSection);
+
+      const p = section.querySelector('p');
+      const newP = newSection.querySelector('p');
+      assert.strictEqual(origNodeMap.get(newP), p);
+      assert.strictEqual(clonedNodeMap.get(p), newP);
+
+      const strong = section.querySelector('strong');
+      const newStrong = newSection.querySelector('strong');
+      assert.strictEqual(origNodeMap.get(newStrong), strong);
+      assert.strictEqual(clonedNodeMap.get(strong), newStrong);
+
+      assert(!clonedNodeMap.has(p.firstChild));
+      assert(!clonedNodeMap.has(section.lastChild));
+    });
+
+    it('should always map the root node even if not matching `whatToShow`', function () {
+      const text = document.createTextNode('text');
+      const origNodeMap = new WeakMap();
+      const clonedNodeMap = new WeakMap();
+      const newText = scrapbook.cloneNode(text, true, {
+        origNodeMap,
+        clonedNodeMap,
+        whatToShow: NodeFilter.SHOW_ELEMENT,
+      });
+
+      assert.strictEqual(origNodeMap.get(newText), text);
+      assert.strictEqual(clonedNodeMap.get(text), newText);
+    });
+  });
+
+  describe('scrapbook.documentToStringParts', function () {
+    it('should generate parts equivalent to `documentToString`', function () {
+      const html = `<!DOCTYPE html>
+<!-- comment -->
+<html lang="en"><head><meta charset="UTF-8"><title>a &amp; b</title>
+<style>p > b { color: red; }</style></head>
+<body><div id="main"><p class="x">1 &lt; 2 &gt; 0 &amp;&nbsp;<b>bold</b><br>text</p>
+<pre>
+pre text</pre><textarea>
+text</textarea><template><p>tmpl</p></template>
+<svg><a href="#"><text>svg</text></a></svg>
+<!-- comment --></div></body></html>`;
+      const doc = (new DOMParser()).parseFromString(html, 'text/html');
+      for (const pretty of [false, true]) {
+        for (const maxDepth of [0, 1, 2, 8]) {
+          const parts = [...scrapbook.documentToStringParts(doc, pretty, maxDepth)];
+          assert.strictEqual(parts.join(''), scrapbook.documentToString(doc, pretty));
+        }
+      }
+    });
+
+    it('should generate parts equivalent to `documentToString` (XHTML)', function () {
+      const xhtml = `<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>a &amp; b</title></head>
+<body><p>1 &lt; 2<br/>text</p></body></html>`;
+      const doc = (new DOMParser()).parseFromString(xhtml, 'application/xhtml+xml');
+      const parts = [...scrapbook.documentToStringParts(doc)];
+      assert.strictEqual(parts.join(''), scrapbook.documentToString(doc));
+    });
+  });
+
+  describe('scrapbook.documentToBlob', function () {
+    it('should generate a Blob of the serialized document', async function () {
+      const html = `<!DOCTYPE html><html><head><title>title</title></head><body>${'<p>text</p>'.repeat(100)}</body></html>`;
+      const doc = (new DOMParser()).parseFromString(html, 'text/html');
+      const blob = scrapbook.documentToBlob(doc, {type: 'text/html', chunkSize: 64});
+      assert.strictEqual(blob.type, 'text/html');
+      assert.strictEqual(await blob.text(), scrapbook.documentToString(doc));
+    });
+  });
+
   describe('scrapbook.getOffsetInSource', function () {
     it('should correctly handle `node` and `offset`', function () {
       const sample = document.createElement('template');
@@ -3278,6 +3566,149 @@ div { image-background: var(${/(--sb(\d+)-2)/}); }`;
       });
     });
   });
+
+  describe('scrapbook.Retrier', function () {
+    const httpError = (status, headers) => Object.assign(new Error(`${status}`), {
+      status,
+      headers: new Headers(headers),
+    });
+
+    const getRejection = async (promise) => {
+      try {
+        await promise;
+      } catch (ex) {
+        return ex;
+      }
+      assert.fail('expected the promise to be rejected');
+    };
+
+    it('isRetriable', function () {
+      assert.isTrue(scrapbook.Retrier.isRetriable(new Error('Network request failed.')));
+      assert.isTrue(scrapbook.Retrier.isRetriable(httpError(429)));
+      assert.isTrue(scrapbook.Retrier.isRetriable(httpError(503)));
+      assert.isFalse(scrapbook.Retrier.isRetriable(httpError(404)));
+      assert.isFalse(scrapbook.Retrier.isRetriable(httpError(403)));
+    });
+
+    it('getRetryAfter', function () {
+      assert.isNull(scrapbook.Retrier.getRetryAfter(new Error('error')));
+      assert.isNull(scrapbook.Retrier.getRetryAfter(httpError(503)));
+      assert.strictEqual(scrapbook.Retrier.getRetryAfter(httpError(503, {'Retry-After': '3'})), 3000);
+      assert.strictEqual(scrapbook.Retrier.getRetryAfter(httpError(503, {'Retry-After': 'Thu, 01 Jan 1970 00:00:00 GMT'})), 0);
+      assert.isNull(scrapbook.Retrier.getRetryAfter(httpError(503, {'Retry-After': 'invalid'})));
+    });
+
+    it('getBackoffDelay', function () {
+      for (let i = 0; i < 10; i++) {
+        const delay0 = scrapbook.Retrier.getBackoffDelay(100, 0);
+        assert.isAtLeast(delay0, 50);
+        assert.isAtMost(delay0, 100);
+
+        const delay2 = scrapbook.Retrier.getBackoffDelay(100, 2);
+        assert.isAtLeast(delay2, 200);
+        assert.isAtMost(delay2, 400);
+      }
+    });
+
+    it('retry until success', async function () {
+      const retrier = new scrapbook.Retrier();
+      const tries = [];
+      const result = await retrier.run(async (tried) => {
+        tries.push(tried);
+        if (tried < 2) { throw httpError(503); }
+        return 'ok';
+      }, {retryCount: 3, retryDelay: 0});
+      assert.strictEqual(result, 'ok');
+      assert.deepEqual(tries, [0, 1, 2]);
+      assert.deepEqual(retrier.stats, {operations: 1, retries: 2, failures: 0});
+    });
+
+    it('give up after retryCount', async function () {
+      const retrier = new scrapbook.Retrier();
+      let count = 0;
+      let failed = null;
+      assert.match((await getRejection(retrier.run(async () => {
+        count++;
+        throw httpError(503);
+      }, {retryCount: 2, retryDelay: 0, onFailure: (ex) => { failed = ex; }}))).message, /503/);
+      assert.strictEqual(count, 3);
+      assert.strictEqual(failed.status, 503);
+      assert.deepEqual(retrier.stats, {operations: 1, retries: 2, failures: 1});
+    });
+
+    it('do not retry a non-retriable error', async function () {
+      const retrier = new scrapbook.Retrier();
+      let count = 0;
+      assert.match((await getRejection(retrier.run(async () => {
+        count++;
+        throw httpError(404);
+      }, {retryCount: 3, retryDelay: 0}))).message, /404/);
+      assert.strictEqual(count, 1);
+      assert.deepEqual(retrier.stats, {operations: 1, retries: 0, failures: 0});
+    });
+
+    it('stop retrying when the budget is exhausted', async function () {
+      const retrier = new scrapbook.Retrier({budgetRatio: 0, budgetMin: 3});
+      let count = 0;
+      for (let i = 0; i < 3; i++) {
+        assert.match((await getRejection(retrier.run(async () => {
+          count++;
+          throw new Error('Network request failed.');
+        }, {retryCount: 2, retryDelay: 0}))).message, /Network request failed/);
+      }
+      // 3 retries are allowed in total
+      assert.strictEqual(count, 6);
+      assert.deepEqual(retrier.stats, {operations: 3, retries: 3, failures: 3});
+    });
+
+    it('fail fast for a host with an open circuit', async function () {
+      const retrier = new scrapbook.Retrier({breakerThreshold: 2, breakerCooldown: 60000});
+      let count = 0;
+
+      // retries of an operation count as one failure of the host
+      assert.match((await getRejection(retrier.run(async () => {
+        count++;
+        throw httpError(503);
+      }, {url: 'https://example.com/1', retryCount: 5, retryDelay: 0}))).message, /503/);
+      assert.strictEqual(count, 6);
+
+      assert.strictEqual(await retrier.run(async () => {
+        count++;
+        return 'ok';
+      }, {url: 'https://example.com/2', retryCount: 5, retryDelay: 0}), 'ok');
+      assert.strictEqual(count, 7);
+
+      // a success resets the failures
+      for (let i = 0; i < 2; i++) {
+        assert.match((await getRejection(retrier.run(async () => {
+          count++;
+          throw httpError(503);
+        }, {url: 'https://example.com/3', retryCount: 1, retryDelay: 0}))).message, /503/);
+      }
+      assert.strictEqual(count, 11);
+
+      assert.match((await getRejection(retrier.run(async () => {
+        count++;
+        return 'ok';
+      }, {url: 'https://example.com/4', retryCount: 5, retryDelay: 0}))).message, /Too many failures/);
+      assert.strictEqual(count, 11);
+
+      // other hosts are not affected
+      assert.strictEqual(await retrier.run(async () => 'ok', {url: 'https://example.org/', retryDelay: 0}), 'ok');
+    });
+
+    it('do not open the circuit for an error not counted as a failure of the host', async function () {
+      const retrier = new scrapbook.Retrier({breakerThreshold: 2, breakerCooldown: 60000});
+      const isBreakerFailure = (ex) => ex.status !== 500;
+      for (let i = 0; i < 3; i++) {
+        assert.match((await getRejection(retrier.run(async () => {
+          throw httpError(500);
+        }, {url: 'https://example.com/1', retryCount: 1, retryDelay: 0, isBreakerFailure}))).message, /500/);
+      }
+
+      assert.strictEqual(await retrier.run(async () => 'ok', {url: 'https://example.com/2', retryDelay: 0}), 'ok');
+    });
+  });
 });
 
 }));
@@ -0,0 +1,69 @@
+import fs from 'fs';
+import path from 'path';
+import {fileURLToPath} from 'url';
+import {parseArgs} from 'node:util';
+
+// Get the directory name in ESM
+const ROOT = path.dirname(path.dirname(fileURLToPath(import.meta.url)));
+
+const mimeFile = path.join(ROOT, 'src', 'lib', 'mime.js');
+
+const DATA_REGEX = /(\/\/ BEGIN GENERATED DATA\n)[\s\S]*?(\/\/ END GENERATED DATA\n)/;
+
+/**
+ * Generate the compact data table from a mime-db database.
+ *
+ * - Only MIME types with extensions are included, as they are the only ones
+ *   used by the lookup functions.
+ * - Each line is a MIME type followed by its extensions, separated by spaces.
+ */
+function generateData(db) {
+  const lines = [];
+  for (const mime in db) {
+    const exts = db[mime].extensions;
+    if (exts?.length) {
+      lines.push([mime, ...exts].join(' '));
+    }
+  }
+  return `const DATA = \`\\
+${lines.join('\n')}\`;
+`;
+}
+
+function main() {
+  const args = parseArgs({
+    options: {
+      help: {
+        type: 'boolean',
+        short: 'h',
+      },
+    },
+    allowPositionals: true,
+  });
+
+  if (args.values.help || args.positionals.length !== 1) {
+    const usage = `\
+Usage: node build-mime.js [options ...] DB_FILE
+
+Update the data table of src/lib/mime.js from a mime-db database.
+
+Arguments:
+  DB_FILE     Path to the db.json of mime-db.
+
+Options:
+  -h, --help  Display usage help.
+`;
+    process.stdout.write(usage);
+    process.exit(args.values.help ? 0 : 1);
+  }
+
+  const db = JSON.parse(fs.readFileSync(args.positionals[0], 'utf8'));
+  const content = fs.readFileSync(mimeFile, 'utf8');
+  if (!DATA_REGEX.test(content)) {
+    throw new Error(`Unable to find the generated data block in "${mimeFile}".`);
+  }
+  fs.writeFileSync(mimeFile, content.replace(DATA_REGEX, (m, m1, m2) => m1 + generateData(db) + m2));
+  console.log(`Updated "${mimeFile}".`);
+}
+
+main();
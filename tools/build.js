@@ -134,6 +134,7 @@ function buildTest(target) {
 
   for (const src of globSync([
     path.join(srcDir, '{core,capturer}', 'common.js'),
+    path.join(srcDir, 'scrapbook', 'tree-file.js'),
     path.join(srcDir, 'lib', '**', '*.js'),
   ], {windowsPathsNoEscape: true})) {
     const subpath = path.relative(srcDir, src);